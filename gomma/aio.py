@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Asyncio session
+"""
+
+import asyncio
+import logging
+import os
+import threading
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from gomma.executor import rewindFiles
+from gomma.session import getSession
+from gomma.utility import codec
+
+_sessions = {}
+_sessionsLock = threading.Lock()
+
+
+class AsyncResponse(object):
+    """
+    Response read from aiohttp, with the requests fields used by the SDK.
+    """
+
+    def __init__(self, status_code, content, headers, url):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+        self.url = url
+
+    @property
+    def text(self):
+        """Body as text."""
+        return self.content.decode('utf-8', errors='replace')
+
+    def json(self):
+        """Body as json."""
+        return codec.loads(self.content)
+
+
+class AsyncSession(object):
+    """
+    Gomma asyncio session.
+    Token is handled by the shared sync session of the same profile.
+    """
+
+    def __init__(self, profile_name=None):
+        """
+        Initialize async session with the bounded connection pool.
+        """
+        if not aiohttp:
+            raise ImportError('AsyncSession requires aiohttp: pip install gomma[async]')
+        s = getSession(profile_name)
+        self.s = s
+        self.config = s.config
+        self.profile_name = s.profile_name
+        self.limit = s.config.getint('aio_limit', 100)
+        self.limitPerHost = s.config.getint('aio_limit_per_host', 0)
+        self.stats = {'requests': 0, 'in_flight': 0, 'max_in_flight': 0}
+        self.__agent = None
+        self.__loop = None
+
+    async def getAgent(self):
+        """Retrive aiohttp session for the running loop."""
+        loop = asyncio.get_running_loop()
+        agent = self.__agent
+        if not agent or agent.closed or self.__loop is not loop:
+            logging.debug(f'Creating aiohttp session, limit {self.limit}')
+            connector = aiohttp.TCPConnector(limit=self.limit,
+                limit_per_host=self.limitPerHost)
+            agent = aiohttp.ClientSession(connector=connector,
+                headers={'user-agent': 'Gomma-Session'})
+            self.__agent = agent
+            self.__loop = loop
+        return agent
+
+    async def __getUid(self):
+        """
+        Current token of the shared session: in-memory when fresh, else
+        renewed in the default executor, not in the event loop.
+        """
+        agent = self.s.peekAgent()
+        if not agent:
+            loop = asyncio.get_running_loop()
+            agent = await loop.run_in_executor(None, self.s.getAgent)
+        return agent.headers.get('x-uid')
+
+    async def __send(self, method, url, params, json, files, timeout, headers=None):
+        """ Send one request. """
+        agent = await self.getAgent()
+        uid = await self.__getUid()
+        data = None
+        headers = {**(headers or {}), 'x-uid': uid}
+        if json is not None:
+            data = codec.dumps(json)
+            headers['content-type'] = 'application/json'
+        if files:
+            data = aiohttp.FormData()
+            for name, fin in files.items():
+                filename = os.path.basename(getattr(fin, 'name', name))
+                data.add_field(name, fin, filename=filename)
+        timeout = aiohttp.ClientTimeout(sock_connect=timeout[0], sock_read=timeout[1])
+        self.stats['requests'] += 1
+        self.stats['in_flight'] += 1
+        self.stats['max_in_flight'] = max(self.stats['max_in_flight'], self.stats['in_flight'])
+        try:
+            async with agent.request(method, url, params=params,
+                data=data, headers=headers, timeout=timeout) as r:
+                content = await r.read()
+                response = AsyncResponse(r.status, content, r.headers, str(r.url))
+        finally:
+            self.stats['in_flight'] -= 1
+        if 401 == response.status_code:
+            logging.warning(f'Token rejected by {response.url}')
+            self.s.rejectToken(uid)
+        return response
+
+    async def request(self, method, url, params=None, json=None, files=None, timeout=None,
+        headers=None):
+        """
+        Send request with the executor policy of the sync session.
+        Returns AsyncResponse, None on network failure or open circuit.
+        """
+        ex = self.s.executor
+        if timeout is None:
+            timeout = ex.getTimeout(url)
+        attempt = 0
+        while True:
+            if not ex.allow(url):
+                return None
+            r = error = None
+            try:
+                r = await self.__send(method, url, params, json, files, timeout, headers)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = e
+            status = r.status_code if r is not None else None
+            ex.record(url, status, error)
+            delay = ex.retryDelay(method, attempt, status, r.headers if r is not None else None, error)
+            if delay is None:
+                if error:
+                    logging.error(f'{method.upper()} {url} failed: {error!r}')
+                return r
+            logging.warning(f'Retry {method.upper()} {url} in {delay:.2f}s ({status or error!r})')
+            ex.stats['retries'] += 1
+            rewindFiles(files)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def close(self):
+        """Close aiohttp session."""
+        if self.__agent and not self.__agent.closed:
+            await self.__agent.close()
+        self.__agent = None
+        return True
+
+
+def getAsyncSession(profile_name=None):
+    """
+    Shared async session for profile.
+    """
+    if not profile_name:profile_name='default'
+    with _sessionsLock:
+        s = _sessions.get(profile_name)
+        if not s:
+            s = AsyncSession(profile_name)
+            _sessions[profile_name] = s
+    return s
+
+
+class AsyncClient(object):
+    """
+    Base class of the asyncio clients.
+    """
+    service = None
+
+    def __init__(self, profile_name=None):
+        """
+        Initialize async client.
+        """
+        logging.info(f'Init async {self.service} SDK')
+        s = getAsyncSession(profile_name)
+        host = s.config.get('agapi_host')
+        self.host = f'{host}/{self.service}' if self.service else host
+        self.s = s
+
+    async def _request(self, method, rq, expect=200, parse=True, **kwargs):
+        """
+        Send request, check status and decode json, through the lookup
+        cache, http cache and invalidation of the sync session (their
+        redis and file work runs in the default executor).
+        """
+        s = self.s.s
+        loop = asyncio.get_running_loop()
+        state = None
+        if s.httpCache or s.lookupCache.ttls:
+            found, state = await loop.run_in_executor(None, s.beforeCall, method, rq, parse, kwargs)
+            if found is not None:
+                return found
+        r = await self.s.request(method, rq, **kwargs)
+        if state or 'get' != method.lower():
+            return await loop.run_in_executor(None, s.afterCall, method, rq, expect, parse, r, state)
+        return s.afterCall(method, rq, expect, parse, r)
+
+
+def mergeQuery(payload, query=None):
+    """
+    Merge query string or dict into payload params.
+    """
+    if not query:
+        return payload
+    if isinstance(query, str):
+        query = dict(item.split("=") for item in query.split('&'))
+    return {**payload, **query}
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+BASE asyncio SDK
+"""
+
+import logging
+
+from gomma.aio import AsyncClient, mergeQuery
+
+
+class AsyncBase(AsyncClient):
+    """
+    AGCloud BASE Data asyncio class, same methods of Base.
+    """
+
+    #erp
+    async def getErp(self, erp_id: int, params=None):
+        """ Get ERP data. """
+        logging.info(f'Get erp {erp_id}')
+        rq = f'{self.host}/erp/{erp_id}'
+        return await self._request('get', rq, params=params)
+
+    #unit of measure
+    async def getUoms(self, query=None):
+        """ Get all uoms. """
+        logging.info('Getting all unit of measure...')
+        rq = f'{self.host}/settings/unitofmeasure'
+        return await self._request('get', rq, params=query)
+
+    async def getUom(self, uom_id: int, query=None):
+        """ Get uom by id. """
+        logging.info(f'Reading uom {uom_id}...')
+        rq = f'{self.host}/settings/unitofmeasure/{uom_id}'
+        return await self._request('get', rq, params=query)
+
+    async def getUomFromCode(self, code: str, query=None):
+        """ Get uom from code. """
+        logging.info(f'Reading uom code {code}...')
+        params = mergeQuery({'code': code}, query)
+        rq = f'{self.host}/settings/unitofmeasure/findByCode'
+        return await self._request('get', rq, params=params)
+
+    #currency
+    async def getCurrencies(self, query=None):
+        """ Get all currencies. """
+        logging.info('Getting all currencies...')
+        rq = f'{self.host}/settings/currency'
+        return await self._request('get', rq, params=query)
+
+    async def getCurrency(self, currency_id: int, query=None):
+        """ Get currency by id. """
+        logging.info(f'Reading currency {currency_id}...')
+        rq = f'{self.host}/settings/currency/{currency_id}'
+        return await self._request('get', rq, params=query)
+
+    async def getCurrencyFromCode(self, code: str, query=None):
+        """ Get currency from code. """
+        logging.info(f'Reading currency code {code}...')
+        params = mergeQuery({'code': code}, query)
+        rq = f'{self.host}/settings/currency/findByCode'
+        return await self._request('get', rq, params=params)
@@ -10,25 +10,79 @@ __author__ = "Davide Pellegrino"
 __version__ = "2.1.1"
 __date__ = "2019-11-07"
 
-import json
 import logging
+from urllib.parse import urlsplit
 
-from gomma.session import Session, parseApiError
+from gomma.session import getSession
+from gomma.utility.paging import pageRecords, pageTotal
+from gomma.utility.reference import Reference
 
 class Base(object):
     """
     AGCloud BASE Data core class .
     """
 
-    def __init__(self, profile_name=None):
+    def __init__(self, profile_name=None, preload=None):
         """
         Initialize main class with this and that.
         """
         logging.info('Init Base SDK')
-        s = Session(profile_name)
+        s = getSession(profile_name)
         host=s.config.get('agapi_host')
         self.host = host
         self.s = s
+        ttl = s.config.getfloat('reference_ttl', 3600)
+        self.uoms = Reference(lambda: self.__readAll(self.getUoms), ttl)
+        self.currencies = Reference(lambda: self.__readAll(self.getCurrencies), ttl)
+        self.__listening = False
+        if preload is None:
+            preload = s.config.getboolean('reference_preload', False)
+        if preload:
+            self.preload()
+
+    def preload(self):
+        """
+        Load uoms and currencies in memory: lookups by id and code
+        are answered locally until reference_ttl expires.
+        """
+        logging.info('Preloading uoms and currencies...')
+        if not self.__listening:
+            # held weakly: a dropped Base leaves the shared invalidator
+            self.__listening = self.s.invalidator.addListener(self.__onInvalidate, weak=True)
+        return self.uoms.refresh() and self.currencies.refresh()
+
+    def __onInvalidate(self, path):
+        """ Reload the index of a changed uom or currency. """
+        settings = urlsplit(self.host).path.lower() + '/settings/'
+        if path.startswith(settings + 'unitofmeasure'):
+            self.uoms.expire()
+        elif path.startswith(settings + 'currency'):
+            self.currencies.expire()
+
+    def __readAll(self, fetch, take=100):
+        """ All the records of a list endpoint, False on failure. """
+        records = []
+        while True:
+            page = fetch({'take': take, 'skip': len(records)})
+            if page is False:
+                return False
+            chunk = pageRecords(page)
+            records.extend(chunk)
+            total = pageTotal(page)
+            if len(chunk) < take or (total is not None and len(records) >= total):
+                return records
+
+    def __lookup(self, reference, key, value, query, fetch):
+        """ Indexed record as {'data': record}, fetch() on a miss. """
+        if reference.loaded and not query:
+            record = reference.get(key, value)
+            if record is not None:
+                return {'data': record}
+        x = fetch()
+        if x is not False and reference.loaded and not query and isinstance(x, dict) \
+                and isinstance(x.get('data'), dict):
+            reference.add(x['data'])
+        return x
 
     #erp
     def getErp(self, erp_id:int, params=None):
@@ -37,24 +91,14 @@ class Base(object):
         """
         logging.info(f'Get erp {erp_id}')
         rq = f'{self.host}/erp/{erp_id}'
-        agent=self.s.getAgent()
-        r = agent.get(rq, params=params)
-        if 200 != r.status_code:
-            return False
-        erp = json.loads(r.text)
-        return erp
+        return self.s.call('get', rq, params=params)
 
     #unit of measure
     def getUoms(self, query=None):
         """Get all uoms."""
         logging.info('Getting all unit of measure...')
         rq = f'{self.host}/settings/unitofmeasure'
-        agent=self.s.getAgent()
-        r = agent.get(rq, params=query)
-        if 200 != r.status_code:
-            return False
-        uoms = json.loads(r.text)
-        return uoms
+        return self.s.call('get', rq, params=query)
 
     def getUom(self, uom_id:int, query=None):
         """
@@ -62,12 +106,8 @@ class Base(object):
         """
         logging.info(f'Reading family {uom_id}...')
         rq = f'{self.host}/settings/unitofmeasure/{uom_id}'
-        agent=self.s.getAgent()
-        r = agent.get(rq, params=query)
-        if 200 != r.status_code:
-            return False
-        uom = json.loads(r.text)
-        return uom
+        return self.__lookup(self.uoms, 'id', uom_id, query,
+            lambda: self.s.call('get', rq, params=query))
 
     def getUomFromCode(self, code:str, query=None):
         """
@@ -81,24 +121,15 @@ class Base(object):
             new_params = dict(item.split("=") for item in query.split('&'))
             params = {**params, **new_params}     
         rq = f'{self.host}/settings/unitofmeasure/findByCode'
-        agent=self.s.getAgent()
-        r = agent.get(rq, params=params)
-        if 200 != r.status_code:
-            return False
-        uom = json.loads(r.text)
-        return uom        
+        return self.__lookup(self.uoms, 'code', code, query,
+            lambda: self.s.call('get', rq, params=params))
 
     #Currency
     def getCurrencies(self, query=None):
         """Get all currencies."""
         logging.info('Getting all unit of measure...')
         rq = f'{self.host}/settings/currency'
-        agent=self.s.getAgent()
-        r = agent.get(rq, params=query)
-        if 200 != r.status_code:
-            return False
-        uoms = json.loads(r.text)
-        return uoms
+        return self.s.call('get', rq, params=query)
 
     def getCurrency(self, currency_id:int, query=None):
         """
@@ -106,12 +137,8 @@ class Base(object):
         """
         logging.info(f'Reading currency {currency_id}...')
         rq = f'{self.host}/settings/currency/{currency_id}'
-        agent=self.s.getAgent()
-        r = agent.get(rq, params=query)
-        if 200 != r.status_code:
-            return False
-        uom = json.loads(r.text)
-        return uom
+        return self.__lookup(self.currencies, 'id', currency_id, query,
+            lambda: self.s.call('get', rq, params=query))
 
     def getCurrencyFromCode(self, code:str, query=None):
         """
@@ -125,9 +152,5 @@ class Base(object):
             new_params = dict(item.split("=") for item in query.split('&'))
             params = {**params, **new_params}     
         rq = f'{self.host}/settings/currency/findByCode'
-        agent=self.s.getAgent()
-        r = agent.get(rq, params=params)
-        if 200 != r.status_code:
-            return False
-        uom = json.loads(r.text)
-        return uom        
+        return self.__lookup(self.currencies, 'code', code, query,
+            lambda: self.s.call('get', rq, params=params))
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Coral asyncio SDK
+"""
+
+import logging
+
+from gomma.aio import AsyncClient, mergeQuery
+
+
+class AsyncCoral(AsyncClient):
+    """
+    Coral asyncio class, same methods of Coral.
+    """
+    service = 'coral'
+
+    #supplier
+    async def getSupplier(self, supplier_id: int, params=None):
+        """ Read single supplier. """
+        logging.info(f'Get supplier {supplier_id}')
+        rq = f'{self.host}/supplier/{supplier_id}'
+        return await self._request('get', rq, params=params)
+
+    async def getSuppliers(self, query=None):
+        """ Read all suppliers. """
+        logging.info('Getting all the suppliers')
+        rq = f'{self.host}/supplier'
+        return await self._request('get', rq, params=query)
+
+    async def createSupplier(self, payload):
+        """ Create new supplier. """
+        logging.info(f'Creating supplier {payload}')
+        rq = f'{self.host}/supplier'
+        return await self._request('post', rq, expect=201, json=payload)
+
+    async def getSupplierFromExt_id(self, ext_id: int, params=None):
+        """ Get supplier from ext_id. """
+        logging.info(f'Search supplier ext_id {ext_id}.')
+        payload = mergeQuery({'ext_id': ext_id}, params)
+        rq = f'{self.host}/supplier/findByExtId'
+        return await self._request('get', rq, params=payload)
+
+    async def updateSupplier(self, supplier_id: int, payload):
+        """ Update supplier. """
+        logging.info(f'Updating supplier {supplier_id} with {payload}')
+        rq = f'{self.host}/supplier/{supplier_id}'
+        return await self._request('post', rq, json=payload)
+
+    #category
+    async def getCategory(self, category_id: int, params=None):
+        """ Read single category. """
+        logging.info(f'Get category {category_id}')
+        rq = f'{self.host}/category/{category_id}'
+        return await self._request('get', rq, params=params)
+
+    async def getCategories(self, query=None):
+        """ Read all category. """
+        logging.info('Getting all the categories')
+        rq = f'{self.host}/supplier'
+        return await self._request('get', rq, params=query)
+
+    async def createCategory(self, payload):
+        """ Create new category. """
+        logging.info(f'Creating category {payload}')
+        rq = f'{self.host}/category'
+        return await self._request('post', rq, expect=201, json=payload)
+
+    async def updateCategory(self, category_id: int, payload):
+        """ Update category. """
+        logging.info(f'Updating category {category_id} with {payload}')
+        rq = f'{self.host}/category/{category_id}'
+        return await self._request('post', rq, json=payload)
@@ -10,11 +10,11 @@ __author__ = "Davide Pellegrino"
 __version__ = "1.1.1"
 __date__ = "2020-09-08"
 
-import json
 import logging
 import time
 
-from gomma.session import Session, parseApiError
+from gomma.session import getSession
+from gomma.utility.paging import Export, paginate
 
 class Coral(object):
     """
@@ -26,7 +26,7 @@ class Coral(object):
         Initialize main class with this and that.
         """
         logging.info('Init Coral SDK')
-        s = Session(profile_name)
+        s = getSession(profile_name)
         host=s.config.get('agapi_host')
         self.host = f'{host}/coral'
         self.s = s
@@ -38,12 +38,7 @@ class Coral(object):
         """
         logging.info(f'Get supplier {supplier_id}')
         rq = f'{self.host}/supplier/{supplier_id}'
-        agent=self.s.getAgent()
-        r = agent.get(rq, params=params)
-        if 200 != r.status_code:
-            return False
-        supplier = json.loads(r.text)
-        return supplier
+        return self.s.call('get', rq, params=params)
 
     def getSuppliers(self, query=None):
         """
@@ -51,12 +46,21 @@ class Coral(object):
         """
         logging.info('Getting all the suppliers')
         rq = f'{self.host}/supplier'
-        agent=self.s.getAgent()
-        r = agent.get(rq, params=query)
-        if 200 != r.status_code:
-            return False
-        suppliers = json.loads(r.text)
-        return suppliers
+        return self.s.call('get', rq, params=query)
+
+    def iterSuppliers(self, query=None, take=100):
+        """
+        Iterate all suppliers, page by page.
+        """
+        logging.info('Iterating all the suppliers')
+        return paginate(self.getSuppliers, query, take)
+
+    def exportSuppliers(self, query=None, take=100, concurrency=8, ordered=True, strict=False):
+        """
+        Bulk export all suppliers, pages read concurrently.
+        """
+        logging.info(f'Exporting all the suppliers, concurrency {concurrency}')
+        return Export(self.getSuppliers, query, take, concurrency, ordered, strict)
 
     def createSupplier(self, payload):
         """
@@ -64,12 +68,9 @@ class Coral(object):
         """
         logging.info(f'Creating supplier {payload}')
         rq = f'{self.host}/supplier'
-        agent=self.s.getAgent()
-        r = agent.post(rq, json=payload)
-        if 201 != r.status_code:
-            parseApiError(r)
+        supplier = self.s.call('post', rq, expect=201, json=payload)
+        if supplier is False:
             return False
-        supplier = json.loads(r.text)
         logging.info('Create supplier %s' % supplier['data']['id'])
         return supplier
 
@@ -85,25 +86,23 @@ class Coral(object):
             new_payload = dict(supplier.split("=") for supplier in params.split('&'))
             payload = {**payload, **new_payload}        
         rq = f'{self.host}/supplier/findByExtId'
-        agent=self.s.getAgent()
-        r = agent.get(rq, params=payload)
-        if 200 != r.status_code:
-            parseApiError(r)
-            return False
-        return json.loads(r.text) 
- 
+        return self.s.call('get', rq, params=payload)
+
+    def loadSupplierFromExt_id(self, ext_id:int):
+        """
+        Future of getSupplierFromExt_id, batched with the concurrent requests.
+        """
+        loader = self.s.getLoader('coral.supplierFromExt_id', self.getSupplierFromExt_id,
+            resource=f'{self.host}/supplier')
+        return loader.load(ext_id)
+
     def updateSupplier(self, supplier_id:int, payload):
         """
         Update supplier.
         """
         logging.info(f'Updating supplier {supplier_id} with {payload}')
         rq = f'{self.host}/supplier/{supplier_id}'
-        agent=self.s.getAgent()
-        r = agent.post(rq, json=payload)
-        if 200 != r.status_code:
-            parseApiError(r)
-            return False
-        return json.loads(r.text)
+        return self.s.call('post', rq, json=payload)
 
     #category
 
@@ -113,12 +112,7 @@ class Coral(object):
         """
         logging.info(f'Get category {category_id}')
         rq = f'{self.host}/category/{category_id}'
-        agent=self.s.getAgent()
-        r = agent.get(rq, params=params)
-        if 200 != r.status_code:
-            return False
-        category = json.loads(r.text)
-        return category
+        return self.s.call('get', rq, params=params)
 
     def getCategories(self, query=None):
         """
@@ -126,12 +120,7 @@ class Coral(object):
         """
         logging.info('Getting all the categories')
         rq = f'{self.host}/supplier'
-        agent=self.s.getAgent()
-        r = agent.get(rq, params=query)
-        if 200 != r.status_code:
-            return False
-        categories = json.loads(r.text)
-        return categories
+        return self.s.call('get', rq, params=query)
 
     def createCategory(self, payload):
         """
@@ -139,12 +128,9 @@ class Coral(object):
         """
         logging.info(f'Creating category {payload}')
         rq = f'{self.host}/category'
-        agent=self.s.getAgent()
-        r = agent.post(rq, json=payload)
-        if 201 != r.status_code:
-            parseApiError(r)
+        category = self.s.call('post', rq, expect=201, json=payload)
+        if category is False:
             return False
-        category = json.loads(r.text)
         logging.info('Create category %s' % category['data']['id'])
         return category
 
@@ -154,9 +140,4 @@ class Coral(object):
         """
         logging.info(f'Updating category {category_id} with {payload}')
         rq = f'{self.host}/category/{category_id}'
-        agent=self.s.getAgent()
-        r = agent.post(rq, json=payload)
-        if 200 != r.status_code:
-            parseApiError(r)
-            return False
-        return json.loads(r.text)
+        return self.s.call('post', rq, json=payload)
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Eb2 asyncio SDK
+"""
+
+import logging
+
+from gomma.aio import AsyncClient, mergeQuery
+
+
+class AsyncEb2(AsyncClient):
+    """
+    Eb2 asyncio class, same methods of Eb2.
+    """
+    service = 'eb2'
+
+    #company
+    async def getCompany(self, company_id: int, params=None):
+        """ Get company by id. """
+        logging.info(f'Get company {company_id}')
+        rq = f'{self.host}/company/{company_id}'
+        return await self._request('get', rq, params=params)
+
+    async def getCompanies(self, query=None):
+        """ Get all companies. """
+        logging.info('Getting all the companies')
+        rq = f'{self.host}/company'
+        return await self._request('get', rq, params=query)
+
+    async def createCompany(self, payload):
+        """ Create new company. """
+        logging.info(f'Creating company {payload}')
+        rq = f'{self.host}/company'
+        return await self._request('post', rq, expect=201, json=payload)
+
+    async def getCompanyFromExt_id(self, ext_id: str, params=None):
+        """ Get company from ext_id. """
+        logging.info(f'Search company ext_id {ext_id}.')
+        payload = mergeQuery({'ext_id': ext_id}, params)
+        rq = f'{self.host}/company/findByExtId'
+        return await self._request('get', rq, params=payload)
+
+    async def updateCompany(self, company_id: int, payload):
+        """ Update company. """
+        logging.info(f'Updating company {company_id} with {payload}')
+        rq = f'{self.host}/company/{company_id}'
+        return await self._request('post', rq, json=payload)
@@ -10,11 +10,11 @@ __author__ = "Davide Pellegrino"
 __version__ = "1.1.3"
 __date__ = "2020-01-20"
 
-import json
 import logging
 import time
 
-from gomma.session import Session, parseApiError
+from gomma.session import getSession
+from gomma.utility.paging import Export, paginate
 
 
 class Eb2(object):
@@ -27,7 +27,7 @@ class Eb2(object):
         Initialize main class with this and that.
         """
         logging.info('Init Eb2 SDK')
-        s = Session(profile_name)
+        s = getSession(profile_name)
         host=s.config.get('agapi_host')
         self.host = f'{host}/eb2'
         self.s = s
@@ -39,12 +39,7 @@ class Eb2(object):
         """
         logging.info(f'Get company {company_id}')
         rq = f'{self.host}/company/{company_id}'
-        agent=self.s.getAgent()
-        r = agent.get(rq, params=params)
-        if 200 != r.status_code:
-            return False
-        company = json.loads(r.text)
-        return company
+        return self.s.call('get', rq, params=params)
 
     def getCompanies(self, query=None):
         """
@@ -52,12 +47,21 @@ class Eb2(object):
         """
         logging.info('Getting all the companies')
         rq = f'{self.host}/company'
-        agent=self.s.getAgent()
-        r = agent.get(rq, params=query)
-        if 200 != r.status_code:
-            return False
-        companies = json.loads(r.text)
-        return companies
+        return self.s.call('get', rq, params=query)
+
+    def iterCompanies(self, query=None, take=100):
+        """
+        Iterate all companies, page by page.
+        """
+        logging.info('Iterating all the companies')
+        return paginate(self.getCompanies, query, take)
+
+    def exportCompanies(self, query=None, take=100, concurrency=8, ordered=True, strict=False):
+        """
+        Bulk export all companies, pages read concurrently.
+        """
+        logging.info(f'Exporting all the companies, concurrency {concurrency}')
+        return Export(self.getCompanies, query, take, concurrency, ordered, strict)
 
     def createCompany(self, payload):
         """
@@ -65,12 +69,9 @@ class Eb2(object):
         """
         logging.info(f'Creating company {payload}')
         rq = f'{self.host}/company'
-        agent=self.s.getAgent()
-        r = agent.post(rq, json=payload)
-        if 201 != r.status_code:
-            parseApiError(r)
+        company = self.s.call('post', rq, expect=201, json=payload)
+        if company is False:
             return False
-        company = json.loads(r.text)
         logging.info('Create company %s' % company['data']['id'])
         return company
 
@@ -86,12 +87,7 @@ class Eb2(object):
             new_payload = dict(company.split("=") for company in params.split('&'))
             payload = {**payload, **new_payload}        
         rq = f'{self.host}/company/findByExtId'
-        agent=self.s.getAgent()
-        r = agent.get(rq, params=payload)
-        if 200 != r.status_code:
-            parseApiError(r)
-            return False
-        return json.loads(r.text) 
+        return self.s.call('get', rq, params=payload)
  
     def updateCompany(self, company_id:int, payload):
         """
@@ -99,9 +95,4 @@ class Eb2(object):
         """
         logging.info(f'Updating company {company_id} with {payload}')
         rq = f'{self.host}/company/{company_id}'
-        agent=self.s.getAgent()
-        r = agent.post(rq, json=payload)
-        if 200 != r.status_code:
-            parseApiError(r)
-            return False
-        return json.loads(r.text)
+        return self.s.call('post', rq, json=payload)
@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Element asyncio SDK
+"""
+
+import logging
+
+from gomma.aio import AsyncClient, mergeQuery
+
+
+class AsyncElement(AsyncClient):
+    """
+    Element asyncio class, same methods of Element.
+    """
+    service = 'element'
+
+    # item
+    async def getItem(self, item_id: int, params=None):
+        """ Get item by id. """
+        logging.info(f'Get item {item_id}')
+        rq = f'{self.host}/item/{item_id}'
+        return await self._request('get', rq, params=params)
+
+    async def getItems(self, query=None):
+        """ Get items. """
+        logging.info('Getting all the items')
+        rq = f'{self.host}/item'
+        return await self._request('get', rq, params=query)
+
+    async def createItem(self, payload):
+        """ Create new item. """
+        logging.info(f'Creating item {payload}')
+        rq = f'{self.host}/item'
+        return await self._request('post', rq, expect=201, json=payload)
+
+    async def getItemFromExt_id(self, ext_id: str, params: dict = None):
+        """ Get item from ext_id. """
+        logging.info(f'Search item ext_id {ext_id}.')
+        payload = mergeQuery({'ext_id': ext_id}, params)
+        rq = f'{self.host}/item/findByExtId'
+        return await self._request('get', rq, params=payload)
+
+    async def getItemFromCode(self, item_code: str, params=None):
+        """ Get item from code. """
+        logging.info(f'Search item code {item_code}.')
+        payload = mergeQuery({'code': item_code}, params)
+        rq = f'{self.host}/item/findByCode'
+        return await self._request('get', rq, params=payload)
+
+    async def getItemFromErpId(self, erp_id: int, ext_id: str):
+        """ Get item from ext_id of Erp. """
+        logging.info(f'Search item ext_id {ext_id} for erp {erp_id}.')
+        rq = f'{self.host}/item/findByErpExtId'
+        payload = {
+            'erp_id': erp_id,
+            'ext_id': ext_id
+        }
+        return await self._request('get', rq, params=payload)
+
+    async def updateItem(self, item_id: int, payload):
+        """ Update item. """
+        logging.info(f'Updating item {item_id} with {payload}')
+        rq = f'{self.host}/item/{item_id}'
+        return await self._request('post', rq, json=payload)
+
+    async def patchItem(self, item_id: int, payload):
+        """ Patch know item field. """
+        logging.info(f'Patching item {item_id} with {payload}')
+        rq = f'{self.host}/item/{item_id}'
+        return await self._request('patch', rq, json=payload)
+
+    async def createItemAttribute(self, item_id: int, payload):
+        """ Create new item attributes. """
+        logging.info(f'Creating item {item_id} attributes {payload}')
+        rq = f'{self.host}/item/{item_id}/attribute'
+        return await self._request('post', rq, json=payload)
+
+    async def syncItemNorm(self, item_id: int, payload):
+        """ Sync item norm. """
+        logging.info(f'Sync item {item_id} norm {payload}')
+        rq = f'{self.host}/item/{item_id}/norm'
+        return await self._request('post', rq, expect=204, parse=False, json=payload)
+
+    async def itemAddCad(self, item_id: int, localFile):
+        """ Add cad file to the item. """
+        logging.info(f'Add cad {localFile} to item {item_id}')
+        rq = f'{self.host}/item/{item_id}/cad'
+        with open(localFile, 'rb') as fin:
+            return await self._request('post', rq, expect=201, files={'src': fin})
+
+    async def itemDeleteCad(self, item_id: int, cad_id: int):
+        """ Remove cad file from the item. """
+        logging.info(f'Delete cad {cad_id} from item {item_id}')
+        rq = f'{self.host}/item/{item_id}/cad/{cad_id}'
+        return await self._request('delete', rq, expect=204, parse=False)
+
+    async def itemAddCompetitor(self, item_id: int, payload):
+        """ Add item competitor cross reference. """
+        logging.info(f'Add xref item {item_id} {payload}')
+        rq = f'{self.host}/item/{item_id}/xcompetitor'
+        return await self._request('post', rq, expect=201, parse=False, json=payload)
+
+    async def itemUpdateCompetitor(self, item_id: int, xref_id: int, code):
+        """ Update item competitor cross reference. """
+        logging.info(f'Update competitor {xref_id} with code {code}')
+        rq = f'{self.host}/item/{item_id}/xcompetitor/{xref_id}'
+        return await self._request('post', rq, parse=False, json={'code': code})
+
+    async def itemDeleteCompetitor(self, item_id: int, competitor_id: int):
+        """ Remove item competitor cross reference. """
+        logging.info(f'Removing competitor {competitor_id} from item {item_id}')
+        rq = f'{self.host}/item/{item_id}/xcompetitor/{competitor_id}'
+        return await self._request('delete', rq, expect=204, parse=False)
+
+    async def itemAddWarehouse(self, item_id: int, payload):
+        """ Attach warehouse to the item. """
+        logging.info(f'Add warehouse at {item_id} - {payload}')
+        rq = f'{self.host}/item/{item_id}/warehouse'
+        return await self._request('post', rq, expect=204, parse=False, json=payload)
+
+    async def itemRemoveWarehouse(self, item_id: int, warehouse_id: int):
+        """ Detach warehouse from the item. """
+        logging.info(f'Remove warehouse {warehouse_id} @ item {item_id}')
+        rq = f'{self.host}/item/{item_id}/warehouse/{warehouse_id}'
+        return await self._request('delete', rq, expect=204, parse=False)
+
+    async def itemPatchWarehouse(self, item_id: int, warehouse_id: int, payload):
+        """ Patch item warehouse. """
+        logging.info(f'Patching item {item_id}@warehouse {warehouse_id} - {payload}')
+        rq = f'{self.host}/item/{item_id}/warehouse/{warehouse_id}'
+        return await self._request('patch', rq, expect=204, parse=False, json=payload)
+
+    # attribute
+    async def createAttribute(self, payload):
+        """ Create new attribute. """
+        logging.info(f'Creating new attribute {payload}')
+        rq = f'{self.host}/attribute'
+        return await self._request('post', rq, expect=201, json=payload)
+
+    async def getAttributes(self, query=None):
+        """ Read all attributes. """
+        logging.info('Getting all the attributes.')
+        rq = f'{self.host}/attribute'
+        return await self._request('get', rq, params=query)
+
+    async def getAttribute(self, attribute_id: int, params=None):
+        """ Attribute by id. """
+        logging.info(f'Get attribute {attribute_id}')
+        rq = f'{self.host}/attribute/{attribute_id}'
+        return await self._request('get', rq, params=params)
+
+    async def getAttributeByName(self, attribute_name: str, params=None):
+        """ Attribute by name. """
+        logging.info(f'Get attribute {attribute_name}')
+        payload = mergeQuery({'name': attribute_name}, params)
+        rq = f'{self.host}/attribute/findByName'
+        return await self._request('get', rq, params=payload)
+
+    async def updateAttribute(self, attribute_id: int, payload):
+        """ Update attribute. """
+        logging.info(f'Updating attribute {attribute_id} ...')
+        rq = f'{self.host}/attribute/{attribute_id}'
+        return await self._request('post', rq, json=payload)
+
+    # family
+    async def createFamily(self, payload):
+        """ Create new family. """
+        logging.info(f'Creating new family {payload}')
+        rq = f'{self.host}/family'
+        return await self._request('post', rq, expect=201, json=payload)
+
+    async def getFamilies(self, params=None):
+        """ Get families. """
+        logging.info(f'Getting all the families with params {params}')
+        rq = f'{self.host}/family'
+        return await self._request('get', rq, params=params)
+
+    async def getFamily(self, family_id: int, params=None):
+        """ Get family by id. """
+        logging.info(f'Reading family {family_id}')
+        rq = f'{self.host}/family/{family_id}'
+        return await self._request('get', rq, params=params)
+
+    async def updateFamily(self, family_id: int, payload):
+        """ Update family. """
+        logging.info(f'Updating family {family_id} ...')
+        rq = f'{self.host}/family/{family_id}'
+        return await self._request('post', rq, json=payload)
+
+    async def getFamilyFromCode(self, family_code: str, params=None):
+        """ Get family from code. """
+        logging.info(f'Get family {family_code}')
+        payload = mergeQuery({'code': family_code}, params)
+        rq = f'{self.host}/family/findByCode'
+        return await self._request('get', rq, params=payload)
+
+    async def patchFamily(self, family_id: int, payload):
+        """ Patch family. """
+        logging.info(f'Patching family {family_id} ')
+        rq = f'{self.host}/family/{family_id}'
+        return await self._request('patch', rq, json=payload)
+
+    async def patchFamilyCategory(self, family_id: int, category_id: int):
+        """ Set family category. """
+        logging.info(f'Patching family {family_id} with category {category_id}')
+        rq = f'{self.host}/family/{family_id}'
+        return await self._request('patch', rq, json={'category_id': category_id})
+
+    async def updateFamilyCover(self, family_id: int, localFile):
+        """ Update family cover. """
+        logging.info(f'Update family {family_id} cover with file {localFile}')
+        rq = f'{self.host}/family/{family_id}/cover'
+        with open(localFile, 'rb') as fin:
+            return await self._request('post', rq, files={'src': fin})
+
+    async def updateFamilyHq(self, family_id: int, localFile):
+        """ Update family HQ. """
+        logging.info(f'Update family {family_id} hq with file {localFile}')
+        rq = f'{self.host}/family/{family_id}/hq'
+        with open(localFile, 'rb') as fin:
+            return await self._request('post', rq, files={'src': fin})
+
+    async def attachFamilyNorm(self, family_id: int, norm_id: int):
+        """ Attach norm to family. """
+        logging.info(f'Attaching norm {norm_id} at family {family_id} ...')
+        rq = f'{self.host}/family/{family_id}/norm'
+        return await self._request('post', rq, expect=204, parse=False,
+            json={'norm_id': norm_id})
+
+    async def attachFamilyQuality(self, family_id: int, quality_id: int):
+        """ Attach quality to family. """
+        logging.info(f'Attach quality {quality_id} at family {family_id}')
+        rq = f'{self.host}/family/{family_id}/quality'
+        return await self._request('post', rq, expect=204, parse=False,
+            json={'quality_id': quality_id})
+
+    async def attachFamilyFeature(self, family_id: int, feature_id: int, description: str):
+        """ Attach feature to family. """
+        logging.info(f'Attaching feature {feature_id} at family {family_id}')
+        rq = f'{self.host}/family/{family_id}/feature'
+        payload = {
+            'feature_id': feature_id,
+            'description': description
+        }
+        return await self._request('post', rq, expect=204, parse=False, json=payload)
+
+    async def attachFamilyAttribute(self, family_id: int, attribute_id: int):
+        """ Add attribute to family. """
+        logging.info(f'Attaching attribute {attribute_id} to family {family_id}...')
+        rq = f'{self.host}/family/{family_id}/attribute'
+        return await self._request('post', rq, expect=204, parse=False,
+            json={'attribute_id': attribute_id})
+
+    async def attachFamilySorting(self, family_id: int, attribute_id: int):
+        """ Add attribute to family sorting. """
+        logging.info(f'Attaching attribute {attribute_id} to family {family_id} sorting...')
+        rq = f'{self.host}/family/{family_id}/sorting'
+        return await self._request('post', rq, expect=204, parse=False,
+            json={'attribute_id': attribute_id})
+
+    # feature
+    async def createFeature(self, feature_name: str):
+        """ Create new feature. """
+        logging.info(f'Creating new feature with name {feature_name}')
+        rq = f'{self.host}/feature'
+        return await self._request('post', rq, expect=201, json={'name': feature_name})
+
+    async def getFeature(self, feature_name: str):
+        """ Get feature by name. """
+        logging.info(f'Getting feature by name {feature_name}...')
+        rq = f'{self.host}/feature/findByName'
+        return await self._request('get', rq, params={'name': feature_name})
+
+    # crtable
+    async def createCrtable(self, payload):
+        """ Create new crimping table. """
+        logging.info(f'Creating new crtable {payload}')
+        rq = f'{self.host}/crtable'
+        return await self._request('post', rq, expect=201, json=payload)
+
+    async def getCrtable(self, crtable_id: int, params=None):
+        """ Get crimping table by id. """
+        logging.info(f'Get crtable {crtable_id}')
+        rq = f'{self.host}/crtable/{crtable_id}'
+        return await self._request('get', rq, params=params)
+
+    async def getCrtableFromSlug(self, slug: str):
+        """ Get crimping table by slug. """
+        logging.info(f'Get crtable slug {slug}')
+        rq = f'{self.host}/crtable/findBySlug'
+        return await self._request('get', rq, params={'slug': slug})
+
+    async def getCrtableFromName(self, name: str):
+        """ Get crimping table by name. """
+        logging.info(f'Get crtable name {name}')
+        rq = f'{self.host}/crtable/findByName'
+        return await self._request('get', rq, params={'name': name})
+
+    # crimping
+    async def createCrimping(self, crtable_id: int, payload):
+        """ Create crimping parameter for table. """
+        logging.info(f'Creating new crimping {payload}')
+        rq = f'{self.host}/crtable/{crtable_id}/crimping'
+        return await self._request('post', rq, expect=201, json=payload)
+
+    async def getCrimping(self, crtable_id: int, crimping_id: int, params=None):
+        """ Get crimping parameter from table. """
+        logging.info(f'Get crimping {crimping_id} from table {crtable_id}')
+        rq = f'{self.host}/crtable/{crtable_id}/crimping/{crimping_id}'
+        return await self._request('get', rq, params=params)
+
+    # hub
+    async def getHubByName(self, hub_name: str):
+        """ Get hub from name. """
+        logging.info(f'Search hub by name {hub_name}')
+        rq = f'{self.host}/hub/findByName'
+        return await self._request('get', rq, params={'name': hub_name})
+
+    async def createHub(self, hub_name: str):
+        """ Create new hub. """
+        logging.info(f'Creating new hub with name {hub_name}')
+        rq = f'{self.host}/hub'
+        return await self._request('post', rq, expect=201, json={'name': hub_name})
+
+    # category
+    async def createCategory(self, hub_id: int, category_name: str):
+        """ Create new category. """
+        logging.info(f'Creating new category with name {category_name} at hub {hub_id}')
+        rq = f'{self.host}/category'
+        payload = {
+            'hub_id': hub_id,
+            'name': category_name
+        }
+        return await self._request('post', rq, expect=201, json=payload)
+
+    async def getCategoryByName(self, category_name: str):
+        """ Get category from name. """
+        logging.info(f'Search category by name {category_name}')
+        rq = f'{self.host}/category/findByName'
+        return await self._request('get', rq, params={'name': category_name})
+
+    async def updateCategoryCover(self, category_id: int, localFile):
+        """ Update category cover. """
+        logging.info(f'Update category {category_id} cover with file {localFile}')
+        rq = f'{self.host}/category/{category_id}/cover'
+        with open(localFile, 'rb') as fin:
+            return await self._request('post', rq, files={'src': fin})
+
+    # catalog
+    async def listCatalog(self, query=None):
+        """ List catalogs. """
+        logging.info('List catalogs')
+        rq = f'{self.host}/catalog'
+        return await self._request('get', rq, params=query)
+
+    async def getCatalog(self, catalog_id: int, params=None):
+        """ Get catalog by ID. """
+        logging.info(f'Get catalog {catalog_id}')
+        rq = f'{self.host}/catalog/{catalog_id}'
+        return await self._request('get', rq, params=params)
+
+    async def getTree(self, catalog_id: int, tree_id: int, params=None):
+        """ Get catalog tree by ID. """
+        logging.info(f'Get catalog tree {catalog_id}')
+        rq = f'{self.host}/catalog/{catalog_id}/tree/{tree_id}'
+        return await self._request('get', rq, params=params)
+
+    async def getTreeLeaves(self, catalog_id: int, tree_id: int, params=None):
+        """ Get catalog tree leaves. """
+        logging.info(f'Get catalog tree {tree_id} into catalog {catalog_id}')
+        rq = f'{self.host}/catalog/{catalog_id}/tree/{tree_id}/leaf'
+        return await self._request('get', rq, params=params)
+
+    async def getTreeLeaf(self, catalog_id: int, tree_id: int, leaf_id: int, params=None):
+        """ Get catalog tree leaf ID. """
+        logging.info(f'Get catalog tree {catalog_id}')
+        rq = f'{self.host}/catalog/{catalog_id}/tree/{tree_id}/leaf/{leaf_id}'
+        return await self._request('get', rq, params=params)
+
+    # warehouse
+    async def listWarehouse(self, query=None):
+        """ Read all warehouse. """
+        logging.info('Reading all warehouses')
+        rq = f'{self.host}/warehouse'
+        return await self._request('get', rq, params=query)
+
+    async def getWarehouse(self, warehouse_id: int, params=None):
+        """ Get warehouse details. """
+        logging.info(f'Get warehouse {warehouse_id}')
+        rq = f'{self.host}/warehouse/{warehouse_id}'
+        return await self._request('get', rq, params=params)
+
+    async def createWarehouse(self, payload):
+        """ Create new warehouse. """
+        logging.info(f'Creating new warehouse {payload}')
+        rq = f'{self.host}/warehouse'
+        return await self._request('post', rq, expect=201, json=payload)
+
+    async def updateWarehouse(self, warehouse_id: int, payload):
+        """ Update warehouse. """
+        logging.info(f'Updating warehouse {warehouse_id} - {payload}')
+        rq = f'{self.host}/warehouse/{warehouse_id}'
+        return await self._request('post', rq, json=payload)
+
+    async def getWarehouseFromName(self, name: str, params=None):
+        """ Read warehouse from name. """
+        logging.info(f'Search warehouse from {name}')
+        payload = mergeQuery({'name': name}, params)
+        rq = f'{self.host}/warehouse/findByName'
+        return await self._request('get', rq, params=payload)
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Element catalog tree crawler.
+"""
+
+import logging
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from gomma.utility import codec
+from gomma.utility.paging import PagingError, paginate
+from gomma.utility.upsert import contentHash
+
+
+def related(data, *names):
+    """ First list relation of data among names, {'data': [...]} or [...]. """
+    for name in names:
+        value = data.get(name)
+        if isinstance(value, dict):
+            value = value.get('data')
+        if isinstance(value, list):
+            return value
+    return []
+
+
+def fingerprint(data):
+    """ updated_at of data, its content hash if missing. """
+    return data.get('updated_at') or contentHash(data)
+
+
+class CatalogTree(object):
+    """
+    In memory catalog tree: node keys are ('catalog', id), ('tree', catalog_id, tree_id)
+    and ('leaf', catalog_id, tree_id, leaf_id). Levels are fetched breadth first,
+    each one concurrently.
+    """
+
+    def __init__(self, element, concurrency=8, leafDetails=False, catalogParams=None):
+        """
+        Init empty tree of element catalogs.
+        """
+        self.el = element
+        self.concurrency = concurrency
+        self.leafDetails = leafDetails
+        self.catalogParams = catalogParams
+        self.catalogs = None
+        self.nodes = {}
+        self.parents = {}
+        self.children = {}
+        self.stats = {'nodes': 0, 'requests': 0, 'failed': 0, 'reused': 0, 'elapsed': 0.0}
+        self.__lock = threading.Lock()
+        self.__previous = None
+
+    def get(self, key):
+        """Node data."""
+        return self.nodes.get(tuple(key))
+
+    def getChildren(self, key):
+        """Child keys."""
+        return self.children.get(tuple(key), [])
+
+    def getParent(self, key):
+        """Parent key, None for catalogs."""
+        return self.parents.get(tuple(key))
+
+    def getPath(self, key):
+        """Keys from the catalog down to key."""
+        path = [tuple(key)]
+        while self.parents.get(path[0]):
+            path.insert(0, self.parents[path[0]])
+        return path
+
+    def walk(self, key=None):
+        """Yield (key, data) depth first from key, or from every catalog."""
+        stack = [tuple(key)] if key else list(reversed(self.roots()))
+        while stack:
+            node = stack.pop()
+            yield node, self.nodes.get(node)
+            stack.extend(reversed(self.getChildren(node)))
+
+    def roots(self):
+        """Catalog keys."""
+        return [key for key in self.nodes if 'catalog' == key[0]]
+
+    def crawl(self, catalogs=None):
+        """
+        Fetch catalogs (ids, all of them if None) and their subtrees.
+        """
+        start = time.perf_counter()
+        self.catalogs = catalogs
+        if catalogs is None:
+            level = [(('catalog', record['id']), None, self.__known(('catalog', record['id']), record))
+                for record in paginate(self.el.listCatalog, self.catalogParams)]
+        else:
+            level = [(('catalog', catalog_id), None, None) for catalog_id in catalogs]
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            depth = 0
+            while level:
+                logging.info(f'Crawling {len(level)} catalog nodes at depth {depth}')
+                fetched = pool.map(lambda node: self.__fetch(*node), level)
+                level = [child for children in fetched for child in children]
+                depth += 1
+        self.stats['nodes'] = len(self.nodes)
+        self.stats['elapsed'] = time.perf_counter() - start
+        logging.info(f"Crawled {self.stats['nodes']} nodes with {self.stats['requests']} "
+            f"requests in {self.stats['elapsed']:.1f}s")
+        return self
+
+    def refresh(self):
+        """
+        Crawl again, descending only into changed nodes: a node listed with
+        its stored updated_at is not fetched, a node equal to the stored one
+        keeps its subtree. Swaps in the new tree and returns the keys of the
+        nodes added, changed or removed; False when a request failed, the
+        current tree is kept.
+        """
+        fresh = CatalogTree(self.el, self.concurrency, self.leafDetails, self.catalogParams)
+        fresh.__previous = self
+        fresh.crawl(self.catalogs)
+        fresh.__previous = None
+        if fresh.stats['failed']:
+            logging.error(f"Catalog refresh incomplete ({fresh.stats['failed']} failed requests), "
+                'tree kept')
+            return False
+        changed = [key for key, data in fresh.nodes.items()
+            if key not in self.nodes or fingerprint(data) != fingerprint(self.nodes[key])]
+        changed += [key for key in self.nodes if key not in fresh.nodes]
+        with self.__lock:
+            self.nodes, self.parents, self.children = fresh.nodes, fresh.parents, fresh.children
+        self.stats = fresh.stats
+        logging.info(f"Catalog refresh: {len(changed)} nodes changed, {fresh.stats['reused']} "
+            f"reused, {fresh.stats['requests']} requests")
+        return changed
+
+    def drop(self, key):
+        """Remove node and its subtree."""
+        key = tuple(key)
+        for node, _ in list(self.walk(key)):
+            self.nodes.pop(node, None)
+            self.children.pop(node, None)
+            parent = self.parents.pop(node, None)
+            if parent and node in self.children.get(parent, []):
+                self.children[parent].remove(node)
+        return True
+
+    def snapshot(self):
+        """
+        Compact snapshot: zlib compressed json of [key, parent index, data] rows.
+        """
+        keys = list(self.nodes)
+        index = {key: i for i, key in enumerate(keys)}
+        rows = [[list(key), index.get(self.parents.get(key), -1), self.nodes[key]] for key in keys]
+        return zlib.compress(codec.dumps({'v': 1, 'nodes': rows}), 6)
+
+    def load(self, snapshot):
+        """Restore a snapshot."""
+        rows = codec.loads(zlib.decompress(snapshot))['nodes']
+        keys = [tuple(key) for key, _, _ in rows]
+        self.nodes, self.parents, self.children = {}, {}, {}
+        for key, (_, parent, data) in zip(keys, rows):
+            self.__add(key, keys[parent] if parent >= 0 else None, data)
+        self.stats['nodes'] = len(self.nodes)
+        return self
+
+    def __add(self, key, parent, data):
+        """ Store node. """
+        with self.__lock:
+            if key in self.nodes:
+                return False
+            self.nodes[key] = data
+            if parent:
+                self.parents[key] = parent
+                self.children.setdefault(parent, []).append(key)
+            return True
+
+    def __known(self, key, listed):
+        """ Stored data of key when listed with the same updated_at, None to fetch it. """
+        stored = self.__previous.nodes.get(key) if self.__previous else None
+        if stored is None or not listed.get('updated_at'):
+            return None
+        return stored if listed['updated_at'] == stored.get('updated_at') else None
+
+    def __reuse(self, key, data):
+        """ Copy the subtree of an unchanged node from the previous tree. """
+        previous = self.__previous
+        if previous is None or previous.nodes.get(key) != data:
+            return False
+        for node, stored in list(previous.walk(key))[1:]:
+            self.__add(node, previous.getParent(node), stored)
+        with self.__lock:
+            self.stats['reused'] += 1
+        return True
+
+    def __call(self, fn, *args):
+        """ API call, data or False. """
+        self.stats['requests'] += 1
+        x = fn(*args)
+        if x is False:
+            self.stats['failed'] += 1
+            return False
+        return x
+
+    def __fetch(self, key, parent, data):
+        """
+        Fetch node (unless data is known), store it, returns next level nodes.
+        """
+        kind = key[0]
+        if data is None:
+            if 'catalog' == kind:
+                x = self.__call(self.el.getCatalog, key[1], self.catalogParams)
+            elif 'tree' == kind:
+                x = self.__call(self.el.getTree, *key[1:])
+            else:
+                x = self.__call(self.el.getTreeLeaf, *key[1:])
+            if x is False:
+                return []
+            data = x.get('data', x)
+        if not self.__add(key, parent, data):
+            return []
+        if 'leaf' != kind and self.__reuse(key, data):
+            return []
+        if 'catalog' == kind:
+            return [(('tree', key[1], tree['id']), key, self.__known(('tree', key[1], tree['id']), tree))
+                for tree in related(data, 'trees', 'tree', 'children')]
+        if 'tree' == kind:
+            catalog_id, tree_id = key[1:]
+            nodes = [(('tree', catalog_id, tree['id']), key,
+                self.__known(('tree', catalog_id, tree['id']), tree))
+                for tree in related(data, 'children', 'trees')]
+            leaves = paginate(lambda params: self.__call(self.el.getTreeLeaves,
+                catalog_id, tree_id, params), prefetch=False, strict=True)
+            try:
+                for leaf in leaves:
+                    leafKey = ('leaf', catalog_id, tree_id, leaf['id'])
+                    nodes.append((leafKey, key, self.__known(leafKey, leaf) if self.leafDetails else leaf))
+            except PagingError:
+                logging.error(f'Unable to read all the leaves of tree {tree_id}')
+            return nodes
+        return []
@@ -10,11 +10,24 @@ __author__ = "Davide Pellegrino"
 __version__ = "2.1.1"
 __date__ = "2019-11-04"
 
-import json
 import logging
 import time
+from urllib.parse import urlsplit
 
-from gomma.session import Session, parseApiError
+from gomma.element.catalog import CatalogTree
+from gomma.element.relations import syncRelations
+from gomma.element.replica import Replica
+from gomma.element.stock import StockWriter, reconcile, snapshotRows
+from gomma.session import getSession
+from gomma.utility import codec
+from gomma.utility.assets import AssetManifest, hashFiles
+from gomma.utility.delta import deltaSync
+from gomma.utility.diff import diffRecord
+from gomma.utility.multipart import MultipartEncoder, uploadMany
+from gomma.utility.paging import Export, PagingError, paginate
+from gomma.utility.upsert import HashStore, Upsert
+
+UPLOAD_METHODS = ('itemAddCad', 'updateFamilyCover', 'updateFamilyHq', 'updateCategoryCover')
 
 
 class Element(object):
@@ -27,24 +40,183 @@ class Element(object):
         Initialize main class with this and that.
         """
         logging.info('Init Element SDK')
-        s = Session(profile_name)
+        s = getSession(profile_name)
         host = s.config.get('agapi_host')
         self.host = f'{host}/element'
         self.s = s
+        self.patchDiff = s.config.getboolean('patch_diff', False)
+        self.manifest = False
+        self.replica = False
+        if s.config.getboolean('replica', False):
+            self.useReplica()
+
+    def useReplica(self, path=None, maxAge=None):
+        """
+        Serve item, family, attribute and warehouse lookups from a local
+        SQLite replica (see Replica.sync) synced within maxAge seconds.
+        """
+        if maxAge is None:
+            maxAge = self.s.config.getfloat('replica_max_age', 3600)
+        if self.replica:
+            self.s.invalidator.removeListener(self.replica.forget)
+        self.replica = Replica(self, path or self.s.config.get('replica_path'), maxAge)
+        # held weakly: a dropped Element leaves the shared invalidator
+        self.s.invalidator.addListener(self.replica.forget, weak=True)
+        return self.replica
+
+    def __fromReplica(self, table, column, value, params=None):
+        """ Replica record as {'data': record}, None to ask the API. """
+        if not self.replica or params:
+            return None
+        record = self.replica.find(table, column, value)
+        if record is None:
+            return None
+        return {'data': record}
+
+    def __patch(self, rq, payload, diff=None):
+        """
+        Patch rq, with diff only the fields changed from the last known
+        state are sent and nothing is sent when none changed.
+        """
+        if diff is None:
+            diff = self.patchDiff
+        if not diff:
+            return self.s.call('patch', rq, json=payload)
+        states = self.s.getStates()
+        path = urlsplit(rq).path.lower()
+        state = states.get(path)
+        if state is None:
+            current = self.s.call('get', rq)
+            if current is False:
+                return self.s.call('patch', rq, json=payload)
+            state = current['data']
+            states.stats['fetched'] += 1
+            states.set(path, state)
+        changes = diffRecord(state, payload)
+        size = len(codec.dumps(payload))
+        if not changes:
+            logging.info(f'Nothing to patch on {path}')
+            states.stats['skipped'] += 1
+            states.stats['bytes_saved'] += size
+            return {'data': state}
+        x = self.s.call('patch', rq, json=changes)
+        if x is False:
+            states.drop(path)
+            return False
+        sent = len(codec.dumps(changes))
+        states.stats['patches'] += 1
+        states.stats['bytes_sent'] += sent
+        states.stats['bytes_saved'] += size - sent
+        if isinstance(x, dict) and isinstance(x.get('data'), dict):
+            states.set(path, x['data'])
+        else:
+            states.update(path, changes)
+        return x
+
+    def __upload(self, rq, localFile, expect=200, callback=None):
+        """ Stream localFile as multipart src field. """
+        with MultipartEncoder(files={'src': localFile}, callback=callback) as body:
+            return self.s.call('post', rq, expect=expect, data=body,
+                headers={'content-type': body.contentType})
+
+    def uploadAssets(self, jobs, concurrency=4, callback=None):
+        """
+        Upload many files at once, jobs are (method, id, localFile) with method
+        itemAddCad, updateFamilyCover, updateFamilyHq or updateCategoryCover.
+        Returns the results in jobs order.
+        """
+        jobs = list(jobs)
+        logging.info(f'Uploading {len(jobs)} files, {concurrency} at once')
+        calls = []
+        for method, resource_id, localFile in jobs:
+            if method not in UPLOAD_METHODS:
+                raise ValueError(f'{method} is not an upload method')
+            upload = getattr(self, method)
+            calls.append(lambda upload=upload, r=resource_id, f=localFile: upload(r, f, callback))
+        results = [False] * len(jobs)
+        for i, result in uploadMany(calls, concurrency):
+            results[i] = result
+        return results
+
+    def syncAssets(self, jobs, concurrency=4, callback=None, force=False):
+        """
+        Upload only the files changed since their last successful upload,
+        jobs as in uploadAssets, one per method and resource. The item cad
+        synced replaces the previous one, whatever its file name, which is
+        deleted. Returns per job 'unchanged', the upload result or False.
+        """
+        jobs = list(jobs)
+        seen = set()
+        for method, resource_id, _ in jobs:
+            if method not in UPLOAD_METHODS:
+                raise ValueError(f'{method} is not an upload method')
+            if (method, resource_id) in seen:
+                raise ValueError(f'More than one {method} file for {resource_id}')
+            seen.add((method, resource_id))
+        if not self.manifest:
+            self.manifest = AssetManifest(self.s.profile_name, self.s.config.get('assets_manifest_path'))
+        hashes = hashFiles([localFile for _, _, localFile in jobs], concurrency)
+        results = ['unchanged'] * len(jobs)
+        calls = []
+        indexes = []
+        for i, (method, resource_id, localFile) in enumerate(jobs):
+            digest = hashes[localFile]
+            if digest is None:
+                results[i] = False
+                continue
+            key = self.manifest.key(method, resource_id)
+            entry = self.manifest.get(key)
+            if entry and entry['hash'] == digest and not force:
+                logging.debug(f'{localFile} unchanged, skip {method} {resource_id}')
+                if entry.get('stale'):
+                    calls.append(lambda job=(resource_id, key, entry): self.__retryStale(*job))
+                    indexes.append(i)
+                continue
+            calls.append(lambda job=(method, resource_id, localFile, key, digest, entry):
+                self.__syncAsset(*job, callback))
+            indexes.append(i)
+        logging.info(f'Uploading {len(calls)} changed files of {len(jobs)}')
+        for i, result in uploadMany(calls, concurrency):
+            results[indexes[i]] = result
+        return results
+
+    def __syncAsset(self, method, resource_id, localFile, key, digest, entry, callback=None):
+        """ Upload one asset and update the manifest. """
+        x = getattr(self, method)(resource_id, localFile, callback)
+        if x is False:
+            return False
+        data = x.get('data') if isinstance(x, dict) else None
+        asset_id = data.get('id') if isinstance(data, dict) else None
+        stale = list(entry.get('stale', [])) if entry else []
+        if 'itemAddCad' == method and entry and entry.get('id') and entry['id'] != asset_id:
+            logging.info(f'Replacing item {resource_id} cad {entry["id"]} with {asset_id}')
+            stale.append(entry['id'])
+        self.manifest.set(key, digest, asset_id, self.__deleteCads(resource_id, stale))
+        return x
+
+    def __retryStale(self, item_id, key, entry):
+        """ Delete the replaced cads of an unchanged item cad. """
+        self.manifest.set(key, entry['hash'], entry['id'], self.__deleteCads(item_id, entry['stale']))
+        return 'unchanged'
+
+    def __deleteCads(self, item_id, cad_ids):
+        """ Delete replaced item cads, returns the ids to retry on next sync. """
+        failed = [cad_id for cad_id in cad_ids if self.itemDeleteCad(item_id, cad_id, missing=True) is False]
+        if failed:
+            logging.warning(f'Unable to delete item {item_id} cads {failed}, retried on next sync')
+        return failed
 
     # item
     def getItem(self, item_id: int, params=None):
         """
         Legge un item dal suo id.
         """
+        local = self.__fromReplica('item', 'id', item_id, params)
+        if local:
+            return local
         logging.info(f'Get item {item_id}')
         rq = f'{self.host}/item/{item_id}'
-        agent = self.s.getAgent()
-        r = agent.get(rq, params=params)
-        if 200 != r.status_code:
-            return False
-        item = json.loads(r.text)
-        return item
+        return self.s.call('get', rq, params=params)
 
     def getItems(self, query=None):
         """
@@ -52,12 +224,35 @@ class Element(object):
         """
         logging.info('Getting all the items')
         rq = '%s/item' % (self.host)
-        agent = self.s.getAgent()
-        r = agent.get(rq, params=query)
-        if 200 != r.status_code:
-            return False
-        _items = json.loads(r.text)
-        return _items
+        return self.s.call('get', rq, params=query)
+
+    def iterItems(self, query=None, take=100):
+        """
+        Iterate all items, page by page.
+        """
+        logging.info('Iterating all the items')
+        return paginate(self.getItems, query, take)
+
+    def exportItems(self, query=None, take=100, concurrency=8, ordered=True, strict=False):
+        """
+        Bulk export all items, pages read concurrently.
+        """
+        logging.info(f'Exporting all the items, concurrency {concurrency}')
+        return Export(self.getItems, query, take, concurrency, ordered, strict)
+
+    def syncItemsDelta(self, apply=None, query=None):
+        """
+        Fetch the items changed since the last run into apply(records),
+        the replica when in use, or the local record store. Returns the report.
+        """
+        if apply is None and self.replica:
+            report = deltaSync(self.s, self.getItems, 'element.item',
+                lambda records: self.replica.apply('item', records), query,
+                f'element.item@{self.replica.path}')
+            if report['complete']:
+                self.replica.touch('item')
+            return report
+        return deltaSync(self.s, self.getItems, 'element.item', apply, query)
 
     def createItem(self, payload):
         """
@@ -65,19 +260,19 @@ class Element(object):
         """
         logging.info('Creating item %s' % payload)
         rq = '%s/item' % (self.host)
-        agent = self.s.getAgent()
-        r = agent.post(rq, json=payload)
-        if 201 != r.status_code:
-            parseApiError(r)
+        item = self.s.call('post', rq, expect=201, json=payload)
+        if item is False:
             return False
-        item = json.loads(r.text)
         logging.info('Create item %s' % item['data']['id'])
         return item
 
-    def getItemFromExt_id(self, ext_id: str, params: dict = {}):
+    def getItemFromExt_id(self, ext_id: str, params: dict = {}, missing=False):
         """
-        Get item from ext_id.
+        Get item from ext_id, missing if not found.
         """
+        local = self.__fromReplica('item', 'ext_id', ext_id, params)
+        if local:
+            return local
         logging.info(f'Search item ext_id {ext_id}.')
         payload = {
             'ext_id': ext_id
@@ -85,17 +280,15 @@ class Element(object):
         if params:
             payload.update(params)
         rq = f'{self.host}/item/findByExtId'
-        agent = self.s.getAgent()
-        r = agent.get(rq, params=payload)
-        if 200 != r.status_code:
-            parseApiError(r)
-            return False
-        return json.loads(r.text)
+        return self.s.call('get', rq, params=payload, missing=missing)
 
-    def getItemFromCode(self, item_code: str, params=None):
+    def getItemFromCode(self, item_code: str, params=None, missing=False):
         """
-        Get item from code
+        Get item from code, missing if not found.
         """
+        local = self.__fromReplica('item', 'code', item_code, params)
+        if local:
+            return local
         logging.info(f'Search item code {item_code}.')
         payload = {
             'code': item_code
@@ -104,12 +297,7 @@ class Element(object):
             new_payload = dict(item.split("=") for item in params.split('&'))
             payload = {**payload, **new_payload}
         rq = f'{self.host}/item/findByCode'
-        agent = self.s.getAgent()
-        r = agent.get(rq, params=payload)
-        if 200 != r.status_code:
-            parseApiError(r)
-            return False
-        return json.loads(r.text)
+        return self.s.call('get', rq, params=payload, missing=missing)
 
     def getItemFromErpId(self, erp_id: int, ext_id: str):
         """
@@ -121,12 +309,16 @@ class Element(object):
             'erp_id': erp_id,
             'ext_id': ext_id
         }
-        agent = self.s.getAgent()
-        r = agent.get(rq, params=payload)
-        if 200 != r.status_code:
-            parseApiError(r)
-            return False
-        return json.loads(r.text)
+        return self.s.call('get', rq, params=payload)
+
+    def loadItemFromErpId(self, erp_id: int, ext_id: str):
+        """
+        Future of getItemFromErpId: keys requested together are
+        deduplicated and resolved concurrently.
+        """
+        loader = self.s.getLoader('element.itemFromErpId', lambda key: self.getItemFromErpId(*key),
+            resource=f'{self.host}/item')
+        return loader.load((erp_id, ext_id))
 
     def updateItem(self, item_id: int, payload):
         """
@@ -134,26 +326,34 @@ class Element(object):
         """
         logging.info(f'Updating item {item_id} with {payload}')
         rq = '%s/item/%s' % (self.host, item_id)
-        agent = self.s.getAgent()
-        r = agent.post(rq, json=payload)
-        if 200 != r.status_code:
-            parseApiError(r)
-            return False
-        return json.loads(r.text)
+        return self.s.call('post', rq, json=payload)
 
-    def patchItem(self, item_id: int, payload):
+    def patchItem(self, item_id: int, payload, diff=None):
         """
-        Patch know item field.
+        Patch know item field, with diff (default patch_diff) only the changed ones.
         """
         logging.info(f'Patching item {item_id} with {payload}')
         rq = '%s/item/%s' % (self.host, item_id)
-        agent = self.s.getAgent()
-        r = agent.patch(rq, json=payload)
-        if 200 != r.status_code:
-            parseApiError(r)
-            return False
-        item = json.loads(r.text)
-        return item
+        return self.__patch(rq, payload, diff)
+
+    def bulkUpsertItems(self, records, key='code', concurrency=8, rate=None, force=False):
+        """
+        Create or update items read from records (any iterable of payloads):
+        items resolved by key, code (getItemFromCode) or ext_id (getItemFromExt_id),
+        records unchanged since the last run are skipped.
+        Iterate the result for per record outcome, see Upsert.
+        """
+        resolvers = {
+            'code': lambda code: self.getItemFromCode(code, missing=None),
+            'ext_id': lambda ext_id: self.getItemFromExt_id(ext_id, missing=None)
+        }
+        if key not in resolvers:
+            raise ValueError(f'Unable to resolve items by {key}, use one of {list(resolvers)}')
+        logging.info(f'Bulk upsert items by {key}, {concurrency} at once')
+        name = f'ag:gomma:upsert:{self.s.profile_name}:element:item'
+        hashes = HashStore(self.s.cache, name if 'code' == key else f'{name}:{key}')
+        return Upsert(records, resolvers[key], self.createItem, self.updateItem,
+            key=key, hashes=hashes, concurrency=concurrency, rate=rate, force=force)
 
     def createItemAttribute(self, item_id: int, payload):
         """
@@ -161,12 +361,7 @@ class Element(object):
         """
         logging.info(f'Creating item {item_id} attributes {payload}')
         rq = '%s/item/%s/attribute' % (self.host, item_id)
-        agent = self.s.getAgent()
-        r = agent.post(rq, json=payload)
-        if 200 != r.status_code:
-            parseApiError(r)
-            return False
-        return json.loads(r.text)
+        return self.s.call('post', rq, json=payload)
 
     def syncItemNorm(self, item_id: int, payload):
         """
@@ -174,61 +369,32 @@ class Element(object):
         """
         logging.info(f'Sync item {item_id} norm {payload}')
         rq = '%s/item/%s/norm' % (self.host, item_id)
-        agent = self.s.getAgent()
-        r = agent.post(rq, json=payload)
-        if 204 != r.status_code:
-            parseApiError(r)
+        if not self.s.call('post', rq, expect=204, parse=False, json=payload):
             return False
         logging.info(f'Sync item {item_id} norms complete')
         return True
 
-    def itemAddCad(self, item_id: int, localFile):
+    def itemAddCad(self, item_id: int, localFile, callback=None):
         """ 
         Aggiunge un file cad all'item. 
         """
-        logging.info('')
+        logging.info(f'Add item {item_id} cad {localFile}')
         rq = '%s/item/%s/cad' % (self.host, item_id)
-        fin = open(localFile, 'rb')
-        files = {'src': fin}
-        try:
-            agent = self.s.getAgent()
-            r = agent.post(rq, files=files)
-        except Exception:
-            logging.exception("Exception occurred")
-            return False
-        if 201 != r.status_code:
-            parseApiError(r)
-            return False
-        cad = json.loads(r.text)
-        return cad
+        return self.__upload(rq, localFile, 201, callback)
 
-    def itemDeleteCad(self, item_id: int, cad_id: int):
+    def itemDeleteCad(self, item_id: int, cad_id: int, missing=False):
         """ 
-        Elimina un file cad dall'item. 
+        Elimina un file cad dall'item, missing se non esiste. 
         """
         logging.info('')
         rq = f'{self.host}/item/{item_id}/cad/{cad_id}'
-        try:
-            agent = self.s.getAgent()
-            r = agent.delete(rq)
-        except Exception:
-            logging.exception("Exception occurred")
-            return False
-        if 204 != r.status_code:
-            parseApiError(r)
-            return False
-        return True
+        return self.s.call('delete', rq, expect=204, parse=False, missing=missing)
 
     def itemAddCompetitor(self, item_id: int, payload):
         """ attach warehouse to the item"""
         logging.info(f'Add xref item {item_id} {payload}')
         rq = f'{self.host}/item/{item_id}/xcompetitor'
-        agent = self.s.getAgent()
-        r = agent.post(rq, json=payload)
-        if 201 != r.status_code:
-            parseApiError(r)
-            return False
-        return True
+        return self.s.call('post', rq, expect=201, parse=False, json=payload)
 
     def itemUpdateCompetitor(self, item_id: int, xref_id: int, code):
         """ update item competitor cross reference"""
@@ -237,70 +403,73 @@ class Element(object):
             'code': code
         }
         rq = f'{self.host}/item/{item_id}/xcompetitor/{xref_id}'
-        agent = self.s.getAgent()
-        r = agent.post(rq, json=payload)
-        if 200 != r.status_code:
-            parseApiError(r)
-            return False
-        return True
+        return self.s.call('post', rq, parse=False, json=payload)
 
     def itemDeleteCompetitor(self, item_id: int, competitor_id: int):
         """ Remove item competitor cross reference"""
         logging.info(
             f'Removing competitor {competitor_id} from item {item_id}')
         rq = f'{self.host}/item/{item_id}/xcompetitor/{competitor_id}'
-        agent = self.s.getAgent()
-        r = agent.delete(rq)
-        if 204 != r.status_code:
-            parseApiError(r)
-            return False
-        return True
+        return self.s.call('delete', rq, expect=204, parse=False)
 
     def itemAddWarehouse(self, item_id: int, payload):
         """ attach warehouse to the item"""
         logging.info(f'Add warehouse at {item_id} - {payload}')
         rq = f'{self.host}/item/{item_id}/warehouse'
-        agent = self.s.getAgent()
-        r = agent.post(rq, json=payload)
-        if 204 != r.status_code:
-            parseApiError(r)
-            return False
-        return True
+        return self.s.call('post', rq, expect=204, parse=False, json=payload)
 
     def itemRemoveWarehouse(self, item_id: int, warehouse_id: int):
         """ attach warehouse to the item"""
         logging.info(f'Remove warehouse {warehouse_id} @ item {item_id}')
         rq = f'{self.host}/item/{item_id}/warehouse/{warehouse_id}'
-        agent = self.s.getAgent()
-        r = agent.delete(rq)
-        if 204 != r.status_code:
-            parseApiError(r)
-            return False
-        return True
+        return self.s.call('delete', rq, expect=204, parse=False)
 
     def itemPatchWarehouse(self, item_id: int, warehouse_id: int, payload):
         """ attach warehouse to the item"""
         logging.info(
             f'Patching item {item_id}@warehouse {warehouse_id} - {payload}')
         rq = f'{self.host}/item/{item_id}/warehouse/{warehouse_id}'
-        agent = self.s.getAgent()
-        r = agent.patch(rq, json=payload)
-        if 204 != r.status_code:
-            parseApiError(r)
-            return False
-        return True
+        return self.s.call('patch', rq, expect=204, parse=False, json=payload)
+
+    def stockSnapshot(self, query=None, concurrency=8):
+        """
+        Current (item_id, warehouse_id, quantity) rows, read by a bulk export
+        of the items with their warehouses (stock_include, stock_field).
+        Raises PagingError when a page fails: a partial snapshot would be
+        reconciled as spurious adds and removes.
+        """
+        query = query or self.s.config.get('stock_include', 'include=warehouses')
+        items = Export(self.getItems, query, 200, concurrency, ordered=False, strict=True)
+        return list(snapshotRows(items, self.s.config.get('stock_field', 'quantity')))
+
+    def reconcileStock(self, feed, current=None, remove=False, concurrency=8, dryRun=False):
+        """
+        Align warehouse stock with feed, (item_id, warehouse_id, quantity) rows:
+        only new, changed and, with remove, missing rows are written.
+        current defaults to stockSnapshot(). Returns the writer stats
+        (the planned adds, patches and removes with dryRun), False when
+        the current stock could not be read completely.
+        """
+        if current is None:
+            try:
+                current = self.stockSnapshot(concurrency=concurrency)
+            except PagingError as e:
+                logging.error(f'Stock snapshot incomplete, reconciliation aborted: {e}')
+                return False
+        adds, patches, removes = reconcile(current, feed, remove)
+        if dryRun:
+            return {'adds': adds, 'patches': patches, 'removes': removes}
+        writer = StockWriter(self, concurrency, self.s.config.get('stock_field', 'quantity'))
+        return writer.write(adds, patches, removes)
 
     # attribute
     def createAttribute(self, payload):
         """ crea un nuovo attributo """
         logging.info('Creating new attribute %s' % payload)
         rq = f'{self.host}/attribute'
-        agent = self.s.getAgent()
-        r = agent.post(rq, json=payload)
-        if 201 != r.status_code:
-            parseApiError(r)
+        attribute = self.s.call('post', rq, expect=201, json=payload)
+        if attribute is False:
             return False
-        attribute = json.loads(r.text)
         logging.info('Create attribute %s' % attribute['data']['id'])
         return attribute
 
@@ -310,26 +479,19 @@ class Element(object):
         """
         logging.info('Getting all the attributes.')
         rq = f'{self.host}/attribute'
-        agent = self.s.getAgent()
-        r = agent.get(rq, params=query)
-        if 200 != r.status_code:
-            return False
-        attributes = json.loads(r.text)
-        return attributes
+        return self.s.call('get', rq, params=query)
 
     def getAttribute(self, attribute_id: int, params=None):
         """ Attribute by id """
         logging.info(f'Get attribute {attribute_id}')
         rq = f'{self.host}/attribute/{attribute_id}'
-        agent = self.s.getAgent()
-        r = agent.get(rq, params=params)
-        if 200 != r.status_code:
-            parseApiError(r)
-            return False
-        return json.loads(r.text)
+        return self.s.call('get', rq, params=params)
 
     def getAttributeByName(self, attribute_name: str, params=None):
         """ Attribute by name """
+        local = self.__fromReplica('attribute', 'name', attribute_name, params)
+        if local:
+            return local
         payload = {
             'name': attribute_name
         }
@@ -338,12 +500,7 @@ class Element(object):
             payload = {**payload, **new_payload}
         logging.info(f'Get attribute {attribute_name}')
         rq = f'{self.host}/attribute/findByName'
-        agent = self.s.getAgent()
-        r = agent.get(rq, params=payload)
-        if 200 != r.status_code:
-            parseApiError(r)
-            return False
-        return json.loads(r.text)
+        return self.s.call('get', rq, params=payload)
 
     def updateAttribute(self, attribute_id: int, payload):
         """
@@ -351,25 +508,16 @@ class Element(object):
         """
         logging.info(f'Updating attribute {attribute_id} ...')
         rq = f'{self.host}/attribute/{attribute_id}'
-        agent = self.s.getAgent()
-        r = agent.post(rq, json=payload)
-        if 200 != r.status_code:
-            parseApiError(r)
-            return False
-        _family = json.loads(r.text)
-        return _family
+        return self.s.call('post', rq, json=payload)
 
     # family
     def createFamily(self, payload):
         """ crea una nuova famiglia """
         logging.info('Creating new family %s' % payload)
         rq = '%s/family' % (self.host)
-        agent = self.s.getAgent()
-        r = agent.post(rq, json=payload)
-        if 201 != r.status_code:
-            parseApiError(r)
+        family = self.s.call('post', rq, expect=201, json=payload)
+        if family is False:
             return False
-        family = json.loads(r.text)
         logging.info('Create family %s' % family['data']['id'])
         return family
 
@@ -379,25 +527,18 @@ class Element(object):
         """
         logging.info(f'Getting all the families with params {params}')
         rq = '%s/family' % (self.host)
-        agent = self.s.getAgent()
-        r = agent.get(rq, params=params)
-        if 200 != r.status_code:
-            return False
-        families = json.loads(r.text)
-        return families
+        return self.s.call('get', rq, params=params)
 
     def getFamily(self, family_id: int, params=None):
         """
         Legge la singola famiglia.
         """
+        local = self.__fromReplica('family', 'id', family_id, params)
+        if local:
+            return local
         logging.info(f'Reading family {family_id}')
         rq = '%s/family/%s' % (self.host, family_id)
-        agent = self.s.getAgent()
-        r = agent.get(rq, params=params)
-        if 200 != r.status_code:
-            return False
-        _family = json.loads(r.text)
-        return _family
+        return self.s.call('get', rq, params=params)
 
     def updateFamily(self, family_id: int, payload):
         """
@@ -405,16 +546,13 @@ class Element(object):
         """
         logging.info('Updating family %s ...' % family_id)
         rq = '%s/family/%s' % (self.host, family_id)
-        agent = self.s.getAgent()
-        r = agent.post(rq, json=payload)
-        if 200 != r.status_code:
-            parseApiError(r)
-            return False
-        _family = json.loads(r.text)
-        return _family
+        return self.s.call('post', rq, json=payload)
 
     def getFamilyFromCode(self, family_code: str, params=None):
         """ Prende famiglia da nome """
+        local = self.__fromReplica('family', 'code', family_code, params)
+        if local:
+            return local
         payload = {
             'code': family_code
         }
@@ -423,29 +561,15 @@ class Element(object):
             payload = {**payload, **new_payload}
         logging.info('Get family %s' % family_code)
         rq = '%s/family/findByCode' % (self.host)
-        agent = self.s.getAgent()
-        r = agent.get(rq, params=payload)
-        if 200 != r.status_code:
-            parseApiError(r)
-            return False
-        return json.loads(r.text)
+        return self.s.call('get', rq, params=payload)
 
-    def patchFamily(self, family_id: int, payload):
+    def patchFamily(self, family_id: int, payload, diff=None):
         """
-        Associa categoria a famiglia
+        Associa categoria a famiglia, with diff (default patch_diff) only the changed fields.
         """
         logging.info(f'Patching family {family_id} ')
         rq = '%s/family/%s' % (self.host, family_id)
-        try:
-            agent = self.s.getAgent()
-            r = agent.patch(rq, json=payload)
-        except Exception:
-            logging.exception("Exception occurred")
-            return False
-        if 200 != r.status_code:
-            parseApiError(r)
-            return False
-        return json.loads(r.text)
+        return self.__patch(rq, payload, diff)
 
     def patchFamilyCategory(self, family_id: int, category_id: int):
         """
@@ -457,60 +581,25 @@ class Element(object):
         payload = {
             'category_id': category_id
         }
-        try:
-            agent = self.s.getAgent()
-            r = agent.patch(rq, json=payload)
-        except Exception:
-            logging.exception("Exception occurred")
-            return False
-        if 200 != r.status_code:
-            parseApiError(r)
-            return False
-        return json.loads(r.text)
+        return self.s.call('patch', rq, json=payload)
 
-    def updateFamilyCover(self, family_id: int, localFile):
+    def updateFamilyCover(self, family_id: int, localFile, callback=None):
         """ 
         Aggiorna cover famiglia. 
         """
         logging.info('Update family %s cover with file %s' %
                      (family_id, localFile))
         rq = '%s/family/%s/cover' % (self.host, family_id)
-        fin = open(localFile, 'rb')
-        files = {'src': fin}
-        #files = {'src': ('test.cad', open(filepath, 'rb'), 'image/png')}
-        try:
-            agent = self.s.getAgent()
-            r = agent.post(rq, files=files)
-        except Exception:
-            logging.exception("Exception occurred")
-            return False
-        if 200 != r.status_code:
-            parseApiError(r)
-            return False
-        _family = json.loads(r.text)
-        return _family
+        return self.__upload(rq, localFile, callback=callback)
 
-    def updateFamilyHq(self, family_id: int, localFile):
+    def updateFamilyHq(self, family_id: int, localFile, callback=None):
         """ 
         Aggiorna HQ famiglia. 
         """
         logging.info('Update family %s hq with file %s' %
                      (family_id, localFile))
         rq = '%s/family/%s/hq' % (self.host, family_id)
-        fin = open(localFile, 'rb')
-        files = {'src': fin}
-        #files = {'src': ('test.cad', open(filepath, 'rb'), 'image/png')}
-        try:
-            agent = self.s.getAgent()
-            r = agent.post(rq, files=files)
-        except Exception:
-            logging.exception("Exception occurred")
-            return False
-        if 200 != r.status_code:
-            parseApiError(r)
-            return False
-        _family = json.loads(r.text)
-        return _family
+        return self.__upload(rq, localFile, callback=callback)
 
     def attachFamilyNorm(self, family_id: int, norm_id: int):
         """
@@ -522,12 +611,7 @@ class Element(object):
         payload = {
             'norm_id': norm_id
         }
-        agent = self.s.getAgent()
-        r = agent.post(rq, json=payload)
-        if 204 != r.status_code:
-            parseApiError(r)
-            return False
-        return True
+        return self.s.call('post', rq, expect=204, parse=False, json=payload)
 
     def attachFamilyQuality(self, family_id: int, quality_id: int):
         """
@@ -539,12 +623,7 @@ class Element(object):
         payload = {
             'quality_id': quality_id
         }
-        agent = self.s.getAgent()
-        r = agent.post(rq, json=payload)
-        if 204 != r.status_code:
-            parseApiError(r)
-            return False
-        return True
+        return self.s.call('post', rq, expect=204, parse=False, json=payload)
 
     def attachFamilyFeature(self, family_id: int, feature_id: int, description: str):
         """
@@ -557,16 +636,7 @@ class Element(object):
             'description': description
         }
         rq = f'{self.host}/family/{family_id}/feature'
-        try:
-            agent = self.s.getAgent()
-            r = agent.post(rq, json=payload)
-        except Exception:
-            logging.exception('Exception occured')
-            return False
-        if 204 != r.status_code:
-            parseApiError(r)
-            return False
-        return True
+        return self.s.call('post', rq, expect=204, parse=False, json=payload)
 
     def attachFamilyAttribute(self, family_id: int, attribute_id: int):
         """
@@ -578,12 +648,7 @@ class Element(object):
         payload = {
             'attribute_id': attribute_id
         }
-        agent = self.s.getAgent()
-        r = agent.post(rq, json=payload)
-        if 204 != r.status_code:
-            parseApiError(r)
-            return False
-        return True
+        return self.s.call('post', rq, expect=204, parse=False, json=payload)
 
     def attachFamilySorting(self, family_id: int, attribute_id: int):
         """
@@ -595,12 +660,17 @@ class Element(object):
         payload = {
             'attribute_id': attribute_id
         }
-        agent = self.s.getAgent()
-        r = agent.post(rq, json=payload)
-        if 204 != r.status_code:
-            parseApiError(r)
-            return False
-        return True
+        return self.s.call('post', rq, expect=204, parse=False, json=payload)
+
+    def syncFamilyRelations(self, family_id: int, desired, concurrency=8):
+        """
+        Make family relations match desired, e.g. {'norms': [1, 2],
+        'features': {3: 'descr'}, 'sorting': [4]}: current relations are read
+        once and only the missing ones are attached, concurrently.
+        The report lists the extra relations and a sorting out of order.
+        """
+        return syncRelations(self, family_id, desired, concurrency,
+            self.s.config.get('family_relations_include'))
 
     # feature
     def createFeature(self, feature_name: str):
@@ -612,13 +682,7 @@ class Element(object):
         payload = {
             'name': feature_name
         }
-        agent = self.s.getAgent()
-        r = agent.post(rq, json=payload)
-        if 201 != r.status_code:
-            parseApiError(r)
-            return False
-        _feature = json.loads(r.text)
-        return _feature
+        return self.s.call('post', rq, expect=201, json=payload)
 
     def getFeature(self, feature_name: str):
         """
@@ -629,25 +693,23 @@ class Element(object):
             'name': feature_name
         }
         rq = f'{self.host}/feature/findByName'
-        agent = self.s.getAgent()
-        r = agent.get(rq, params=params)
-        if 200 != r.status_code:
-            parseApiError(r)
-            return False
-        _features = json.loads(r.text)
-        return _features
+        return self.s.call('get', rq, params=params)
+
+    def ensureFeature(self, feature_name: str):
+        """
+        Feature id from name, created if missing.
+        """
+        return self.s.ensurer.ensure('element.feature', feature_name,
+            lambda: self.getFeature(feature_name), lambda: self.createFeature(feature_name))
 
     # crtable
     def createCrtable(self, payload):
         """ crea una nuova tabella """
         logging.info('Creating new crtabel %s' % payload)
         rq = '%s/crtable' % (self.host)
-        agent = self.s.getAgent()
-        r = agent.post(rq, json=payload)
-        if 201 != r.status_code:
-            parseApiError(r)
+        crtable = self.s.call('post', rq, expect=201, json=payload)
+        if crtable is False:
             return False
-        crtable = json.loads(r.text)
         logging.info('Create crtable %s' % crtable['data']['id'])
         return crtable
 
@@ -657,12 +719,7 @@ class Element(object):
         """
         logging.info(f'Get crtable {crtable_id}')
         rq = f'{self.host}/crtable/{crtable_id}'
-        agent = self.s.getAgent()
-        r = agent.get(rq, params=params)
-        if 200 != r.status_code:
-            return False
-        crtable = json.loads(r.text)
-        return crtable
+        return self.s.call('get', rq, params=params)
 
     def getCrtableFromSlug(self, slug: str):
         """
@@ -670,14 +727,9 @@ class Element(object):
         """
         logging.info(f'Get crtable slug {slug}')
         rq = f'{self.host}/crtable/findBySlug'
-        agent = self.s.getAgent()
-        r = agent.get(rq, params={
+        return self.s.call('get', rq, params={
             'slug': slug
         })
-        if 200 != r.status_code:
-            return False
-        crtable = json.loads(r.text)
-        return crtable
 
     def getCrtableFromName(self, name: str):
         """
@@ -685,26 +737,18 @@ class Element(object):
         """
         logging.info(f'Get crtable name {name}')
         rq = f'{self.host}/crtable/findByName'
-        agent = self.s.getAgent()
-        r = agent.get(rq, params={
+        return self.s.call('get', rq, params={
             'name': name
         })
-        if 200 != r.status_code:
-            return False
-        crtable = json.loads(r.text)
-        return crtable
 
     # crimping
     def createCrimping(self, crtable_id: int, payload):
         """ crea nuovo parametro di pinzatura per tabella """
         logging.info('Creating new crimping %s' % payload)
         rq = f'{self.host}/crtable/{crtable_id}/crimping'
-        agent = self.s.getAgent()
-        r = agent.post(rq, json=payload)
-        if 201 != r.status_code:
-            parseApiError(r)
+        crimping = self.s.call('post', rq, expect=201, json=payload)
+        if crimping is False:
             return False
-        crimping = json.loads(r.text)
         logging.info('Create crimping %s' % crimping['data']['id'])
         return crimping
 
@@ -714,12 +758,7 @@ class Element(object):
         """
         logging.info(f'Get crimping {crimping_id} from table {crtable_id}')
         rq = f'{self.host}/crtable/{crtable_id}/crimping/{crimping_id}'
-        agent = self.s.getAgent()
-        r = agent.get(rq, params=params)
-        if 200 != r.status_code:
-            return False
-        crtable = json.loads(r.text)
-        return crtable
+        return self.s.call('get', rq, params=params)
 
     # hub
     def getHubByName(self, hub_name: str):
@@ -728,13 +767,7 @@ class Element(object):
         """
         logging.info('Search hub by name %s' % hub_name)
         rq = f'{self.host}/hub/findByName?name={hub_name}'
-        agent = self.s.getAgent()
-        r = agent.get(rq)
-        if 200 != r.status_code:
-            parseApiError(r)
-            return False
-        _hub = json.loads(r.text)
-        return _hub
+        return self.s.call('get', rq)
 
     def createHub(self, hub_name: str):
         """ 
@@ -743,13 +776,14 @@ class Element(object):
         logging.info('Creating new hub with name %s' % hub_name)
         rq = f'{self.host}/hub'
         payload = {'name': hub_name}
-        agent = self.s.getAgent()
-        r = agent.post(rq, json=payload)
-        if 201 != r.status_code:
-            parseApiError(r)
-            return False
-        _hub = json.loads(r.text)
-        return _hub
+        return self.s.call('post', rq, expect=201, json=payload)
+
+    def ensureHub(self, hub_name: str):
+        """
+        Hub id from name, created if missing.
+        """
+        return self.s.ensurer.ensure('element.hub', hub_name,
+            lambda: self.getHubByName(hub_name), lambda: self.createHub(hub_name))
 
     # category
     def createCategory(self, hub_id: int, category_name: str):
@@ -763,13 +797,7 @@ class Element(object):
             'hub_id': hub_id,
             'name': category_name
         }
-        agent = self.s.getAgent()
-        r = agent.post(rq, json=payload)
-        if 201 != r.status_code:
-            parseApiError(r)
-            return False
-        _category = json.loads(r.text)
-        return _category
+        return self.s.call('post', rq, expect=201, json=payload)
 
     def getCategoryByName(self, category_name: str):
         """
@@ -777,93 +805,92 @@ class Element(object):
         """
         logging.info('Search category by name %s' % category_name)
         rq = '%s/category/findByName?name=%s' % (self.host, category_name)
-        agent = self.s.getAgent()
-        r = agent.get(rq)
-        if 200 != r.status_code:
-            parseApiError(r)
+        return self.s.call('get', rq)
+
+    def getHubCategoryByName(self, hub_id: int, category_name: str):
+        """
+        Category of hub from name, {'data': category} or False.
+        """
+        x = self.getCategoryByName(category_name)
+        if x is False:
             return False
-        _category = json.loads(r.text)
-        return _category
+        found = x.get('data')
+        for category in found if isinstance(found, list) else [found]:
+            if isinstance(category, dict) and categoryHub(category) == hub_id:
+                return {'data': category}
+        logging.info(f'Category {category_name} not in hub {hub_id}')
+        return False
 
-    def updateCategoryCover(self, category_id: int, localFile):
+    def ensureCategory(self, hub_id: int, category_name: str):
+        """
+        Category id from name, created in hub if missing.
+        """
+        return self.s.ensurer.ensure('element.category', f'{hub_id}/{category_name}',
+            lambda: self.getHubCategoryByName(hub_id, category_name),
+            lambda: self.createCategory(hub_id, category_name))
+
+    def updateCategoryCover(self, category_id: int, localFile, callback=None):
         """
         Aggiorna cover categoria.
         """
         logging.info('Update category %s cover with file %s' %
                      (category_id, localFile))
         rq = '%s/category/%s/cover' % (self.host, category_id)
-        fin = open(localFile, 'rb')
-        files = {'src': fin}
-        try:
-            agent = self.s.getAgent()
-            r = agent.post(rq, files=files)
-        except Exception:
-            logging.exception("Exception occurred")
-            return False
-        if 200 != r.status_code:
-            parseApiError(r)
-            return False
-        _category = json.loads(r.text)
-        return _category
+        return self.__upload(rq, localFile, callback=callback)
 
     # catalog
     def listCatalog(self, query=None):
         """ Get catalog by ID """
         logging.info(f'List catalogs')
         rq = f'{self.host}/catalog'
-        agent = self.s.getAgent()
-        r = agent.get(rq, params=query)
-        logging.info(r)
-        if 200 != r.status_code:
-            return False
-        catalogs = json.loads(r.text)
-        return catalogs
+        return self.s.call('get', rq, params=query)
+
+    def iterCatalogs(self, query=None, take=100):
+        """
+        Iterate all catalogs, page by page.
+        """
+        logging.info('Iterating all the catalogs')
+        return paginate(self.listCatalog, query, take)
+
+    def exportCatalogs(self, query=None, take=100, concurrency=8, ordered=True, strict=False):
+        """
+        Bulk export all catalogs, pages read concurrently.
+        """
+        logging.info(f'Exporting all the catalogs, concurrency {concurrency}')
+        return Export(self.listCatalog, query, take, concurrency, ordered, strict)
+
+    def crawlCatalogs(self, catalogs=None, concurrency=8, leafDetails=False, params=None):
+        """
+        Read catalogs, trees and leaves breadth first into a CatalogTree,
+        each level concurrently. tree.refresh() re-fetches the changed subtrees
+        and reports the changed nodes.
+        """
+        return CatalogTree(self, concurrency, leafDetails, params).crawl(catalogs)
 
     def getCatalog(self, catalog_id: int, params=None):
         """ Get catalog by ID """
         logging.info(f'Get catalog {catalog_id}')
         rq = f'{self.host}/catalog/{catalog_id}'
         logging.info(rq)
-        agent = self.s.getAgent()
-        r = agent.get(rq, params=params)
-        logging.info(r)
-        if 200 != r.status_code:
-            return False
-        item = json.loads(r.text)
-        return item
+        return self.s.call('get', rq, params=params)
 
     def getTree(self, catalog_id: int, tree_id: int, params=None):
         """ Get catalog tree by ID """
         logging.info(f'Get catalog tree {catalog_id}')
         rq = f'{self.host}/catalog/{catalog_id}/tree/{tree_id}'
-        agent = self.s.getAgent()
-        r = agent.get(rq, params=params)
-        if 200 != r.status_code:
-            return False
-        tree = json.loads(r.text)
-        return tree
+        return self.s.call('get', rq, params=params)
 
     def getTreeLeaves(self, catalog_id: int, tree_id: int, params=None):
         """ Get catalog tree leaves """
         logging.info(f'Get catalog tree {tree_id} into catalog {catalog_id}')
         rq = f'{self.host}/catalog/{catalog_id}/tree/{tree_id}/leaf'
-        agent = self.s.getAgent()
-        r = agent.get(rq, params=params)
-        if 200 != r.status_code:
-            return False
-        leaves = json.loads(r.text)
-        return leaves
+        return self.s.call('get', rq, params=params)
 
     def getTreeLeaf(self, catalog_id: int, tree_id: int, leaf_id: int, params=None):
         """ Get catalog tree leaf ID """
         logging.info(f'Get catalog tree {catalog_id}')
         rq = f'{self.host}/catalog/{catalog_id}/tree/{tree_id}/leaf/{leaf_id}'
-        agent = self.s.getAgent()
-        r = agent.get(rq, params=params)
-        if 200 != r.status_code:
-            return False
-        leaf = json.loads(r.text)
-        return leaf
+        return self.s.call('get', rq, params=params)
 
     # warehouse
     def listWarehouse(self, query=None):
@@ -872,23 +899,13 @@ class Element(object):
         """
         logging.info('Reading all warehouses')
         rq = f'{self.host}/warehouse'
-        agent = self.s.getAgent()
-        r = agent.get(rq, params=query)
-        if 200 != r.status_code:
-            return False
-        warehouses = json.loads(r.text)
-        return warehouses
+        return self.s.call('get', rq, params=query)
 
     def getWarehouse(self, warehouse_id: int, params=None):
         """Get warehouse details"""
         logging.info(f'Get warehouse {warehouse_id}')
         rq = f'{self.host}/warehouse/{warehouse_id}'
-        agent = self.s.getAgent()
-        r = agent.get(rq, params=params)
-        if 200 != r.status_code:
-            return False
-        warehouse = json.loads(r.text)
-        return warehouse
+        return self.s.call('get', rq, params=params)
 
     def createWarehouse(self, payload):
         """ 
@@ -896,13 +913,7 @@ class Element(object):
         """
         logging.info(f'Creating new warehouse {payload}')
         rq = f'{self.host}/warehouse'
-        agent = self.s.getAgent()
-        r = agent.post(rq, json=payload)
-        if 201 != r.status_code:
-            parseApiError(r)
-            return False
-        warehouse = json.loads(r.text)
-        return warehouse
+        return self.s.call('post', rq, expect=201, json=payload)
 
     def updateWarehouse(self, warehouse_id: int, payload):
         """ 
@@ -910,16 +921,13 @@ class Element(object):
         """
         logging.info(f'Updateing warehouse {warehouse_id} - {payload}')
         rq = f'{self.host}/warehouse/{warehouse_id}'
-        agent = self.s.getAgent()
-        r = agent.post(rq, json=payload)
-        if 200 != r.status_code:
-            parseApiError(r)
-            return False
-        warehouse = json.loads(r.text)
-        return warehouse
+        return self.s.call('post', rq, json=payload)
 
     def getWarehouseFromName(self, name: str, params=None):
         """read warehouse from name"""
+        local = self.__fromReplica('warehouse', 'name', name, params)
+        if local:
+            return local
         logging.info(f'Search warehouse from {name}')
         payload = {
             'name': name
@@ -928,9 +936,12 @@ class Element(object):
             new_payload = dict(item.split("=") for item in params.split('&'))
             payload = {**payload, **new_payload}
         rq = f'{self.host}/warehouse/findByName'
-        agent = self.s.getAgent()
-        r = agent.get(rq, params=payload)
-        if 200 != r.status_code:
-            parseApiError(r)
-            return False
-        return json.loads(r.text)
+        return self.s.call('get', rq, params=payload)
+
+
+def categoryHub(category):
+    """ Hub id of a category record. """
+    hub = category.get('hub')
+    if isinstance(hub, dict):
+        hub = hub.get('data', hub).get('id')
+    return category.get('hub_id', hub)
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Element family relations sync.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from gomma.element.catalog import related
+
+# desired key: (url segment, id field, Element attach method)
+RELATIONS = {
+    'norms': ('norm', 'norm_id', 'attachFamilyNorm'),
+    'qualities': ('quality', 'quality_id', 'attachFamilyQuality'),
+    'features': ('feature', 'feature_id', 'attachFamilyFeature'),
+    'attributes': ('attribute', 'attribute_id', 'attachFamilyAttribute'),
+    'sorting': ('sorting', 'attribute_id', 'attachFamilySorting')
+}
+
+
+def currentRelations(family):
+    """
+    {relation: {id: record}} of a family read with its relations included,
+    in the order of the family.
+    """
+    current = {}
+    for relation, (segment, idField, _) in RELATIONS.items():
+        records = related(family, relation, segment)
+        current[relation] = {r.get(idField, r.get('id')): r for r in records}
+    return current
+
+
+def relationPlan(current, desired):
+    """
+    Turn current into desired (only the relations in desired): returns
+    attaches [(relation, id, description)], extras [(relation, id)] found
+    but not desired, and misordered, True when the sorting attached after
+    the current one cannot follow the desired order.
+    Features are {id: description}, the others lists of ids.
+    """
+    attaches = []
+    extras = []
+    misordered = False
+    for relation, wanted in desired.items():
+        if relation not in RELATIONS:
+            raise ValueError(f'Unknown family relation {relation}')
+        have = current.get(relation, {})
+        if 'features' == relation:
+            wanted = dict(wanted)
+            for feature_id, description in wanted.items():
+                if feature_id not in have or have[feature_id].get('description', description) != description:
+                    attaches.append((relation, feature_id, description))
+        else:
+            wanted = list(dict.fromkeys(wanted))
+            attaches.extend((relation, i, None) for i in wanted if i not in have)
+        if 'sorting' == relation:
+            # attaches are appended: the result is current + missing, in order
+            final = [i for i in have if i in wanted] + [i for i in wanted if i not in have]
+            misordered = final != wanted
+        extras.extend((relation, i) for i in have if i not in wanted)
+    return attaches, extras, misordered
+
+
+def syncRelations(el, family_id, desired, concurrency=8, include=None):
+    """
+    Read family relations once, send only the missing attaches concurrently;
+    sorting is attached in order. Returns the report.
+    """
+    include = include or 'include=' + ','.join(RELATIONS)
+    family = el.getFamily(family_id, include)
+    if family is False:
+        logging.error(f'Unable to read family {family_id} relations')
+        return False
+    attaches, extras, misordered = relationPlan(currentRelations(family['data']), desired)
+    report = {'attached': [], 'failed': [], 'extra': extras, 'misordered': misordered,
+        'calls': 1}
+    logging.info(f'Family {family_id}: {len(attaches)} attaches, {len(extras)} extra relations')
+    if misordered:
+        logging.warning(f'Family {family_id} sorting does not follow the desired order, '
+            'detach and attach it again to reorder')
+
+    def attach(job):
+        relation, relation_id, description = job
+        method = getattr(el, RELATIONS[relation][2])
+        if 'features' == relation:
+            return method(family_id, relation_id, description)
+        return method(family_id, relation_id)
+
+    def attachSorting():
+        return [attach(job) for job in sorting]
+
+    sorting = [job for job in attaches if 'sorting' == job[0]]
+    others = [job for job in attaches if 'sorting' != job[0]]
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        ordered = pool.submit(attachSorting)
+        attached = list(pool.map(attach, others)) + ordered.result()
+    for job, ok in zip(others + sorting, attached):
+        report['attached' if ok else 'failed'].append(job[:2])
+    report['calls'] += len(attaches)
+    return report
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Element local replica: items, families, attributes and warehouses
+in a SQLite database, indexed by id, code, ext_id and name.
+"""
+
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from gomma.utility import codec
+from gomma.utility.cache import Cache
+from gomma.utility.paging import Export
+
+# table: (Element list method, indexed columns)
+RESOURCES = {
+    'item': ('getItems', ('code', 'ext_id', 'family_id')),
+    'family': ('getFamilies', ('code', 'ext_id')),
+    'attribute': ('getAttributes', ('name',)),
+    'warehouse': ('listWarehouse', ('name', 'code'))
+}
+
+
+class SyncError(Exception):
+    """ Export failed, roll back. """
+
+
+class Replica(object):
+    """
+    Read only copy of element resources: sync() loads them,
+    find() answers lookups while the copy is younger than maxAge seconds.
+    """
+
+    def __init__(self, element, path=None, maxAge=3600):
+        """
+        Open (or create) the replica database.
+        """
+        if path is None:
+            path = os.path.join(os.path.expanduser(Cache.cachePath),
+                f'replica-{element.s.profile_name}.sqlite')
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.el = element
+        self.path = path
+        self.maxAge = maxAge
+        self.stats = {'hits': 0, 'misses': 0, 'stale': 0}
+        self.__local = threading.local()
+        self.__createSchema()
+        logging.info(f'Element replica {path}')
+
+    def __db(self):
+        """ Connection of the calling thread. """
+        db = getattr(self.__local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            self.__local.db = db
+        return db
+
+    def __createSchema(self):
+        """ Tables and indexes. """
+        db = self.__db()
+        with db:
+            db.execute('CREATE TABLE IF NOT EXISTS synced (resource TEXT PRIMARY KEY, at REAL, records INTEGER)')
+            for table, (_, columns) in RESOURCES.items():
+                cols = ''.join(f', {c}' for c in columns)
+                db.execute(f'CREATE TABLE IF NOT EXISTS {table} (id INTEGER PRIMARY KEY{cols}, data BLOB)')
+                for c in columns:
+                    db.execute(f'CREATE INDEX IF NOT EXISTS {table}_{c} ON {table} ({c})')
+
+    def sync(self, resources=None, query=None, take=200, concurrency=8):
+        """
+        Replace resources (all if None) with a bulk export of the API.
+        A failed export keeps the previous copy. Returns {resource: records or False}.
+        """
+        done = {}
+        for table in resources or RESOURCES:
+            method, columns = RESOURCES[table]
+            start = time.perf_counter()
+            export = Export(getattr(self.el, method), query, take, concurrency, ordered=False)
+            rows = ([r['id'], *[self.__column(r, c) for c in columns], codec.dumps(r)] for r in export)
+            marks = ', '.join('?' * (len(columns) + 2))
+            db = self.__db()
+            try:
+                with db:
+                    db.execute(f'DELETE FROM {table}')
+                    db.executemany(f'INSERT OR REPLACE INTO {table} (id, {", ".join(columns)}, data) '
+                        f'VALUES ({marks})', rows)
+                    if export.stats['failed']:
+                        raise SyncError(f"{export.stats['failed']} pages of {table} failed")
+                    db.execute('INSERT OR REPLACE INTO synced VALUES (?, ?, ?)',
+                        (table, time.time(), export.stats['records']))
+            except SyncError as e:
+                logging.error(f'Replica {table} not synced: {e}')
+                done[table] = False
+                continue
+            done[table] = export.stats['records']
+            logging.info(f"Replica {table}: {export.stats['records']} records in "
+                f'{time.perf_counter() - start:.1f}s')
+        return done
+
+    def apply(self, table, records):
+        """
+        Insert or replace changed records (delta sync), the table is fresh again.
+        """
+        columns = RESOURCES[table][1]
+        rows = [[r['id'], *[self.__column(r, c) for c in columns], codec.dumps(r)] for r in records]
+        marks = ', '.join('?' * (len(columns) + 2))
+        with self.__db() as db:
+            db.executemany(f'INSERT OR REPLACE INTO {table} (id, {", ".join(columns)}, data) '
+                f'VALUES ({marks})', rows)
+            self.__touch(db, table)
+        return len(rows)
+
+    def touch(self, table):
+        """Table is up to date (a delta sync found nothing to apply)."""
+        with self.__db() as db:
+            self.__touch(db, table)
+        return True
+
+    def __touch(self, db, table):
+        """ Mark table synced now. """
+        db.execute(f'INSERT OR REPLACE INTO synced SELECT ?, ?, COUNT(*) FROM {table}',
+            (table, time.time()))
+
+    def __column(self, record, column):
+        """ Indexed value of record. """
+        value = record.get(column)
+        if column.endswith('_id') and isinstance(record.get(column[:-3]), dict):
+            value = record[column[:-3]].get('data', {}).get('id', value)
+        return value
+
+    def age(self, table):
+        """Seconds since the last sync of table, None if never synced."""
+        row = self.__db().execute('SELECT at FROM synced WHERE resource = ?', (table,)).fetchone()
+        return time.time() - row[0] if row else None
+
+    def isFresh(self, table):
+        """Table synced within maxAge."""
+        age = self.age(table)
+        return age is not None and (not self.maxAge or age <= self.maxAge)
+
+    def find(self, table, column, value):
+        """
+        Record of table with column equal to value,
+        None when missing or stale (the caller asks the API).
+        """
+        if not self.isFresh(table):
+            self.stats['stale'] += 1
+            return None
+        row = self.__db().execute(f'SELECT data FROM {table} WHERE {column} = ? LIMIT 1',
+            (value,)).fetchone()
+        if row is None:
+            self.stats['misses'] += 1
+            return None
+        self.stats['hits'] += 1
+        return codec.loads(row[0])
+
+    def findAll(self, table, column, value):
+        """Records of table with column equal to value."""
+        rows = self.__db().execute(f'SELECT data FROM {table} WHERE {column} = ?', (value,))
+        return [codec.loads(row[0]) for row in rows]
+
+    def forget(self, path):
+        """
+        Drop the record of a changed url path, it is read from the API until next sync.
+        """
+        match = re.search(r'/(item|family|attribute|warehouse)/(\d+)', path)
+        if match:
+            with self.__db() as db:
+                db.execute(f'DELETE FROM {match.group(1)} WHERE id = ?', (int(match.group(2)),))
+        return True
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Element warehouse stock reconciliation.
+Current and desired stock are (item_id, warehouse_id, quantity) rows joined
+on item and warehouse: only new, changed and (optionally) missing rows
+become API calls. Vectorized with numpy when installed.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from gomma.element.catalog import related
+
+ROW = [('item', 'i8'), ('warehouse', 'i8'), ('quantity', 'f8')]
+
+
+def snapshotRows(items, field='quantity'):
+    """
+    Yield (item_id, warehouse_id, quantity) of items read with their warehouses.
+    """
+    for item in items:
+        for wh in related(item, 'warehouses', 'warehouse'):
+            warehouse_id = wh.get('warehouse_id', wh.get('id'))
+            yield item['id'], warehouse_id, float(wh.get(field) or 0)
+
+
+def stockArray(rows):
+    """
+    Structured array of rows (tuples or array), one row per item and
+    warehouse: the last duplicate wins.
+    """
+    if isinstance(rows, np.ndarray):
+        array = rows.astype(ROW, copy=False)
+    else:
+        array = np.fromiter((tuple(r) for r in rows), dtype=ROW)
+    keys = stockKeys(array)
+    _, last = np.unique(keys[::-1], return_index=True)
+    if len(last) == len(array):
+        return array
+    return array[np.sort(len(array) - 1 - last)]
+
+
+def stockKeys(array):
+    """ Join key of item and warehouse. """
+    return (array['item'] << 32) | array['warehouse']
+
+
+def _reconcileArrays(current, desired, remove, tolerance):
+    """ numpy reconciliation, returns adds, patches and removes arrays. """
+    current = stockArray(current)
+    desired = stockArray(desired)
+    currentKeys = stockKeys(current)
+    desiredKeys = stockKeys(desired)
+    _, ci, di = np.intersect1d(currentKeys, desiredKeys, assume_unique=True, return_indices=True)
+    changed = np.abs(current['quantity'][ci] - desired['quantity'][di]) > tolerance
+    patches = desired[di[changed]]
+    adds = desired[~np.isin(desiredKeys, currentKeys, assume_unique=True)]
+    if remove:
+        removes = current[~np.isin(currentKeys, desiredKeys, assume_unique=True)]
+    else:
+        removes = current[:0]
+    return adds.tolist(), patches.tolist(), removes.tolist()
+
+
+def _reconcileRows(current, desired, remove, tolerance):
+    """ Pure python reconciliation, same result without numpy. """
+    have = {(i, w): float(q) for i, w, q in current}
+    want = {(i, w): float(q) for i, w, q in desired}
+    adds = [(i, w, q) for (i, w), q in want.items() if (i, w) not in have]
+    patches = [(i, w, q) for (i, w), q in want.items()
+        if (i, w) in have and abs(have[(i, w)] - q) > tolerance]
+    removes = [(i, w, q) for (i, w), q in have.items() if (i, w) not in want] if remove else []
+    return adds, patches, removes
+
+
+def reconcile(current, desired, remove=False, tolerance=1e-9):
+    """
+    Rows to add, patch and remove to turn current stock into desired:
+    three lists of (item_id, warehouse_id, quantity).
+    """
+    start = time.perf_counter()
+    if np is not None:
+        adds, patches, removes = _reconcileArrays(current, desired, remove, tolerance)
+    else:
+        adds, patches, removes = _reconcileRows(current, desired, remove, tolerance)
+    logging.info(f'Stock reconciled in {time.perf_counter() - start:.2f}s: {len(adds)} adds, '
+        f'{len(patches)} patches, {len(removes)} removes')
+    return adds, patches, removes
+
+
+class StockWriter(object):
+    """
+    Run the reconciliation calls on a bounded thread pool: at most
+    concurrency calls in flight and twice as many queued.
+    """
+
+    def __init__(self, element, concurrency=8, field='quantity'):
+        self.el = element
+        self.concurrency = concurrency
+        self.field = field
+        self.stats = {'added': 0, 'patched': 0, 'removed': 0, 'failed': 0, 'elapsed': 0.0}
+        self.errors = []
+        self.__lock = threading.Lock()
+
+    def __call(self, action, row):
+        """ One API call, counted. """
+        item_id, warehouse_id, quantity = row
+        item_id, warehouse_id = int(item_id), int(warehouse_id)
+        if 'added' == action:
+            ok = self.el.itemAddWarehouse(item_id, {'warehouse_id': warehouse_id, self.field: quantity})
+        elif 'patched' == action:
+            ok = self.el.itemPatchWarehouse(item_id, warehouse_id, {self.field: quantity})
+        else:
+            ok = self.el.itemRemoveWarehouse(item_id, warehouse_id)
+        with self.__lock:
+            if ok is False:
+                self.stats['failed'] += 1
+                self.errors.append((action, item_id, warehouse_id))
+            else:
+                self.stats[action] += 1
+        return ok
+
+    def write(self, adds=(), patches=(), removes=()):
+        """
+        Send the calls, returns stats; errors lists the failed
+        (action, item_id, warehouse_id), raised exceptions included.
+        """
+        start = time.perf_counter()
+        slots = threading.BoundedSemaphore(self.concurrency * 3)
+
+        def done(future, action, row):
+            slots.release()
+            error = future.exception()
+            if error is not None:
+                logging.error(f'Stock {action} of {row[:2]} failed: {error!r}')
+                with self.__lock:
+                    self.stats['failed'] += 1
+                    self.errors.append((action, int(row[0]), int(row[1])))
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            for action, rows in (('added', adds), ('patched', patches), ('removed', removes)):
+                for row in rows:
+                    slots.acquire()
+                    future = pool.submit(self.__call, action, row)
+                    future.add_done_callback(lambda f, a=action, r=row: done(f, a, r))
+        self.stats['elapsed'] = time.perf_counter() - start
+        logging.info(f"Stock written in {self.stats['elapsed']:.1f}s: {self.stats['added']} added, "
+            f"{self.stats['patched']} patched, {self.stats['removed']} removed, "
+            f"{self.stats['failed']} failed")
+        return self.stats
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Request executor: timeouts, retries with backoff and circuit breaker.
+"""
+
+import email.utils
+import logging
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+
+
+class CircuitBreaker(object):
+    """
+    Open after consecutive failures, then let one trial request
+    through every reset seconds.
+    """
+
+    def __init__(self, failures=5, reset=30):
+        self.failures = failures
+        self.reset = reset
+        self.state = 'closed'
+        self.count = 0
+        self.openedAt = 0
+        self.__lock = threading.Lock()
+
+    def allow(self):
+        """Request can be sent."""
+        with self.__lock:
+            if 'closed' == self.state:
+                return True
+            if 'open' == self.state and time.monotonic() - self.openedAt >= self.reset:
+                logging.info('Circuit half-open, sending trial request')
+                self.state = 'half-open'
+                return True
+            return False
+
+    def success(self):
+        """Close circuit."""
+        with self.__lock:
+            self.state = 'closed'
+            self.count = 0
+
+    def failure(self):
+        """Count failure, open circuit at threshold."""
+        with self.__lock:
+            self.count += 1
+            if 'half-open' == self.state or self.count >= self.failures:
+                if 'open' != self.state:
+                    logging.error(f'Circuit open after {self.count} failures')
+                self.state = 'open'
+                self.openedAt = time.monotonic()
+
+
+class Executor(object):
+    """
+    Every SDK request goes through the executor.
+    """
+    idempotent = ('get', 'head', 'options', 'put', 'delete')
+    retryStatus = (500, 502, 503, 504)
+
+    def __init__(self, session):
+        """
+        Initialize executor from the session profile.
+        """
+        config = session.config
+        self.s = session
+        self.retries = config.getint('retries', 3)
+        self.backoff = config.getfloat('backoff', 0.5)
+        self.backoffMax = config.getfloat('backoff_max', 30)
+        self.timeout = (config.getfloat('connect_timeout', 5), config.getfloat('timeout', 60))
+        self.timeouts = {}
+        for key in config:
+            if key.startswith('timeout.'):
+                self.setTimeout(key[8:], config.getfloat(key))
+        self.circuitFailures = config.getint('circuit_failures', 5)
+        self.circuitReset = config.getfloat('circuit_reset', 30)
+        self.breakers = {}
+        self.stats = {'requests': 0, 'retries': 0, 'failures': 0, 'short_circuited': 0}
+        self.__lock = threading.Lock()
+
+    def setTimeout(self, path, timeout):
+        """Read timeout for urls whose path starts with path."""
+        self.timeouts[path.lower().rstrip('/')] = timeout
+        return True
+
+    def getTimeout(self, url):
+        """(connect, read) timeout for url, longest path prefix wins."""
+        path = urlsplit(url).path.lower()
+        match = ''
+        for prefix in self.timeouts:
+            if path.startswith(prefix) and len(prefix) > len(match):
+                match = prefix
+        if not match:
+            return self.timeout
+        return (self.timeout[0], self.timeouts[match])
+
+    def getBreaker(self, url):
+        """Circuit breaker of the url service."""
+        parts = urlsplit(url).path.split('/')
+        key = parts[1] if len(parts) > 1 else ''
+        breaker = self.breakers.get(key)
+        if not breaker:
+            with self.__lock:
+                breaker = self.breakers.setdefault(key,
+                    CircuitBreaker(self.circuitFailures, self.circuitReset))
+        return breaker
+
+    def allow(self, url):
+        """Circuit lets the request through."""
+        if self.getBreaker(url).allow():
+            return True
+        self.stats['short_circuited'] += 1
+        logging.error(f'Circuit open for {url}, failing fast')
+        return False
+
+    def record(self, url, status=None, error=None):
+        """Update circuit with request outcome."""
+        self.stats['requests'] += 1
+        breaker = self.getBreaker(url)
+        if error or (status and status >= 500):
+            self.stats['failures'] += 1
+            breaker.failure()
+        else:
+            breaker.success()
+
+    def retryDelay(self, method, attempt, status=None, headers=None, error=None):
+        """
+        Seconds to wait before retrying, None if not retryable.
+        """
+        if attempt >= self.retries:
+            return None
+        failed = error or status in self.retryStatus
+        if not (429 == status or (failed and method.lower() in self.idempotent)):
+            return None
+        retryAfter = parseRetryAfter(headers)
+        if retryAfter is not None:
+            return min(retryAfter, self.backoffMax)
+        return random.uniform(0, min(self.backoffMax, self.backoff * 2 ** attempt))
+
+    def request(self, method, url, timeout=None, **kwargs):
+        """
+        Send request with retries. Returns the response, None on
+        network failure or open circuit.
+        """
+        if timeout is None:
+            timeout = self.getTimeout(url)
+        attempt = 0
+        while True:
+            if not self.allow(url):
+                return None
+            r = error = None
+            try:
+                agent = self.s.getAgent()
+                r = agent.request(method, url, timeout=timeout, **kwargs)
+            except requests.RequestException as e:
+                error = e
+            status = r.status_code if r is not None else None
+            self.record(url, status, error)
+            delay = self.retryDelay(method, attempt, status, r.headers if r is not None else None, error)
+            if delay is None:
+                if error:
+                    logging.error(f'{method.upper()} {url} failed: {error}')
+                return r
+            logging.warning(f'Retry {method.upper()} {url} in {delay:.2f}s ({status or error})')
+            self.stats['retries'] += 1
+            rewindFiles(kwargs.get('files'))
+            if hasattr(kwargs.get('data'), 'seek'):
+                kwargs['data'].seek(0)
+            time.sleep(delay)
+            attempt += 1
+
+
+def parseRetryAfter(headers):
+    """Retry-After header in seconds."""
+    if not headers:
+        return None
+    value = headers.get('retry-after')
+    if not value:
+        return None
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(when.timestamp() - time.time(), 0)
+
+
+def rewindFiles(files):
+    """Seek upload files back to start before a retry."""
+    if not files:
+        return
+    for fin in files.values():
+        if hasattr(fin, 'seek'):
+            fin.seek(0)
@@ -10,11 +10,10 @@ __author__ = "Davide Pellegrino"
 __version__ = "2.1.1"
 __date__ = "2019-11-07"
 
-import json
 import logging
 import time
 
-from gomma.session import Session, parseApiError
+from gomma.session import getSession
 
 
 class Graph(object):
@@ -26,14 +25,10 @@ class Graph(object):
         Initialize main class with this and that.
         """
         logging.debug('Init Graph SDK')
-        s = Session(profile_name)
-        rqagent =  s.createAgent()
-        if not rqagent:
-            logging.error('Unable to start base core without valid session.')
-            exit(1)
+        s = getSession(profile_name)
         host=s.config.get('aggraph_host')
         self.host = host
-        self.agent = rqagent
+        self.s = s
 
     def get_language(self, language_id:int, params=None):
         """
@@ -41,11 +36,7 @@ class Graph(object):
         """
         logging.debug(f'Get language {language_id}')
         rq = f'{self.host}/language/{language_id}'
-        r = self.agent.get(rq, params=params)
-        if 200 != r.status_code:
-            return False
-        language = json.loads(r.text)
-        return language
+        return self.s.call('get', rq, params=params)
 
     def read_all_language(self, query=None):
         """
@@ -53,8 +44,4 @@ class Graph(object):
         """
         logging.debug('Getting all the languages')
         rq = '%s/language' % (self.host)
-        r = self.agent.get(rq, params=query)
-        if 200 != r.status_code:
-            return False
-        languages = json.loads(r.text)
-        return languages        
+        return self.s.call('get', rq, params=query)        
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+H2o asyncio SDK
+"""
+
+import logging
+
+from gomma.aio import AsyncClient, mergeQuery
+
+
+class AsyncH2o(AsyncClient):
+    """
+    H2o asyncio class, same methods of H2o.
+    """
+    service = 'h2o'
+
+    #customer
+    async def getCustomers(self, query=None):
+        """ Read all customers. """
+        logging.info('Getting all customers')
+        rq = f'{self.host}/customer'
+        return await self._request('get', rq, params=query)
+
+    async def createCustomer(self, payload):
+        """ Create new customer. """
+        logging.info('Init creating customer...')
+        rq = f'{self.host}/customer'
+        return await self._request('post', rq, expect=201, json=payload)
+
+    async def getCustomer(self, customer_id: int):
+        """ Get customer by id. """
+        logging.info(f'Reading customer {customer_id}...')
+        rq = f'{self.host}/customer/{customer_id}'
+        return await self._request('get', rq)
+
+    async def getCustomerFromErp(self, customer_id, erp_id):
+        """ Read customer from erp external ID. """
+        logging.info(f'Reading customer {customer_id} for erp {erp_id}')
+        rq = f'{self.host}/customer/findByErp'
+        payload = {
+            'erp_id': erp_id,
+            'ext_id': customer_id
+        }
+        return await self._request('get', rq, params=payload)
+
+    async def getCustomerFromTax(self, code):
+        """ Read customer from tax code. """
+        logging.info(f'Reading customer from tax code {code}')
+        rq = f'{self.host}/customer/findByTax'
+        return await self._request('get', rq, params={'code': code})
+
+    async def updateCustomer(self, customer_id: int, payload):
+        """ Update customer data. """
+        logging.info(f'Updating customer {customer_id}...')
+        rq = f'{self.host}/customer/{customer_id}'
+        return await self._request('post', rq, json=payload)
+
+    async def createCustomerXerp(self, customer_id: int, payload):
+        """ Update customer ERP Xrefs. """
+        logging.info(f'Init creating customer {customer_id} ERP xref ...')
+        rq = f'{self.host}/customer/{customer_id}/xerp'
+        return await self._request('post', rq, expect=201, json=payload)
+
+    #customer address
+    async def createCustomerAddress(self, customer_id: int, payload):
+        """ Create new customer address. """
+        logging.info(f'Creating customer {customer_id} address')
+        rq = f'{self.host}/customer/{customer_id}/address'
+        return await self._request('post', rq, expect=201, json=payload)
+
+    async def updateCustomerAddress(self, customer_id: int, address_id: int, payload):
+        """ Update customer address. """
+        logging.info(f'Init updating {customer_id} address {address_id} ...')
+        rq = f'{self.host}/customer/{customer_id}/address/{address_id}'
+        return await self._request('post', rq, json=payload)
+
+    async def getCustomerAddresses(self, customer_id: int, query=None):
+        """ List customer addresses. """
+        logging.info(f'Getting all customer {customer_id} addresses')
+        rq = f'{self.host}/customer/{customer_id}/address'
+        return await self._request('get', rq, params=query)
+
+    async def getCustomerAddress(self, customer_id: int, address_id: int, params=None):
+        """ Get customer address. """
+        logging.info(f'Get customer {customer_id} address {address_id}')
+        rq = f'{self.host}/customer/{customer_id}/address/{address_id}'
+        return await self._request('get', rq, params=params)
+
+    async def getCustomerAddressFromExtId(self, customer_id: int, ext_id: str, query=None):
+        """ Get customer address from ext_id. """
+        logging.info(f'Search customer {customer_id} address ext_id {ext_id}.')
+        payload = mergeQuery({'ext_id': ext_id}, query)
+        rq = f'{self.host}/customer/{customer_id}/address/findByExtId'
+        return await self._request('get', rq, params=payload)
+
+    #competitor
+    async def createCompetitor(self, payload):
+        """ Create new competitor. """
+        logging.info('Init creating competitor...')
+        rq = f'{self.host}/competitor'
+        return await self._request('post', rq, expect=201, json=payload)
+
+    async def getCompetitor(self, competitor_id: int):
+        """ Get competitor by id. """
+        logging.info(f'Reading competitor {competitor_id}...')
+        rq = f'{self.host}/competitor/{competitor_id}'
+        return await self._request('get', rq)
+
+    #order
+    async def createOrder(self, payload):
+        """ Create new order. """
+        logging.info(f'Creating order {payload}')
+        rq = f'{self.host}/order'
+        return await self._request('post', rq, expect=201, json=payload)
+
+    async def getOrders(self, query=None):
+        """ Read all orders. """
+        logging.info('Getting orders.')
+        rq = f'{self.host}/order'
+        return await self._request('get', rq, params=query)
+
+    async def getOrder(self, order_id: int):
+        """ Get order by id. """
+        logging.info(f'Reading order {order_id}..')
+        rq = f'{self.host}/order/{order_id}'
+        return await self._request('get', rq)
+
+    async def getOrderFromErp(self, erp_id: int, ext_id):
+        """ Read order from erp external ID. """
+        logging.info(f'Reading order {ext_id} for erp {erp_id}')
+        rq = f'{self.host}/order/findByErp'
+        payload = {
+            'erp_id': erp_id,
+            'ext_id': ext_id
+        }
+        return await self._request('get', rq, params=payload)
+
+    async def createOrderDetail(self, order_id: int, payload):
+        """ Create order detail. """
+        logging.info('Creating order detail')
+        rq = f'{self.host}/order/{order_id}/detail'
+        return await self._request('post', rq, expect=201, json=payload)
+
+    #order type
+    async def getOrderTypes(self, query=None):
+        """ Read all order types. """
+        logging.info('Getting order types.')
+        rq = f'{self.host}/order/type'
+        return await self._request('get', rq, params=query)
+
+    async def getOrderTypeFromName(self, name: str):
+        """ Get order type by name. """
+        logging.info(f'Getting order type {name}.')
+        rq = f'{self.host}/order/type/findByName'
+        return await self._request('get', rq, params={'name': name})
+
+    async def createOrderType(self, payload):
+        """ Create new order type. """
+        logging.info('Creating new order type.')
+        rq = f'{self.host}/order/type'
+        return await self._request('post', rq, expect=201, json=payload)
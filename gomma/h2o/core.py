@@ -10,10 +10,11 @@ __author__ = "Davide Pellegrino"
 __version__ = "1.1.4"
 __date__ = "2019-05-22"
 
-import json
 import logging
 
-from gomma.session import Session, parseApiError
+from gomma.session import getSession
+from gomma.utility.delta import deltaSync
+from gomma.utility.paging import Export, paginate
 
 class H2o(object):
     """
@@ -24,7 +25,7 @@ class H2o(object):
         Initialize main class.
         """
         logging.info('Init H2o SDK')
-        s = Session(profile_name)
+        s = getSession(profile_name)
         host=s.config.get('agapi_host')
         self.host = f'{host}/h2o'
         self.s = s
@@ -36,12 +37,28 @@ class H2o(object):
         """
         logging.info('Getting all customers')
         rq = '%s/customer' % (self.host)
-        agent=self.s.getAgent()
-        r = agent.get(rq, params=query)
-        if 200 != r.status_code:
-            return False
-        customer = json.loads(r.text)
-        return customer
+        return self.s.call('get', rq, params=query)
+
+    def iterCustomers(self, query=None, take=100):
+        """
+        Iterate all customers, page by page.
+        """
+        logging.info('Iterating all the customers')
+        return paginate(self.getCustomers, query, take)
+
+    def exportCustomers(self, query=None, take=100, concurrency=8, ordered=True, strict=False):
+        """
+        Bulk export all customers, pages read concurrently.
+        """
+        logging.info(f'Exporting all the customers, concurrency {concurrency}')
+        return Export(self.getCustomers, query, take, concurrency, ordered, strict)
+
+    def syncCustomersDelta(self, apply=None, query=None):
+        """
+        Fetch the customers changed since the last run into apply(records)
+        or the local record store. Returns the report.
+        """
+        return deltaSync(self.s, self.getCustomers, 'h2o.customer', apply, query)
 
     def createCustomer(self, payload):
         """
@@ -50,12 +67,9 @@ class H2o(object):
         logging.info('Init creating customer...')
         print(payload)
         rq = f'{self.host}/customer'
-        agent=self.s.getAgent()
-        r = agent.post(rq, json=payload)
-        if 201 != r.status_code:
-            parseApiError(r)
+        customer = self.s.call('post', rq, expect=201, json=payload)
+        if customer is False:
             return False
-        customer = json.loads(r.text)
         logging.info('Customer %s created' % customer['data']['id'])
         return customer
 
@@ -65,13 +79,7 @@ class H2o(object):
         """
         logging.info(f'Reading customer {customer_id}...')        
         rq = f'{self.host}/customer/{customer_id}'
-        agent=self.s.getAgent()
-        r = agent.get(rq)
-        if 200 != r.status_code:
-            parseApiError(r)
-            return False
-        customer = json.loads(r.text)
-        return customer
+        return self.s.call('get', rq)
 
     def getCustomerFromErp(self, customer_id, erp_id):
         """
@@ -83,15 +91,20 @@ class H2o(object):
             'erp_id': erp_id, 
             'ext_id': customer_id 
             }
-        agent=self.s.getAgent()
-        r = agent.get(rq, params=payload)
-        if 200 != r.status_code:
-            parseApiError(r)
+        customer = self.s.call('get', rq, params=payload)
+        if customer is False:
             return False
-        customer = json.loads(r.text)
         logging.info('Find customer %s' % customer['data']['id'])
         return customer
-    
+
+    def loadCustomerFromErp(self, customer_id, erp_id):
+        """
+        Future of getCustomerFromErp, batched with the concurrent requests.
+        """
+        loader = self.s.getLoader('h2o.customerFromErp', lambda key: self.getCustomerFromErp(*key),
+            resource=f'{self.host}/customer')
+        return loader.load((customer_id, erp_id))
+
     def getCustomerFromTax(self, code):
         """
         Read customer from tax code.
@@ -101,12 +114,9 @@ class H2o(object):
         payload = {
             'code': code
             }
-        agent=self.s.getAgent()
-        r = agent.get(rq, params=payload)
-        if 200 != r.status_code:
-            parseApiError(r)
+        customer = self.s.call('get', rq, params=payload)
+        if customer is False:
             return False
-        customer = json.loads(r.text)
         logging.info('Find customer %s' % customer['data']['id'])
         return customer
 
@@ -116,12 +126,9 @@ class H2o(object):
         """
         logging.info(f'Updating customer {customer_id}...')
         rq = f'{self.host}/customer/{customer_id}'
-        agent=self.s.getAgent()
-        r = agent.post(rq, json=payload)
-        if 200 != r.status_code:
-            parseApiError(r)
+        customer = self.s.call('post', rq, json=payload)
+        if customer is False:
             return False
-        customer = json.loads(r.text)
         logging.info(f'Updated customer {customer_id}')
         return customer
 
@@ -131,13 +138,7 @@ class H2o(object):
         """
         logging.info(f'Init creating customer {customer_id} ERP xref ...')
         rq = f'{self.host}/customer/{customer_id}/xerp'
-        agent=self.s.getAgent()
-        r = agent.post(rq, json=payload)
-        if 201 != r.status_code:
-            parseApiError(r)
-            return False
-        resp = json.loads(r.text)
-        return resp            
+        return self.s.call('post', rq, expect=201, json=payload)
 
     #customer address
     def createCustomerAddress(self, customer_id:int, payload):
@@ -146,13 +147,7 @@ class H2o(object):
         """
         logging.info(f'Creating customer {customer_id} address')
         rq = f'{self.host}/customer/{customer_id}/address'
-        agent=self.s.getAgent()
-        r = agent.post(rq, json=payload)
-        if 201 != r.status_code:
-            parseApiError(r)
-            return False
-        address = json.loads(r.text)
-        return address
+        return self.s.call('post', rq, expect=201, json=payload)
 
     def updateCustomerAddress(self, customer_id:int, address_id:int, payload):
         """
@@ -160,13 +155,7 @@ class H2o(object):
         """
         logging.info(f'Init updating {customer_id} address {address_id} ...')
         rq = f'{self.host}/customer/{customer_id}/address/{address_id}'
-        agent=self.s.getAgent()
-        r = agent.post(rq, json=payload)
-        if 200 != r.status_code:
-            parseApiError(r)
-            return False
-        address = json.loads(r.text)
-        return address
+        return self.s.call('post', rq, json=payload)
     
     def getCustomerAddresses(self, customer_id:int, query=None):
         """
@@ -174,12 +163,7 @@ class H2o(object):
         """
         logging.info(f'Getting all customer {customer_id} addresses')
         rq = '{self.host}/customer/{customer_id}/address'
-        agent=self.s.getAgent()
-        r = agent.get(rq, params=query)
-        if 200 != r.status_code:
-            return False
-        addresses = json.loads(r.text)
-        return addresses
+        return self.s.call('get', rq, params=query)
 
     def getCustomerAddress(self, customer_id:int, address_id:int, params=None):
         """
@@ -187,12 +171,7 @@ class H2o(object):
         """
         logging.info(f'Get customer {customer_id} address {address_id}')
         rq = f'{self.host}/customer/{customer_id}/address/{address_id}'
-        agent=self.s.getAgent()
-        r = agent.get(rq, params=params)
-        if 200 != r.status_code:
-            return False
-        address = json.loads(r.text)
-        return address
+        return self.s.call('get', rq, params=params)
 
     def getCustomerAddressFromExtId(self, customer_id:int, ext_id:str, query=None):
         """
@@ -206,13 +185,7 @@ class H2o(object):
             new_payload = dict(item.split("=") for item in query.split('&'))
             payload = {**payload, **new_payload}        
         rq = f'{self.host}/customer/{customer_id}/address/findByExtId'
-        agent=self.s.getAgent()
-        r = agent.get(rq, params=payload)
-        if 200 != r.status_code:
-            parseApiError(r)
-            return False
-        address= json.loads(r.text)
-        return address
+        return self.s.call('get', rq, params=payload)
         
     #competitor
     def createCompetitor(self, payload):
@@ -221,12 +194,9 @@ class H2o(object):
         """
         logging.info('Init creating competitor...')
         rq = f'{self.host}/competitor'
-        agent=self.s.getAgent()
-        r = agent.post(rq, json=payload)
-        if 201 != r.status_code:
-            parseApiError(r)
+        competitor = self.s.call('post', rq, expect=201, json=payload)
+        if competitor is False:
             return False
-        competitor = json.loads(r.text)
         logging.info('Competitor %s created' % competitor['data']['id'])
         return competitor
 
@@ -236,13 +206,7 @@ class H2o(object):
         """
         logging.info(f'Reading competitor {competitor_id}...')        
         rq = f'{self.host}/competitor/{competitor_id}'
-        agent=self.s.getAgent()
-        r = agent.get(rq)
-        if 200 != r.status_code:
-            parseApiError(r)
-            return False
-        competitor = json.loads(r.text)
-        return competitor    
+        return self.s.call('get', rq)
     
     #order
     def createOrder(self, payload):
@@ -251,12 +215,9 @@ class H2o(object):
         """
         logging.info('Creating order %s' % payload)
         rq = f'{self.host}/order'
-        agent=self.s.getAgent()
-        r = agent.post(rq, json=payload)
-        if 201 != r.status_code:
-            parseApiError(r)
+        order = self.s.call('post', rq, expect=201, json=payload)
+        if order is False:
             return False
-        order = json.loads(r.text)
         logging.info('Order %s created' % order['data']['id'])
         return order
 
@@ -266,12 +227,28 @@ class H2o(object):
         """
         logging.info('Getting orders.')
         rq = f'{self.host}/order'
-        agent=self.s.getAgent()
-        r = agent.get(rq, params=query)
-        if 200 != r.status_code:
-            return False
-        orders = json.loads(r.text)
-        return orders
+        return self.s.call('get', rq, params=query)
+
+    def iterOrders(self, query=None, take=100):
+        """
+        Iterate all orders, page by page.
+        """
+        logging.info('Iterating all the orders')
+        return paginate(self.getOrders, query, take)
+
+    def exportOrders(self, query=None, take=100, concurrency=8, ordered=True, strict=False):
+        """
+        Bulk export all orders, pages read concurrently.
+        """
+        logging.info(f'Exporting all the orders, concurrency {concurrency}')
+        return Export(self.getOrders, query, take, concurrency, ordered, strict)
+
+    def syncOrdersDelta(self, apply=None, query=None):
+        """
+        Fetch the orders changed since the last run into apply(records)
+        or the local record store. Returns the report.
+        """
+        return deltaSync(self.s, self.getOrders, 'h2o.order', apply, query)
 
     def getOrder(self, order_id:int):
         """
@@ -279,13 +256,7 @@ class H2o(object):
         """
         logging.info(f'Reading order {order_id}..')
         rq = f'{self.host}/order/{order_id}'
-        agent=self.s.getAgent()
-        r = agent.get(rq)
-        if 200 != r.status_code:
-            parseApiError(r)
-            return False
-        order = json.loads(r.text)
-        return order        
+        return self.s.call('get', rq)
 
     def getOrderFromErp(self, erp_id:int, ext_id):
         """
@@ -297,28 +268,27 @@ class H2o(object):
             'erp_id': erp_id, 
             'ext_id': ext_id 
             }
-        agent=self.s.getAgent()
-        r = agent.get(rq, params=payload)
-        if 200 != r.status_code:
-            parseApiError(r)
+        order = self.s.call('get', rq, params=payload)
+        if order is False:
             return False
-        order = json.loads(r.text)
         logging.info('Find order %s' % order['data']['id'])
         return order
 
+    def loadOrderFromErp(self, erp_id:int, ext_id):
+        """
+        Future of getOrderFromErp, batched with the concurrent requests.
+        """
+        loader = self.s.getLoader('h2o.orderFromErp', lambda key: self.getOrderFromErp(*key),
+            resource=f'{self.host}/order')
+        return loader.load((erp_id, ext_id))
+
     def createOrderDetail(self, order_id:int, payload):
         """
         Create order detail.
         """
         logging.info('Creating order detail')
         rq = f'{self.host}/order/{order_id}/detail'
-        agent=self.s.getAgent()
-        r = agent.post(rq, json=payload)
-        if 201 != r.status_code:
-            parseApiError(r)
-            return False
-        order = json.loads(r.text)
-        return order
+        return self.s.call('post', rq, expect=201, json=payload)
 
     #order type
     def getOrderTypes(self, query=None):
@@ -327,12 +297,7 @@ class H2o(object):
         """
         logging.info('Getting order types.')
         rq = f'{self.host}/order/type'
-        agent=self.s.getAgent()
-        r = agent.get(rq, params=query)
-        if 200 != r.status_code:
-            return False
-        orderTypes = json.loads(r.text)
-        return orderTypes
+        return self.s.call('get', rq, params=query)
 
     def getOrderTypeFromName(self, name:str):
         """
@@ -343,12 +308,7 @@ class H2o(object):
         payload={
             'name':name
         }
-        agent=self.s.getAgent()
-        r = agent.get(rq, params=payload)
-        if 200 != r.status_code:
-            return False
-        orderType = json.loads(r.text)
-        return orderType        
+        return self.s.call('get', rq, params=payload)
 
     def createOrderType(self, payload):
         """
@@ -356,11 +316,16 @@ class H2o(object):
         """
         logging.info('Creating new order type.')
         rq = f'{self.host}/order/type'
-        agent=self.s.getAgent()
-        r = agent.get(rq, json=payload)
-        if 201 != r.status_code:
-            parseApiError(r)
+        orderType = self.s.call('post', rq, expect=201, json=payload)
+        if orderType is False:
             return False
-        orderType = json.loads(r.text)
         logging.info(f"Order type {orderType['data']['id']} created")
-        return orderType        
+        return orderType
+
+    def ensureOrderType(self, name:str, payload=None):
+        """
+        Order type id from name, created with payload if missing.
+        """
+        return self.s.ensurer.ensure('h2o.ordertype', name,
+            lambda: self.getOrderTypeFromName(name),
+            lambda: self.createOrderType({**(payload or {}), 'name': name}))
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Hook asyncio SDK
+"""
+
+import logging
+
+from gomma.aio import AsyncClient
+
+
+class AsyncHook(AsyncClient):
+    """
+    Hook asyncio class, same methods of Hook.
+    """
+    service = 'coral'
+
+    #ERP
+    async def erp_sap_material(self, payload):
+        """ Call erp sap worker queue. """
+        logging.debug('Calling erp sap queue')
+        rq = f'{self.host}/erp/sap/material'
+        return await self._request('post', rq, expect=201, parse=False, json=payload)
+
+    #ERP SAP CUSTOMER
+    async def erp_sap_customer(self, payload):
+        """ Call erp sap customer worker queue. """
+        logging.debug('Calling erp sap customer queue')
+        rq = f'{self.host}/erp/sap/customer'
+        return await self._request('post', rq, expect=201, parse=False, json=payload)
+
+    #ERP SAP SUPPLIER
+    async def erp_sap_supplier(self, payload):
+        """ Call erp sap supplier worker queue. """
+        logging.debug('Calling erp sap supplier queue')
+        rq = f'{self.host}/erp/sap/supplier'
+        return await self._request('post', rq, expect=201, parse=False, json=payload)
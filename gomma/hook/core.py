@@ -10,11 +10,10 @@ __author__ = "Davide Pellegrino"
 __version__ = "1.1.1"
 __date__ = "2019-06-11"
 
-import json
 import logging
 import time
 
-from gomma.session import Session, parseApiError
+from gomma.session import getSession
 
 logger = logging.getLogger(__name__)
 
@@ -28,7 +27,7 @@ class Hook(object):
         Initialize main class with this and that.
         """
         logging.info('Init Coral SDK')
-        s = Session(profile_name)
+        s = getSession(profile_name)
         host=s.config.get('agapi_host')
         self.host = f'{host}/coral'
         self.s = s
@@ -40,12 +39,7 @@ class Hook(object):
         """
         logging.debug(f'Calling erp sap queue')
         rq = f'{self.host}/erp/sap/material'
-        agent=self.s.getAgent()
-        r = agent.post(rq, json=payload)
-        if 201 != r.status_code:
-            parseApiError(r)
-            return False
-        return True
+        return self.s.call('post', rq, expect=201, parse=False, json=payload)
    
     #ERP SAP CUSTOMER
     def erp_sap_customer(self, payload):
@@ -54,12 +48,7 @@ class Hook(object):
         """
         logging.debug(f'Calling erp sap customer queue')
         rq = f'{self.host}/erp/sap/customer'
-        agent=self.s.getAgent()
-        r = agent.post(rq, json=payload)
-        if 201 != r.status_code:
-            parseApiError(r)
-            return False
-        return True    
+        return self.s.call('post', rq, expect=201, parse=False, json=payload)
 
     #ERP SAP SUPPLIER
     def erp_sap_supplier(self, payload):
@@ -68,9 +57,6 @@ class Hook(object):
         """
         logging.debug(f'Calling erp sap supplier queue')
         rq = f'{self.host}/erp/sap/supplier'
-        agent=self.s.getAgent()
-        r = agent.post(rq, json=payload)
-        if 201 != r.status_code:
-            parseApiError(r)
+        if not self.s.call('post', rq, expect=201, parse=False, json=payload):
             return False
         return True   
\ No newline at end of file
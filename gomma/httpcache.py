@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Conditional request cache: validators and bodies of GET responses,
+revalidated with If-None-Match / If-Modified-Since.
+"""
+
+import hashlib
+import json
+import logging
+
+from gomma.utility import codec
+from gomma.utility.cache import Cache
+
+
+class HttpCache(object):
+    """
+    Store of GET responses in the file cache or in redis.
+    """
+    prefix = 'ag:gomma:http:'
+
+    def __init__(self, session):
+        """
+        Initialize from the session profile: http_cache=file or redis.
+        """
+        config = session.config
+        self.s = session
+        self.backend = config.get('http_cache', 'file').lower()
+        self.ttl = config.getint('http_cache_ttl', 86400)
+        if 'redis' != self.backend:
+            self.backend = 'file'
+            self.store = Cache(config.get('http_cache_path'), ttl=self.ttl,
+                maxBytes=config.getint('http_cache_max_bytes', 256 * 1024 * 1024),
+                compress=True)
+        self.stats = {'hits': 0, 'misses': 0, 'stored': 0, 'bytes_saved': 0}
+        logging.debug(f'HTTP cache on {self.backend}')
+
+    def key(self, url, params=None):
+        """Cache key of url with params."""
+        if isinstance(params, dict):
+            params = sorted((k, str(v)) for k, v in params.items())
+        name = json.dumps([self.s.profile_name, url, params])
+        return hashlib.sha1(name.encode()).hexdigest()
+
+    def read(self, key):
+        """
+        Cached (validators, body) or None.
+        """
+        if 'redis' == self.backend:
+            raw = self.s.cache.get(self.prefix + key)
+            if isinstance(raw, str):
+                raw = raw.encode('utf-8')
+        else:
+            raw = self.store.read(key)
+        if not raw:
+            self.stats['misses'] += 1
+            return None
+        head, _, body = raw.partition(b'\n')
+        return codec.loads(head), body
+
+    def validators(self, cached):
+        """Conditional headers for cached entry."""
+        validators, _ = cached
+        headers = {}
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+        return headers
+
+    def hit(self, cached):
+        """Cached body for a 304 response."""
+        _, body = cached
+        self.stats['hits'] += 1
+        self.stats['bytes_saved'] += len(body)
+        return body
+
+    def save(self, key, response):
+        """
+        Store response body if it carries a validator.
+        """
+        validators = {
+            'etag': response.headers.get('etag'),
+            'last_modified': response.headers.get('last-modified')
+        }
+        if not (validators['etag'] or validators['last_modified']):
+            return False
+        raw = codec.dumps(validators) + b'\n' + response.content
+        if 'redis' == self.backend:
+            self.s.cache.set(self.prefix + key, raw, ex=self.ttl or None)
+        elif not self.store.create(key, raw):
+            return False
+        self.stats['stored'] += 1
+        return True
+
+    def getStats(self):
+        """Counters."""
+        return dict(self.stats)
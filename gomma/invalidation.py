@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Cache invalidation: evicts the cached entries of a changed resource
+and broadcasts the change to the other processes over redis pub/sub.
+"""
+
+import logging
+import threading
+import time
+import uuid
+import weakref
+from urllib.parse import urlsplit
+
+from redis.exceptions import RedisError
+
+
+def resourceTags(url):
+    """
+    Tags touched by a change of url: its path and every parent,
+    /element/item/5/warehouse/3 -> /element/item/5/warehouse/3, ..., /element
+    """
+    parts = urlsplit(url).path.lower().rstrip('/').split('/')
+    return ['/'.join(parts[:i]) for i in range(len(parts), 1, -1)]
+
+
+class Invalidator(object):
+    """
+    Local listeners called with the changed path, in this process
+    and, through the channel, in every other process.
+    """
+    channel = 'ag:gomma:invalidate'
+
+    def __init__(self, session):
+        """
+        Initialize from the session profile: invalidation_broadcast=false disables pub/sub.
+        """
+        self.s = session
+        self.broadcast = session.config.getboolean('invalidation_broadcast', True)
+        self.origin = uuid.uuid4().hex
+        self.listeners = []
+        self.stats = {'invalidated': 0, 'published': 0, 'received': 0}
+        self.__subscriber = False
+        self.__pubsub = False
+        self.__lock = threading.Lock()
+
+    def addListener(self, callback, weak=False):
+        """
+        Call callback(path) on every change, starts the subscriber.
+        weak=True holds a bound method weakly: it is dropped with its instance.
+        """
+        if weak:
+            callback = weakref.WeakMethod(callback)
+        with self.__lock:
+            self.listeners.append(callback)
+        if self.broadcast:
+            self.__startSubscriber()
+        return True
+
+    def removeListener(self, callback):
+        """
+        Stop calling callback, weak or not.
+        """
+        with self.__lock:
+            self.listeners = [c for c in self.listeners
+                if c != callback and not (isinstance(c, weakref.WeakMethod) and c() == callback)]
+        return True
+
+    def invalidate(self, url):
+        """
+        Evict url and its parents from the shared caches, notify listeners.
+        """
+        path = urlsplit(url).path.lower().rstrip('/')
+        logging.debug(f'Invalidating {path}')
+        self.stats['invalidated'] += 1
+        self.s.lookupCache.invalidate(resourceTags(path))
+        self.__notify(path)
+        if self.broadcast:
+            try:
+                self.s.cache.publish(self.channel, f'{self.origin} {path}')
+                self.stats['published'] += 1
+            except RedisError:
+                logging.exception('Unable to broadcast invalidation')
+        return True
+
+    def close(self):
+        """Stop subscriber."""
+        if self.__pubsub:
+            try:
+                self.__pubsub.close()
+            except RedisError:
+                pass
+            self.__pubsub = False
+        return True
+
+    def __notify(self, path):
+        """ Call listeners. """
+        dead = False
+        for callback in list(self.listeners):
+            if isinstance(callback, weakref.WeakMethod):
+                method = callback()
+                if method is None:
+                    dead = True
+                    continue
+                callback = method
+            try:
+                callback(path)
+            except Exception:
+                logging.exception('Invalidation listener failed')
+        if dead:
+            with self.__lock:
+                self.listeners = [c for c in self.listeners
+                    if not (isinstance(c, weakref.WeakMethod) and c() is None)]
+
+    def __startSubscriber(self):
+        """ Listen to invalidations of other processes. """
+        with self.__lock:
+            if self.__subscriber and self.__subscriber.is_alive():
+                return True
+            self.__pubsub = self.s.cache.pubsub(ignore_subscribe_messages=True)
+            self.__pubsub.subscribe(self.channel)
+            self.__subscriber = threading.Thread(target=self.__listen, args=(self.__pubsub,),
+                name=f'gomma-invalidate-{self.s.profile_name}', daemon=True)
+            self.__subscriber.start()
+        return True
+
+    def __listen(self, pubsub):
+        """ Subscriber loop. """
+        while self.__pubsub is pubsub:
+            try:
+                message = pubsub.get_message(timeout=1)
+            except (RedisError, ValueError, AttributeError):
+                if self.__pubsub is not pubsub:
+                    return
+                logging.warning('Invalidation channel lost, subscribing again')
+                time.sleep(1)
+                try:
+                    pubsub.subscribe(self.channel)
+                except RedisError:
+                    pass
+                continue
+            if not message or 'message' != message.get('type'):
+                continue
+            origin, _, path = str(message['data']).partition(' ')
+            if origin == self.origin:
+                continue
+            self.stats['received'] += 1
+            logging.debug(f'Invalidated {path} by {origin}')
+            self.__notify(path)
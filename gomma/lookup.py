@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Lookup cache: findBy* responses shared by every process on the session redis.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from redis.exceptions import RedisError
+
+from gomma.utility import codec
+
+
+class LookupCache(object):
+    """
+    Per endpoint opt-in cache of GET responses, 404s are cached
+    for negative_ttl seconds.
+    """
+    prefix = 'ag:gomma:lookup:'
+    missing = '404'
+
+    def __init__(self, session):
+        """
+        Initialize from the session profile: lookup.<path>=ttl enables path.
+        """
+        config = session.config
+        self.s = session
+        self.negativeTtl = config.getint('lookup_negative_ttl', 30)
+        self.ttls = {}
+        for key in config:
+            if key.startswith('lookup./'):
+                self.enable(key[7:], config.getint(key))
+        self.stats = {'hits': 0, 'misses': 0, 'negative_hits': 0, 'stored': 0,
+            'invalidated': 0, 'errors': 0, 'bypassed': 0}
+        self.__local = threading.local()
+
+    def enable(self, path, ttl=300):
+        """Cache responses of url path (e.g. /element/item/findByCode) for ttl seconds."""
+        path = urlsplit(path).path.lower().rstrip('/')
+        if ttl:
+            self.ttls[path] = ttl
+        else:
+            self.ttls.pop(path, None)
+        return True
+
+    def key(self, url, params=None):
+        """Redis key of url with params, None if path is not cached."""
+        if not self.ttls:
+            return None
+        path = urlsplit(url).path.lower().rstrip('/')
+        if path not in self.ttls:
+            return None
+        if isinstance(params, dict):
+            params = sorted((k, str(v)) for k, v in params.items())
+        name = hashlib.sha1(json.dumps([url, params]).encode()).hexdigest()
+        return f'{self.prefix}{path}:{name}'
+
+    @contextmanager
+    def bypass(self):
+        """
+        Reads of the calling thread miss inside the block (the API is asked
+        and the entry rewritten), e.g. to re-check before a create.
+        """
+        depth = getattr(self.__local, 'bypass', 0)
+        self.__local.bypass = depth + 1
+        try:
+            yield self
+        finally:
+            self.__local.bypass = depth
+
+    def bypassing(self):
+        """Reads of the calling thread are bypassed."""
+        return getattr(self.__local, 'bypass', 0) > 0
+
+    def read(self, key):
+        """
+        Cached response, False for a cached 404, None on miss.
+        """
+        if self.bypassing():
+            self.stats['bypassed'] += 1
+            return None
+        try:
+            raw = self.s.cache.get(key)
+        except RedisError:
+            logging.exception('Lookup cache read failed')
+            self.stats['errors'] += 1
+            return None
+        if raw is None:
+            self.stats['misses'] += 1
+            return None
+        if self.missing == raw:
+            self.stats['negative_hits'] += 1
+            logging.debug(f'Cached not found {key}')
+            return False
+        self.stats['hits'] += 1
+        return codec.loads(raw)
+
+    def save(self, key, content, data=None):
+        """
+        Store response body, tagged with the found resource
+        (/element/item/findByCode -> /element/item/<id>).
+        """
+        path = key[len(self.prefix):].rsplit(':', 1)[0]
+        tag = path.rsplit('/', 1)[0]
+        found = data.get('data') if isinstance(data, dict) else None
+        if isinstance(found, dict) and found.get('id') is not None:
+            tag = f"{tag}/{found['id']}"
+        return self.__set(key, content, self.ttls.get(path), tag)
+
+    def saveMissing(self, key):
+        """Store a 404, tagged with the collection."""
+        path = key[len(self.prefix):].rsplit(':', 1)[0]
+        return self.__set(key, self.missing, self.negativeTtl, path.rsplit('/', 1)[0])
+
+    def invalidate(self, tags):
+        """
+        Delete the entries of the resource tags.
+        """
+        if not self.ttls:
+            return 0
+        tagKeys = [f'{self.prefix}tag:{tag}' for tag in tags]
+        try:
+            pipe = self.s.cache.pipeline()
+            for tagKey in tagKeys:
+                pipe.smembers(tagKey)
+            keys = [key for members in pipe.execute() for key in members]
+            self.s.cache.delete(*keys, *tagKeys)
+        except RedisError:
+            logging.exception('Lookup cache invalidation failed')
+            self.stats['errors'] += 1
+            return 0
+        self.stats['invalidated'] += len(keys)
+        return len(keys)
+
+    def __set(self, key, value, ttl, tag):
+        """ Set key and add it to tag, ignore redis failures. """
+        if not ttl:
+            return False
+        tagKey = f'{self.prefix}tag:{tag}'
+        try:
+            pipe = self.s.cache.pipeline()
+            pipe.set(key, value, ex=ttl)
+            pipe.sadd(tagKey, key)
+            pipe.expire(tagKey, max(ttl, self.maxTtl()))
+            pipe.execute()
+        except RedisError:
+            logging.exception('Lookup cache write failed')
+            self.stats['errors'] += 1
+            return False
+        self.stats['stored'] += 1
+        return True
+
+    def maxTtl(self):
+        """Longest entry ttl."""
+        return max([self.negativeTtl, *self.ttls.values()])
+
+    def getStats(self):
+        """Counters."""
+        return dict(self.stats)
@@ -10,11 +10,28 @@ import configparser
 import json
 import logging
 import os
+import threading
 import time
 from sys import exit
+from urllib.parse import urlsplit
 
 import requests
-from redis import Redis
+from requests.adapters import HTTPAdapter
+from redis import ConnectionPool, Redis
+from redis.exceptions import LockError
+
+from gomma.executor import Executor
+from gomma.httpcache import HttpCache
+from gomma.invalidation import Invalidator, resourceTags
+from gomma.lookup import LookupCache
+from gomma.utility import codec
+from gomma.utility.diff import StateCache
+from gomma.utility.ensure import Ensurer, recordId
+from gomma.utility.loader import Loader
+from gomma.utility.singleflight import SingleFlight
+
+_sessions = {}
+_sessionsLock = threading.Lock()
 
 class Session(object):
     """
@@ -24,6 +41,12 @@ class Session(object):
     __agent=False
     __credentials=False
     __cacheKey = 'ag:gomma'
+    __lockKey = 'ag:gomma:lock'
+    __token=False
+    __tokenExpireAt=0
+    __rejectedUid=None
+    __refresher=False
+    tokenRefreshWindow=900
 
     def __init__(self, profile_name=None):
         """
@@ -48,23 +71,57 @@ class Session(object):
             logging.error(f'Unknow {profile_name} credentials!')
             exit(1)
         self.__credentials=ccp[profile_name]
+        self.profile_name=profile_name
+        self.clientsCreated=0
+        self.tokenStats={'redis_calls': 0, 'redis_avoided': 0, 'unauthorized': 0,
+            'renewed': 0, 'adopted': 0}
+        self.__tokenLock=threading.RLock()
+        self.__stopRefresh=threading.Event()
         #cache
         self.__setCache()
+        self.executor=Executor(self)
+        self.httpCache=False
+        if self.config.get('http_cache', 'false').lower() not in ('false', 'no', 'off', '0'):
+            self.httpCache=HttpCache(self)
+        self.lookupCache=LookupCache(self)
+        self.invalidator=Invalidator(self)
+        self.singleFlight=False
+        if self.config.getboolean('single_flight', True):
+            self.singleFlight=SingleFlight()
+        self.loaders={}
+        self.states=False
+        self.ensurer=Ensurer(self.cache, self.config.getint('ensure_lock_timeout', 30),
+            self.lookupCache)
+        if self.config.get('json_codec'):
+            codec.setCodec(self.config.get('json_codec'))
 
     def __setCache(self):
         """ set cache """
         logging.debug('Setting redis cache...')
         redis_host = self.config.get('redis_host', '127.0.0.1')
         redis_pass = self.__credentials.get('redis_password', None)
-        self.cache=Redis(host=redis_host, password=redis_pass, decode_responses=True)
+        redis_max = self.config.getint('redis_max_connections', 16)
+        pool = ConnectionPool(host=redis_host, password=redis_pass,
+            max_connections=redis_max, decode_responses=True)
+        self.cache=Redis(connection_pool=pool)
         return True
 
-    def __getToken(self):
+    def __getToken(self, ttl=None):
         """ Read session token. If not exists, it creates it. """
         logging.debug('Init reading token..')
         token = self.cache.hgetall(self.__cacheKey)
+        self.tokenStats['redis_calls'] += 1
+        if token and token.get('uid') == self.__rejectedUid:
+            logging.debug('Cached token was rejected, dropping it.')
+            self.cache.delete(self.__cacheKey)
+            token = None
         if not token:
-            token = self.__createToken()
+            return self.__renewToken()
+        if ttl is None:
+            ttl = self.cache.ttl(self.__cacheKey)
+            self.tokenStats['redis_calls'] += 1
+        self.__token = token
+        self.__tokenExpireAt = int(time.time()) + ttl
         return token
 
     def __setToken(self, payload):
@@ -78,6 +135,10 @@ class Session(object):
         tokenExpireAt=int(time.time()) + expire_in
         self.cache.hmset(self.__cacheKey, token)
         self.cache.expireat(self.__cacheKey, int(tokenExpireAt))
+        self.tokenStats['redis_calls'] += 2
+        self.__token = token
+        self.__tokenExpireAt = tokenExpireAt
+        self.__rejectedUid = None
         return token
 
     def __createToken(self):
@@ -108,11 +169,111 @@ class Session(object):
         token = self.__setToken(responseRefresh)
         return token
 
-    def __createSessionAgent(self, token=None):
-        """ Create requests session. """
+    def __renewToken(self, refresh=False):
+        """
+        Create or refresh token holding a redis lock, so only one process
+        calls auth while the others wait and adopt its token.
+        """
+        logging.debug(f'Init renew token (refresh {refresh}) ...')
+        timeout = self.config.getint('token_lock_timeout', 30)
+        lock = self.cache.lock(self.__lockKey, timeout=timeout, blocking_timeout=timeout)
+        locked = lock.acquire()
+        if not locked:
+            logging.warning('Token lock timeout, renewing anyway.')
+        try:
+            token = self.cache.hgetall(self.__cacheKey)
+            ttl = self.cache.ttl(self.__cacheKey)
+            self.tokenStats['redis_calls'] += 2
+            # renewed by another worker when the shared token outlives ours:
+            # a refresh may keep the uid, only the expiry moves
+            expireAt = int(time.time()) + ttl
+            if token and token.get('uid') != self.__rejectedUid \
+                and ttl > self.tokenRefreshWindow and expireAt > self.__tokenExpireAt + 1:
+                logging.debug('Token already renewed by another worker.')
+                self.tokenStats['adopted'] += 1
+                self.__token = token
+                self.__tokenExpireAt = expireAt
+                return token
+            if refresh and token and token.get('uid') != self.__rejectedUid:
+                self.__agent.headers.update({'x-uid': token['uid']})
+                renewed = self.__refreshToken()
+            else:
+                renewed = self.__createToken()
+            if renewed:
+                self.tokenStats['renewed'] += 1
+            return renewed
+        finally:
+            if locked:
+                try:
+                    lock.release()
+                except LockError:
+                    logging.warning('Token lock expired before release.')
+
+    def __startRefresher(self):
+        """ Start background token refresher. """
+        if not self.config.getboolean('token_refresh', True):
+            return False
+        if self.__refresher and self.__refresher.is_alive():
+            return True
+        logging.debug('Starting token refresher')
+        self.__stopRefresh.clear()
+        self.__refresher = threading.Thread(target=self.__refreshLoop,
+            name=f'gomma-token-{self.profile_name}', daemon=True)
+        self.__refresher.start()
+        return True
+
+    def __refreshLoop(self):
+        """ Renew token before the refresh window opens. """
+        ahead = self.config.getint('token_refresh_ahead', 60)
+        while not self.__stopRefresh.is_set():
+            wait = self.__tokenExpireAt - self.tokenRefreshWindow - ahead - time.time()
+            if wait > 0:
+                self.__stopRefresh.wait(wait)
+                continue
+            with self.__tokenLock:
+                try:
+                    token = self.__renewToken(refresh=bool(self.__token))
+                    if token:
+                        self.__createSessionAgent(token)
+                except Exception:
+                    logging.exception('Background token refresh failed')
+            self.__stopRefresh.wait(max(ahead, 10) / 2)
+
+    def __createHttpAgent(self):
+        """ Create the pooled requests session shared by every client. """
         logging.debug('Creating new requests session')
+        pool_connections = self.config.getint('pool_connections', 10)
+        pool_maxsize = self.config.getint('pool_maxsize', 10)
+        pool_block = self.config.getboolean('pool_block', False)
+        adapter = HTTPAdapter(pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize, pool_block=pool_block)
         agent=requests.Session()
+        agent.mount('https://', adapter)
+        agent.mount('http://', adapter)
         agent.headers.update({'user-agent': 'Gomma-Session'})
+        agent.hooks['response'].append(self.__onResponse)
+        return agent
+
+    def __onResponse(self, response, *args, **kwargs):
+        """ Forget in-memory token when API rejects it. """
+        if 401 == response.status_code:
+            logging.warning(f'Token rejected by {response.url}')
+            self.rejectToken(response.request.headers.get('x-uid'))
+        return response
+
+    def rejectToken(self, uid):
+        """Mark token as rejected: next agent request reads it again."""
+        self.tokenStats['unauthorized'] += 1
+        self.__rejectedUid = uid
+        self.__tokenExpireAt = 0
+        return True
+
+    def __createSessionAgent(self, token=None):
+        """ Set token on the requests session. """
+        logging.debug('Setting token on requests session')
+        agent=self.__agent
+        if not agent:
+            agent=self.__createHttpAgent()
         if not token:
             token = self.__getToken()
             if not token:return False
@@ -121,33 +282,262 @@ class Session(object):
         except Exception:
             logging.error("Invalid token keys", exc_info=True)
         self.__agent=agent
+        self.__startRefresher()
         return agent
 
+    def __isTokenFresh(self):
+        """ In-memory token is valid out of the refresh window. """
+        ttl = self.__tokenExpireAt - time.time()
+        return self.__token and ttl > self.tokenRefreshWindow
+
+    def peekAgent(self):
+        """Agent when the in-memory token is fresh, False otherwise (no IO)."""
+        agent=self.__agent
+        if agent and self.__isTokenFresh():
+            self.tokenStats['redis_avoided'] += 1
+            return agent
+        return False
+
     def getAgent(self):
         """Retrive API request session."""
         logging.debug('Get request agent')
-        agent=self.__agent
-        if not agent:
-            agent=self.__createSessionAgent()
-        else:
-            ttl = self.cache.ttl(self.__cacheKey)
-            if ttl < 1:
-                agent=self.__createSessionAgent()
-            elif 1 <= ttl <= 900:
-                refreshedToken=self.__refreshToken()
-                agent = self.__createSessionAgent(refreshedToken)
+        agent=self.peekAgent()
+        if agent:
+            return agent
+        with self.__tokenLock:
+            agent=self.__agent
             if not agent:
-                logging.error('Unable to create agent!')
-                exit(1)
+                agent=self.__createSessionAgent()
+            elif self.__isTokenFresh():
+                self.tokenStats['redis_avoided'] += 1
+            else:
+                ttl = self.cache.ttl(self.__cacheKey)
+                self.tokenStats['redis_calls'] += 1
+                if ttl < 1:
+                    agent=self.__createSessionAgent()
+                elif 1 <= ttl <= self.tokenRefreshWindow:
+                    refreshedToken=self.__renewToken(refresh=True)
+                    agent = self.__createSessionAgent(refreshedToken)
+                else:
+                    agent = self.__createSessionAgent(self.__getToken(ttl))
+                if not agent:
+                    logging.error('Unable to create agent!')
+                    exit(1)
         return agent
 
+    def request(self, method, url, **kwargs):
+        """Send request through the executor."""
+        return self.executor.request(method, url, **kwargs)
+
+    def call(self, method, url, expect=200, parse=True, missing=False, **kwargs):
+        """
+        Send request, check expected status and decode json.
+        Returns False on failure, missing on a 404, True if not parse.
+        Concurrent identical GETs share one request, each caller gets its own copy.
+        """
+        if not (self.singleFlight and parse and 'get' == method.lower()) \
+            or self.lookupCache.bypassing():
+            return self.__call(method, url, expect, parse, missing, **kwargs)
+        params = kwargs.get('params')
+        if isinstance(params, dict):
+            params = sorted((k, str(v)) for k, v in params.items())
+        headers = sorted((kwargs.get('headers') or {}).items())
+        key = json.dumps([url, params, headers, expect, missing, kwargs.get('timeout')], default=str)
+        return self.singleFlight.do(key,
+            lambda: self.__call(method, url, expect, parse, missing, **kwargs), shareResult)
+
+    def __call(self, method, url, expect=200, parse=True, missing=False, **kwargs):
+        """
+        Send request between beforeCall and afterCall.
+        """
+        if kwargs.get('json') is not None:
+            kwargs['data'] = codec.dumps(kwargs.pop('json'))
+            kwargs['headers'] = {**(kwargs.get('headers') or {}), 'content-type': 'application/json'}
+        found, state = self.beforeCall(method, url, parse, kwargs)
+        if found is False:
+            return missing
+        if found is not None:
+            return found
+        r = self.executor.request(method, url, **kwargs)
+        return self.afterCall(method, url, expect, parse, r, state, missing)
+
+    def beforeCall(self, method, url, parse, kwargs):
+        """
+        GET of lookup cached paths are answered from redis: returns
+        (answer, False for a cached 404 or None, state for afterCall).
+        With http_cache the conditional headers of the cached body are added to kwargs.
+        """
+        lookup = key = cached = None
+        if parse and 'get' == method.lower():
+            lookup = self.lookupCache.key(url, kwargs.get('params'))
+        if lookup:
+            found = self.lookupCache.read(lookup)
+            if found is not None:
+                return found, None
+        if self.httpCache and parse and 'get' == method.lower():
+            key = self.httpCache.key(url, kwargs.get('params'))
+            cached = self.httpCache.read(key)
+            if cached:
+                kwargs['headers'] = {**(kwargs.get('headers') or {}),
+                    **self.httpCache.validators(cached)}
+        return None, (lookup, key, cached)
+
+    def afterCall(self, method, url, expect, parse, r, state=None, missing=False):
+        """
+        Check expected status and decode json of response r, False on failure,
+        missing on a 404, True if not parse. A 304 serves the cached body, GET responses fill the
+        caches, any other successful method invalidates the cached entries of url.
+        """
+        lookup, key, cached = state or (None, None, None)
+        if r is None:
+            return False
+        if cached and 304 == r.status_code:
+            return codec.loads(self.httpCache.hit(cached))
+        if expect != r.status_code:
+            if lookup and 404 == r.status_code:
+                self.lookupCache.saveMissing(lookup)
+            parseApiError(r)
+            return missing if 404 == r.status_code else False
+        if 'get' != method.lower():
+            self.invalidator.invalidate(url)
+        if not parse:
+            return True
+        if key:
+            self.httpCache.save(key, r)
+        if lookup:
+            data = codec.loads(r.content)
+            self.lookupCache.save(lookup, r.content, data)
+            return data
+        return codec.loads(r.content)
+
+    def getLoader(self, name, load=None, loadMany=None, resource=None):
+        """
+        Shared batching loader of the session, created on first use.
+        With resource (url of the collection, e.g. {host}/item) a change
+        forgets only the keys resolved to the changed record.
+        """
+        loader = self.loaders.get(name)
+        if loader is None:
+            with _sessionsLock:
+                loader = self.loaders.get(name)
+                if loader is None:
+                    tag = None
+                    if resource:
+                        base = urlsplit(resource).path.lower().rstrip('/')
+                        tag = lambda value: f'{base}/{recordId(value)}'
+                    loader = self.loaders[name] = Loader(load, loadMany,
+                        window=self.config.getfloat('loader_window', 0.005),
+                        maxBatch=self.config.getint('loader_batch', 100),
+                        concurrency=self.config.getint('loader_concurrency', 8),
+                        cache=self.config.getboolean('loader_cache', True),
+                        maxSize=self.config.getint('loader_cache_size', 10000),
+                        ttl=self.config.getint('loader_cache_ttl', 300),
+                        tag=tag)
+                    if loader.cache:
+                        self.invalidator.addListener(lambda path: loader.invalidate(resourceTags(path)))
+        return loader
+
+    def getStates(self):
+        """
+        Last known state of patched resources, dropped when they change.
+        """
+        if not self.states:
+            with _sessionsLock:
+                if not self.states:
+                    states = StateCache(self.config.getint('patch_state_size', 10000),
+                        self.config.getint('patch_state_ttl', 300))
+                    self.invalidator.addListener(lambda path: states.drop(*resourceTags(path)))
+                    self.states = states
+        return self.states
+
+    def close(self):
+        """Close HTTP and redis pools."""
+        logging.debug(f'Closing session {self.profile_name}')
+        self.__stopRefresh.set()
+        for loader in list(self.loaders.values()):
+            loader.close()
+        self.loaders={}
+        self.invalidator.close()
+        if self.__agent:
+            self.__agent.close()
+            self.__agent=False
+        self.cache.connection_pool.disconnect()
+        return True
+
+    def getStats(self):
+        """Connection reuse stats for HTTP and redis pools."""
+        http = {'pools': 0, 'connections': 0, 'requests': 0}
+        if self.__agent:
+            for adapter in set(self.__agent.adapters.values()):
+                pools = adapter.poolmanager.pools
+                for key in pools.keys():
+                    pool = pools[key]
+                    if not pool:continue
+                    http['pools'] += 1
+                    http['connections'] += pool.num_connections
+                    http['requests'] += pool.num_requests
+        http['reused'] = max(http['requests'] - http['connections'], 0)
+        pool = self.cache.connection_pool
+        redis = {
+            'max_connections': pool.max_connections,
+            'connections': getattr(pool, '_created_connections', 0),
+            'available': len(getattr(pool, '_available_connections', [])),
+            'in_use': len(getattr(pool, '_in_use_connections', []))
+        }
+        return {
+            'profile': self.profile_name,
+            'clients_created': self.clientsCreated,
+            'token': dict(self.tokenStats),
+            'executor': dict(self.executor.stats),
+            'http_cache': self.httpCache.getStats() if self.httpCache else None,
+            'lookup_cache': self.lookupCache.getStats(),
+            'invalidation': dict(self.invalidator.stats),
+            'single_flight': dict(self.singleFlight.stats) if self.singleFlight else None,
+            'loaders': {name: dict(loader.stats) for name, loader in self.loaders.items()},
+            'patch': dict(self.states.stats) if self.states else None,
+            'ensure': dict(self.ensurer.stats),
+            'http': http,
+            'redis': redis
+        }
+
+
+def getSession(profile_name=None):
+    """
+    Shared session for profile: one token, one redis pool
+    and one HTTP connection pool for all the clients in the process.
+    """
+    if not profile_name:profile_name='default'
+    with _sessionsLock:
+        s = _sessions.get(profile_name)
+        if not s:
+            logging.debug(f'Register shared session {profile_name}')
+            s = Session(profile_name)
+            _sessions[profile_name] = s
+        s.clientsCreated += 1
+    return s
+
+
+def closeSessions():
+    """Close and forget all shared sessions."""
+    with _sessionsLock:
+        for s in _sessions.values():
+            s.close()
+        _sessions.clear()
+    return True
+
+
+def shareResult(result):
+    """ Copy of a coalesced result for a waiting caller. """
+    if isinstance(result, (dict, list)):
+        return codec.loads(codec.dumps(result))
+    return result
 
 def parseApiError(response):
     """ stampa errori api """
     logging.debug('Parsing error')
     status = response.status_code
     try:
-        problem = json.loads(response.text)
+        problem = codec.loads(response.content)
     except Exception:
         # Add handlers to the logger
         logging.error('Not jsonable', exc_info=True)
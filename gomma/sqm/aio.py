@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+SQM asyncio SDK
+"""
+
+import logging
+
+from gomma.aio import AsyncClient
+
+
+class AsyncSqm(AsyncClient):
+    """
+    SQM asyncio class, same methods of Sqm.
+    """
+    service = 'sqm'
+
+    async def createNorm(self, normName: str):
+        """ Create new norm. """
+        logging.info(f'Creating norm {normName}')
+        rq = f'{self.host}/norm'
+        return await self._request('post', rq, expect=201, json={'name': normName})
+
+    async def getNormFromName(self, normName: str):
+        """ Get norm by name. """
+        logging.info(f'Get norm by name {normName}')
+        rq = f'{self.host}/norm/findByName'
+        return await self._request('get', rq, params={'name': normName})
@@ -10,10 +10,9 @@ __author__ = "Davide Pellegrino"
 __version__ = "1.2.0"
 __date__ = "2019-01-19"
 
-import json
 import logging
 
-from gomma.session import Session, parseApiError
+from gomma.session import getSession
 
 class Sqm(object):
     """
@@ -25,7 +24,7 @@ class Sqm(object):
         Initialize main class with this and that.
         """
         logging.info('Init SQM SDK')
-        s = Session(profile_name)
+        s = getSession(profile_name)
         host=s.config.get('agapi_host')
         self.host = f'{host}/sqm'
         self.s = s
@@ -37,12 +36,7 @@ class Sqm(object):
         logging.info(f'Creating norm {normName}')
         rq = f'{self.host}/norm'
         payload = {'name':normName}
-        agent=self.s.getAgent()
-        r = agent.post(rq, json=payload)
-        if 201 != r.status_code:
-            parseApiError(r)
-            return False
-        return json.loads(r.text)  
+        return self.s.call('post', rq, expect=201, json=payload)
   
     def getNormFromName(self, normName:str):
         """
@@ -51,9 +45,11 @@ class Sqm(object):
         logging.info(f'Get norm by name {normName}')
         rq = f'{self.host}/norm/findByName'
         payload = {'name':normName}
-        agent=self.s.getAgent()
-        r = agent.get(rq, params=payload)
-        if 200 != r.status_code:
-            parseApiError(r)
-            return False
-        return json.loads(r.text)
+        return self.s.call('get', rq, params=payload)
+
+    def ensureNorm(self, normName:str):
+        """
+        Norm id from name, created if missing.
+        """
+        return self.s.ensurer.ensure('sqm.norm', normName,
+            lambda: self.getNormFromName(normName), lambda: self.createNorm(normName))
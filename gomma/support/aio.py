@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Support asyncio SDK
+"""
+
+import logging
+
+from gomma.aio import AsyncClient
+
+
+class AsyncSupport(AsyncClient):
+    """
+    Support asyncio class, same methods of Support.
+    """
+    service = 'support'
+
+    #category
+    async def createCategory(self, payload: object):
+        """ Create new category. """
+        logging.info('Init creating category...')
+        rq = f'{self.host}/category'
+        return await self._request('post', rq, expect=201, json=payload)
+
+    async def readCategory(self, category_id: int, query=None):
+        """ Read category. """
+        logging.info('Getting category')
+        rq = f'{self.host}/category/{category_id}'
+        return await self._request('get', rq, params=query)
+
+    async def updateCategory(self, category_id: int, payload: object):
+        """ Update category data. """
+        logging.info(f'Updating category {category_id}...')
+        rq = f'{self.host}/category/{category_id}'
+        return await self._request('post', rq, json=payload)
+
+    async def listCategories(self, query=None):
+        """ Read all categories. """
+        logging.info('Getting all categories')
+        rq = f'{self.host}/category'
+        return await self._request('get', rq, params=query)
+
+    #category type
+    async def createCategoryType(self, payload):
+        """ Create new category type. """
+        logging.info('Init creating category type...')
+        rq = f'{self.host}/category/type'
+        return await self._request('post', rq, expect=201, json=payload)
+
+    async def readCategoryType(self, type_id: int, query=None):
+        """ Read category type. """
+        logging.info('Read category types')
+        rq = f'{self.host}/category/type/{type_id}'
+        return await self._request('get', rq, params=query)
+
+    async def updateCategoryType(self, type_id, payload):
+        """ Update category type data. """
+        logging.info(f'Updating category type {type_id}...')
+        rq = f'{self.host}/category/{type_id}'
+        return await self._request('post', rq, json=payload)
+
+    async def listCategoryTypes(self, query=None):
+        """ Read all category types. """
+        logging.info('Getting all category types.')
+        rq = f'{self.host}/category/type'
+        return await self._request('get', rq, params=query)
+
+    #ticket
+    async def createTicket(self, payload):
+        """ Create new ticket. """
+        logging.info('Init creating ticket...')
+        rq = f'{self.host}/ticket'
+        return await self._request('post', rq, expect=201, json=payload)
+
+    async def readTicket(self, ticket_id: int, query=None):
+        """ Read ticket. """
+        logging.info('Read ticket')
+        rq = f'{self.host}/ticket/{ticket_id}'
+        return await self._request('get', rq, params=query)
+
+    async def updateTicket(self, ticket_id, payload):
+        """ Update ticket. """
+        logging.info(f'Updating ticket {ticket_id}...')
+        rq = f'{self.host}/ticket/{ticket_id}'
+        return await self._request('post', rq, json=payload)
+
+    async def listTicket(self, query=None):
+        """ Read all ticket. """
+        logging.info('Getting all ticket.')
+        rq = f'{self.host}/ticket'
+        return await self._request('get', rq, params=query)
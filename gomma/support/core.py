@@ -10,10 +10,10 @@ __author__ = "Davide Pellegrino"
 __version__ = "2.0.1"
 __date__ = "2020-03-16"
 
-import json
 import logging
 
-from gomma.session import Session, parseApiError
+from gomma.session import getSession
+from gomma.utility.paging import Export, paginate
 
 class Support(object):
     """
@@ -24,7 +24,7 @@ class Support(object):
         Initialize main class.
         """
         logging.info('Init support SDK')
-        s = Session(profile_name)
+        s = getSession(profile_name)
         host=s.config.get('agapi_host')
         self.host = f'{host}/support'
         self.s = s
@@ -36,12 +36,9 @@ class Support(object):
         """
         logging.info('Init creating category...')
         rq = f'{self.host}/category'
-        agent=self.s.getAgent()
-        r = agent.post(rq, json=payload)
-        if 201 != r.status_code:
-            parseApiError(r)
+        category = self.s.call('post', rq, expect=201, json=payload)
+        if category is False:
             return False
-        category = json.loads(r.text)
         logging.info('Category %s created' % category['data']['id'])
         return category
 
@@ -51,12 +48,7 @@ class Support(object):
         """
         logging.info('Getting category')
         rq = f'{self.host}/category/{category_id}'
-        agent=self.s.getAgent()
-        r = agent.get(rq, params=query)
-        if 200 != r.status_code:
-            return False
-        category = json.loads(r.text)
-        return category
+        return self.s.call('get', rq, params=query)
 
     def updateCategory(self, category_id:int, payload:object):
         """
@@ -64,12 +56,9 @@ class Support(object):
         """
         logging.info(f'Updating category {category_id}...')
         rq = f'{self.host}/category/{category_id}'
-        agent=self.s.getAgent()
-        r = agent.post(rq, json=payload)
-        if 200 != r.status_code:
-            parseApiError(r)
+        category = self.s.call('post', rq, json=payload)
+        if category is False:
             return False
-        category = json.loads(r.text)
         logging.info(f'Updated category {category_id}')
         return category
 
@@ -79,13 +68,7 @@ class Support(object):
         """
         logging.info('Getting all categories')
         rq = f'{self.host}/category'
-        agent=self.s.getAgent()
-        r = agent.get(rq, params=query)
-        if 200 != r.status_code:
-            parseApiError(r)
-            return False
-        category = json.loads(r.text)
-        return category
+        return self.s.call('get', rq, params=query)
 
     #category type
     def createCategoryType(self, payload):
@@ -94,12 +77,9 @@ class Support(object):
         """
         logging.info('Init creating category type...')
         rq = f'{self.host}/category/type'
-        agent=self.s.getAgent()
-        r = agent.post(rq, json=payload)
-        if 201 != r.status_code:
-            parseApiError(r)
+        category = self.s.call('post', rq, expect=201, json=payload)
+        if category is False:
             return False
-        category = json.loads(r.text)
         logging.info('Category %s created' % category['data']['id'])
         return category
 
@@ -109,12 +89,7 @@ class Support(object):
         """
         logging.info('Read category types')
         rq = f'{self.host}/category/type/{type_id}'
-        agent=self.s.getAgent()
-        r = agent.get(rq, params=query)
-        if 200 != r.status_code:
-            return False
-        category = json.loads(r.text)
-        return category
+        return self.s.call('get', rq, params=query)
 
     def updateCategoryType(self, type_id, payload):
         """
@@ -122,12 +97,9 @@ class Support(object):
         """
         logging.info(f'Updating category type {type_id}...')
         rq = f'{self.host}/category/{type_id}'
-        agent=self.s.getAgent()
-        r = agent.post(rq, json=payload)
-        if 200 != r.status_code:
-            parseApiError(r)
+        category = self.s.call('post', rq, json=payload)
+        if category is False:
             return False
-        category = json.loads(r.text)
         logging.info(f'Updated category {type_id}')
         return category
 
@@ -137,12 +109,7 @@ class Support(object):
         """
         logging.info('Getting all category types.')
         rq = f'{self.host}/category/type'
-        agent=self.s.getAgent()
-        r = agent.get(rq, params=query)
-        if 200 != r.status_code:
-            return False
-        category = json.loads(r.text)
-        return category   
+        return self.s.call('get', rq, params=query)
 
     #ticket
     def createTicket(self, payload):
@@ -151,12 +118,9 @@ class Support(object):
         """
         logging.info('Init creating ticket...')
         rq = f'{self.host}/ticket'
-        agent=self.s.getAgent()
-        r = agent.post(rq, json=payload)
-        if 201 != r.status_code:
-            parseApiError(r)
+        ticket = self.s.call('post', rq, expect=201, json=payload)
+        if ticket is False:
             return False
-        ticket = json.loads(r.text)
         logging.info('Ticket %s created' % ticket['data']['id'])
         return ticket
 
@@ -166,12 +130,7 @@ class Support(object):
         """
         logging.info('Read ticket')
         rq = f'{self.host}/ticket/{ticket_id}'
-        agent=self.s.getAgent()
-        r = agent.get(rq, params=query)
-        if 200 != r.status_code:
-            return False
-        ticket = json.loads(r.text)
-        return ticket
+        return self.s.call('get', rq, params=query)
 
     def updateTicket(self, ticket_id, payload):
         """
@@ -179,12 +138,9 @@ class Support(object):
         """
         logging.info(f'Updating ticket {ticket_id}...')
         rq = f'{self.host}/ticket/{ticket_id}'
-        agent=self.s.getAgent()
-        r = agent.post(rq, json=payload)
-        if 200 != r.status_code:
-            parseApiError(r)
+        ticket = self.s.call('post', rq, json=payload)
+        if ticket is False:
             return False
-        ticket = json.loads(r.text)
         logging.info(f'Updated ticket {ticket_id}')
         return ticket
 
@@ -194,9 +150,18 @@ class Support(object):
         """
         logging.info('Getting all ticket.')
         rq = f'{self.host}/ticket'
-        agent=self.s.getAgent()
-        r = agent.get(rq, params=query)
-        if 200 != r.status_code:
-            return False
-        tickets = json.loads(r.text)
-        return tickets   
+        return self.s.call('get', rq, params=query)
+
+    def iterTickets(self, query=None, take=100):
+        """
+        Iterate all tickets, page by page.
+        """
+        logging.info('Iterating all the tickets')
+        return paginate(self.listTicket, query, take)
+
+    def exportTickets(self, query=None, take=100, concurrency=8, ordered=True, strict=False):
+        """
+        Bulk export all tickets, pages read concurrently.
+        """
+        logging.info(f'Exporting all the tickets, concurrency {concurrency}')
+        return Export(self.listTicket, query, take, concurrency, ordered, strict)
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Assets utility.
+Content hashes of local files and the manifest of what was last uploaded.
+"""
+
+import hashlib
+import json
+import logging
+import mmap
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from gomma.utility.cache import Cache
+
+logger = logging.getLogger(__name__)
+
+
+def fileHash(path):
+    """
+    sha256 of file content, read through mmap.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                digest.update(m)
+    return digest.hexdigest()
+
+
+def hashFiles(paths, concurrency=4):
+    """
+    {path: sha256} of paths hashed on a thread pool, None if unreadable.
+    """
+    paths = list(dict.fromkeys(paths))
+
+    def safeHash(path):
+        try:
+            return fileHash(path)
+        except (IOError, OSError, ValueError):
+            logging.exception(f'Unable to hash {path}')
+            return None
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return dict(zip(paths, pool.map(safeHash, paths)))
+
+
+class AssetManifest(object):
+    """
+    Last uploaded content by asset key (method, resource id, role).
+    """
+
+    def __init__(self, profile_name, cachePath=None):
+        """
+        Init manifest of profile, stored in the file cache.
+        """
+        if cachePath is None:
+            cachePath = os.path.join(Cache.cachePath, 'assets')
+        self.profile_name = profile_name
+        self.store = Cache(cachePath, maxBytes=None)
+
+    def key(self, method, resource_id, role=''):
+        """Manifest key of asset."""
+        return [self.profile_name, method, str(resource_id), role]
+
+    def get(self, key):
+        """Entry {'hash', 'id'} (and 'stale', replaced ids still to delete) or None."""
+        raw = self.store.read(key)
+        if not raw:
+            return None
+        return json.loads(raw)
+
+    def set(self, key, digest, asset_id=None, stale=None):
+        """Record successful upload, with the replaced asset ids not deleted yet."""
+        entry = {'hash': digest, 'id': asset_id}
+        if stale:
+            entry['stale'] = list(stale)
+        return self.store.create(key, json.dumps(entry))
+
+    def delete(self, key):
+        """Forget asset."""
+        return self.store.delete(key)
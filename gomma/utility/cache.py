@@ -3,77 +3,233 @@
 
 """
 Cache utility.
+Bounded file cache: per entry TTL, LRU eviction by total bytes,
+atomic writes and sharded directories, safe for concurrent processes.
 """
 
 import hashlib
 import json
 import logging
 import os
+import struct
+import tempfile
+import threading
+import time
+import zlib
 
 logger = logging.getLogger(__name__)
 
+# header: expire at (0 never), flags
+_header = struct.Struct('>dB')
+_TEXT = 1
+_ZLIB = 2
+
+
 class Cache(object):
     """ Cache utilities."""
 
-    cachePath= '.cache/gomma'    
+    cachePath = os.path.join(os.environ.get('XDG_CACHE_HOME', '~/.cache'), 'gomma')
+    suffix = '.cache'
 
-    def __init__(self):
+    def __init__(self, cachePath=None, ttl=None, maxBytes=256 * 1024 * 1024,
+        compress=False, compressMin=1024):
         """Init new Cache utility."""
+        self.cachePath = os.path.expanduser(cachePath or self.cachePath)
+        self.ttl = ttl
+        self.maxBytes = maxBytes
+        self.compress = compress
+        self.compressMin = compressMin
+        self.stats = {'hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0, 'expired': 0}
+        self.__size = None
+        self.__lock = threading.Lock()
         logging.info(f'Init cache path {self.cachePath}..')
         if not os.path.exists(self.cachePath):
             logging.debug(f'Creating cache path {self.cachePath}')
-            os.makedirs(self.cachePath)
+            os.makedirs(self.cachePath, exist_ok=True)
 
     def read(self, name):
-        """ Recupero il dato in cache. """
-        logging.info(f'Init read cache {name}...')        
-        cachekey = self.__createCacheKey(name)
-        if not self.__isCache(cachekey):
-            logging.debug(f'{cachekey} is not cached!')
-            return False
+        """ Recupero il dato in cache: str, bytes or False. """
+        logging.debug(f'Init read cache {name}...')
+        path = self.__path(self.__createCacheKey(name))
         try:
-            f = open(f'{self.cachePath}/{cachekey}', 'r')
-            fromcache = f.read()
-            f.close()            
+            with open(path, 'rb') as f:
+                raw = f.read()
+        except FileNotFoundError:
+            self.stats['misses'] += 1
+            return False
         except IOError:
             logging.exception("Exception occurred")
+            self.stats['misses'] += 1
+            return False
+        try:
+            expireAt, flags = _header.unpack_from(raw)
+        except struct.error:
+            logging.warning(f'Corrupted cache entry {path}')
+            self.__remove(path)
+            self.stats['misses'] += 1
             return False
-        return fromcache
+        if expireAt and expireAt < time.time():
+            logging.debug(f'{name} is expired!')
+            self.__remove(path)
+            self.stats['expired'] += 1
+            self.stats['misses'] += 1
+            return False
+        data = raw[_header.size:]
+        if flags & _ZLIB:
+            data = zlib.decompress(data)
+        if flags & _TEXT:
+            data = data.decode('utf-8')
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.stats['hits'] += 1
+        return data
 
-    def create(self, name, data=None):
+    def create(self, name, data=None, ttl=None):
         """
-        Salva il dato in cache.
+        Salva il dato in cache (str or bytes) with ttl seconds.
         """
-        logging.info(f'Creating {name} cache..')
+        logging.debug(f'Creating {name} cache..')
         cachekey = self.__createCacheKey(name)
+        path = self.__path(cachekey)
+        flags = 0
+        if data is None:
+            data = ''
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+            flags |= _TEXT
+        if self.compress and len(data) >= self.compressMin:
+            data = zlib.compress(data, 1)
+            flags |= _ZLIB
+        ttl = self.ttl if ttl is None else ttl
+        expireAt = time.time() + ttl if ttl else 0
+        shard = os.path.dirname(path)
         try:
-            f = open(f'{self.cachePath}/{cachekey}', 'w')
-            f.write(data)
-            f.close()
-        except IOError:
+            os.makedirs(shard, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=shard, suffix='.part')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(_header.pack(expireAt, flags))
+                f.write(data)
+            os.replace(tmp, path)
+        except (IOError, OSError):
             logging.exception("Exception occurred")
             return False
+        self.stats['writes'] += 1
         logging.debug(f'Saved {cachekey} in cache')
+        self.__grow(_header.size + len(data))
         return True
 
-    @staticmethod
+    def write(self, name, data=None, ttl=None):
+        """Alias of create."""
+        return self.create(name, data, ttl)
+
+    def delete(self, name):
+        """Remove entry."""
+        return self.__remove(self.__path(self.__createCacheKey(name)))
+
     def clearCache(self):
         """
         Elimino tutti i file di cache.
         """
         logging.info('Init cleaning cache dir ...')
-        filelist = [ f for f in os.listdir(self.cachePath) ]
-        for f in filelist:
-            os.remove(os.path.join(self.cachePath, f))
+        for path, _ in self.__entries():
+            self.__remove(path)
+        with self.__lock:
+            self.__size = 0
+        return True
+
+    def purge(self):
+        """Remove expired entries and stale partial writes."""
+        logging.info('Purging expired cache entries ...')
+        now = time.time()
+        for path, st in self.__entries(partial=True):
+            if path.endswith('.part'):
+                if st.st_mtime < now - 3600:
+                    self.__remove(path)
+                continue
+            try:
+                with open(path, 'rb') as f:
+                    expireAt, _ = _header.unpack(f.read(_header.size))
+            except (IOError, struct.error):
+                continue
+            if expireAt and expireAt < now:
+                self.stats['expired'] += 1
+                self.__remove(path)
         return True
 
+    def evict(self, target=None):
+        """
+        Remove least recently used entries until size is under target bytes.
+        """
+        if target is None:
+            target = int(self.maxBytes * 0.9)
+        entries = sorted(self.__entries(), key=lambda e: e[1].st_atime)
+        size = sum(st.st_size for _, st in entries)
+        for path, st in entries:
+            if size <= target:
+                break
+            if self.__remove(path):
+                size -= st.st_size
+                self.stats['evictions'] += 1
+        with self.__lock:
+            self.__size = size
+        logging.debug(f'Cache size {size} bytes after eviction')
+        return size
+
+    def getStats(self):
+        """Counters and size."""
+        return {**self.stats, 'bytes': self.__size}
+
+    def __grow(self, nbytes):
+        """ Track size, evict when over max bytes. """
+        if not self.maxBytes:
+            return
+        with self.__lock:
+            if self.__size is None:
+                self.__size = sum(st.st_size for _, st in self.__entries())
+            else:
+                self.__size += nbytes
+            over = self.__size > self.maxBytes
+        if over:
+            self.evict()
+
+    def __entries(self, partial=False):
+        """ (path, stat) of all cache files. """
+        try:
+            shards = [d.path for d in os.scandir(self.cachePath) if d.is_dir()]
+        except FileNotFoundError:
+            return []
+        entries = []
+        for shard in shards:
+            try:
+                for f in os.scandir(shard):
+                    if f.name.endswith(self.suffix) or (partial and f.name.endswith('.part')):
+                        try:
+                            entries.append((f.path, f.stat()))
+                        except FileNotFoundError:
+                            pass
+            except FileNotFoundError:
+                continue
+        return entries
+
+    def __remove(self, path):
+        """ Remove file, ignore concurrent removal. """
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return False
+        except OSError:
+            logging.exception("Exception occurred")
+            return False
+        return True
+
+    def __path(self, cachekey):
+        """ Sharded path of cache key. """
+        return os.path.join(self.cachePath, cachekey[:2], f'{cachekey[2:]}{self.suffix}')
+
     def __createCacheKey(self, name):
         """Genera una chiave cache """
-        __tmp = f'{json.dumps(name)}'
-        cachekey = f'{hashlib.md5(__tmp.encode()).hexdigest()}.tmp'            
+        __tmp = f'{json.dumps(name, sort_keys=True)}'
+        cachekey = hashlib.sha1(__tmp.encode()).hexdigest()
         return cachekey
-    
-    def __isCache(self, cachekey):
-        """ verifica esistenza file in cache. """
-        logging.debug(f'Checking {cachekey} key..')
-        return os.path.isfile(f'{self.cachePath}/{cachekey}')        
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Json codec utility.
+Decode response bytes with orjson or ujson when installed, json otherwise.
+"""
+
+import json
+import logging
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+logger = logging.getLogger(__name__)
+
+_codecs = {
+    'json': (json.loads, lambda obj: json.dumps(obj).encode())
+}
+if ujson:
+    _codecs['ujson'] = (ujson.loads, lambda obj: ujson.dumps(obj).encode())
+if orjson:
+    _codecs['orjson'] = (orjson.loads,
+        lambda obj: orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS))
+
+name = 'orjson' if orjson else 'ujson' if ujson else 'json'
+_loads, _dumps = _codecs[name]
+
+
+def available():
+    """Installed codec names."""
+    return list(_codecs)
+
+
+def setCodec(codec_name):
+    """
+    Force codec by name: orjson, ujson or json.
+    """
+    global name, _loads, _dumps
+    if codec_name not in _codecs:
+        logging.warning(f'Json codec {codec_name} not available, keeping {name}')
+        return False
+    name = codec_name
+    _loads, _dumps = _codecs[codec_name]
+    logging.debug(f'Json codec {name}')
+    return True
+
+
+def loads(data):
+    """Decode json bytes (or str)."""
+    return _loads(data)
+
+
+def dumps(obj):
+    """Encode obj as json bytes."""
+    return _dumps(obj)
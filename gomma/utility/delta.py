@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Delta utility.
+Incremental sync of list endpoints: only the records changed since the
+stored watermark are fetched and applied to a local store.
+"""
+
+import itertools
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlencode
+
+from gomma.utility import codec
+from gomma.utility.cache import Cache
+from gomma.utility.paging import pageRecords, pageTotal, parseQuery
+
+logger = logging.getLogger(__name__)
+
+
+class Watermarks(object):
+    """
+    Last synced watermark by resource, in the file cache.
+    """
+
+    def __init__(self, profile_name, cachePath=None):
+        if cachePath is None:
+            cachePath = os.path.join(Cache.cachePath, 'watermarks')
+        self.profile_name = profile_name
+        self.store = Cache(cachePath, maxBytes=None)
+
+    def get(self, name):
+        """Watermark of name, None if never synced."""
+        raw = self.store.read([self.profile_name, name])
+        return json.loads(raw) if raw else None
+
+    def set(self, name, value):
+        """Store watermark of name."""
+        return self.store.create([self.profile_name, name], json.dumps(value))
+
+    def reset(self, name):
+        """Next sync fetches everything."""
+        return self.store.delete([self.profile_name, name])
+
+
+class RecordStore(object):
+    """
+    Local SQLite copy of resources: one table (id, updated_at, data) each.
+    """
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.__local = threading.local()
+        self.__tables = set()
+
+    def __db(self):
+        """ Connection of the calling thread. """
+        db = getattr(self.__local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30)
+            db.execute('PRAGMA journal_mode=WAL')
+            self.__local.db = db
+        return db
+
+    def __table(self, resource):
+        """ Create resource table. """
+        if resource not in self.__tables:
+            with self.__db() as db:
+                db.execute(f'CREATE TABLE IF NOT EXISTS {resource} '
+                    '(id INTEGER PRIMARY KEY, updated_at TEXT, data BLOB)')
+            self.__tables.add(resource)
+        return resource
+
+    def apply(self, resource, records):
+        """Insert or replace records."""
+        table = self.__table(resource)
+        rows = [(r['id'], r.get('updated_at'), codec.dumps(r)) for r in records]
+        with self.__db() as db:
+            db.executemany(f'INSERT OR REPLACE INTO {table} VALUES (?, ?, ?)', rows)
+        return len(rows)
+
+    def get(self, resource, record_id):
+        """Record by id, None if missing."""
+        table = self.__table(resource)
+        row = self.__db().execute(f'SELECT data FROM {table} WHERE id = ?', (record_id,)).fetchone()
+        return codec.loads(row[0]) if row else None
+
+    def count(self, resource):
+        """Records of resource."""
+        table = self.__table(resource)
+        return self.__db().execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+
+
+class DeltaSync(object):
+    """
+    run() reads fetch(params) pages filtered by param >= watermark and
+    passes them to apply(records) in batches; the watermark moves to the
+    highest field value only when every page was read and applied.
+    Pages are keyset paged: each one starts from the highest field value
+    read so far, so records updated during the run cannot shift the others.
+    """
+
+    def __init__(self, fetch, name, apply, watermarks, param='updated_since',
+        field='updated_at', take=100, batch=500, sort='sort'):
+        self.fetch = fetch
+        self.name = name
+        self.apply = apply
+        self.watermarks = watermarks
+        self.param = param
+        self.field = field
+        self.take = take
+        self.batch = batch
+        self.sort = sort
+
+    def key(self, params):
+        """
+        Watermark name of a run: syncs of the same resource with
+        different filters keep their own watermark.
+        """
+        filters = {k: v for k, v in params.items()
+            if k not in (self.param, self.sort, 'take', 'skip')}
+        if not filters:
+            return self.name
+        return f'{self.name}?{urlencode(sorted((k, str(v)) for k, v in filters.items()))}'
+
+    def records(self, params, failed):
+        """
+        Yield the records from params[param] on, sorted by field: the next
+        page starts at the last field value read, records already read at
+        that value are dropped by id (skip only steps over a page of equal
+        values). A failed page is appended to failed and ends the run.
+        """
+        mark = params.get(self.param)
+        seen = set()
+        skip = 0
+        while True:
+            page = self.fetch({**params, 'take': self.take, 'skip': skip})
+            if page is False:
+                failed.append(dict(params, skip=skip))
+                return
+            chunk = pageRecords(page)
+            for record in chunk:
+                if record.get(self.field) != mark or record.get('id') not in seen:
+                    yield record
+            total = pageTotal(page)
+            if not chunk or (len(chunk) < self.take and (total is None or skip + len(chunk) >= total)):
+                return
+            top = chunk[-1].get(self.field)
+            if top is None or top == mark:
+                skip += len(chunk)
+            else:
+                mark, skip = top, 0
+                seen = set()
+                params = {**params, self.param: mark}
+            seen.update(r.get('id') for r in chunk if r.get(self.field) == mark)
+
+    def run(self, query=None):
+        """
+        Sync once, returns the report: records, fetch and apply seconds, watermark.
+        Pages are sorted by the watermark field (sort param) and keyset
+        paged, so the run never skips a record changed while it reads.
+        """
+        start = time.perf_counter()
+        params = parseQuery(query)
+        name = self.key(params)
+        watermark = self.watermarks.get(name)
+        if watermark is not None:
+            params[self.param] = watermark
+        if self.sort:
+            params.setdefault(self.sort, self.field)
+        logging.info(f'Delta sync {name} from {watermark}')
+        failed = []
+        report = {'name': name, 'records': 0, 'fetch_time': 0.0, 'apply_time': 0.0,
+            'from': watermark, 'watermark': watermark, 'complete': False}
+        highest = watermark
+        records = self.records(params, failed)
+        while True:
+            mark = time.perf_counter()
+            chunk = list(itertools.islice(records, self.batch))
+            report['fetch_time'] += time.perf_counter() - mark
+            if not chunk:
+                break
+            mark = time.perf_counter()
+            if self.apply(chunk) is False:
+                logging.error(f'Unable to apply {name} delta, watermark kept')
+                failed.append('apply')
+                records.close()
+                break
+            report['apply_time'] += time.perf_counter() - mark
+            report['records'] += len(chunk)
+            values = [r[self.field] for r in chunk if r.get(self.field) is not None]
+            if values:
+                highest = max(values) if highest is None else max(highest, *values)
+        if not failed:
+            report['complete'] = True
+            report['watermark'] = highest
+            if highest is not None:
+                self.watermarks.set(name, highest)
+        report['elapsed'] = time.perf_counter() - start
+        logging.info(f"Delta sync {name}: {report['records']} records, fetch "
+            f"{report['fetch_time']:.1f}s, apply {report['apply_time']:.1f}s")
+        return report
+
+
+_stores = {}
+
+
+def deltaSync(session, fetch, resource, apply=None, query=None, name=None):
+    """
+    Delta sync of resource (e.g. h2o.customer) read by fetch; records go to
+    apply(records) or to the session record store (delta_store_path).
+    name keeps a separate watermark for another target of the same resource.
+    Profile keys delta_param, delta_field and delta_sort choose the filter,
+    watermark field and sort param.
+    """
+    config = session.config
+    if apply is None:
+        path = config.get('delta_store_path') or os.path.join(
+            os.path.expanduser(Cache.cachePath), f'records-{session.profile_name}.sqlite')
+        store = _stores.get(path)
+        if store is None:
+            store = _stores.setdefault(path, RecordStore(path))
+        table = resource.replace('.', '_')
+        apply = lambda records: store.apply(table, records)
+    watermarks = Watermarks(session.profile_name, config.get('delta_watermark_path'))
+    sync = DeltaSync(fetch, name or resource, apply, watermarks,
+        param=config.get('delta_param', 'updated_since'),
+        field=config.get('delta_field', 'updated_at'),
+        take=config.getint('delta_take', 100),
+        sort=config.get('delta_sort', 'sort') or None)
+    return sync.run(query)
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Diff utility.
+Minimal patch payloads against the last known state of a resource.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+def diffRecord(current, desired):
+    """
+    Fields of desired whose value differs from current.
+    Nested values are compared as a whole and sent whole.
+    """
+    if not current:
+        return dict(desired)
+    return {k: v for k, v in desired.items() if k not in current or current[k] != v}
+
+
+class StateCache(object):
+    """
+    Last known state of resources by path, least recently used dropped first.
+    A state read more than ttl seconds ago is read again: the resource may
+    have been changed by a writer that sends no invalidation.
+    """
+
+    def __init__(self, maxsize=10000, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stats = {'patches': 0, 'skipped': 0, 'fetched': 0, 'expired': 0,
+            'bytes_sent': 0, 'bytes_saved': 0}
+        self.__states = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def get(self, path):
+        """Known state or None."""
+        with self.__lock:
+            entry = self.__states.get(path)
+            if entry is None:
+                return None
+            state, readAt = entry
+            if self.ttl and time.monotonic() - readAt > self.ttl:
+                del self.__states[path]
+                self.stats['expired'] += 1
+                return None
+            self.__states.move_to_end(path)
+            return state
+
+    def set(self, path, state):
+        """Remember state of path, as read now."""
+        if not isinstance(state, dict):
+            return False
+        with self.__lock:
+            self.__states[path] = (state, time.monotonic())
+            self.__states.move_to_end(path)
+            while len(self.__states) > self.maxsize:
+                self.__states.popitem(last=False)
+        return True
+
+    def update(self, path, changes):
+        """Apply sent changes to the known state, keeping its read time."""
+        with self.__lock:
+            entry = self.__states.get(path)
+            if entry is None:
+                return False
+            self.__states[path] = ({**entry[0], **changes}, entry[1])
+        return True
+
+    def drop(self, *paths):
+        """Forget paths."""
+        with self.__lock:
+            for path in paths:
+                self.__states.pop(path, None)
+        return True
+
+    def __len__(self):
+        return len(self.__states)
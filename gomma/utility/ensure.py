@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Ensure utility.
+Get or create entities by name: resolved ids are memoized in process,
+concurrent threads share one lookup and a redis lock keeps parallel
+workers from creating duplicates.
+"""
+
+import logging
+import threading
+
+from redis.exceptions import LockError, RedisError
+
+from gomma.utility.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+def recordId(x):
+    """ id of an API response, None if missing. """
+    if not isinstance(x, dict):
+        return None
+    data = x.get('data')
+    if isinstance(data, list):
+        data = data[0] if data else None
+    if isinstance(data, dict):
+        return data.get('id')
+    return None
+
+
+class Ensurer(object):
+    """
+    ensure(kind, name, lookup, create) -> id of the entity, False on failure.
+    """
+    lockPrefix = 'ag:gomma:ensure:'
+
+    def __init__(self, cache, lockTimeout=30, lookupCache=None):
+        """
+        Init with the session redis and lookup cache.
+        """
+        self.cache = cache
+        self.lockTimeout = lockTimeout
+        self.lookupCache = lookupCache
+        self.memo = {}
+        self.flight = SingleFlight()
+        self.stats = {'memo_hits': 0, 'found': 0, 'created': 0, 'failed': 0}
+        self.__lock = threading.Lock()
+
+    def ensure(self, kind, name, lookup, create):
+        """
+        Id of entity kind named name: memo, lookup() and, when missing,
+        create() under a redis lock.
+        """
+        key = (kind, name)
+        found = self.memo.get(key)
+        if found is not None:
+            self.stats['memo_hits'] += 1
+            return found
+        return self.flight.do(key, lambda: self.__resolve(key, lookup, create))
+
+    def forget(self, kind=None, name=None):
+        """Drop memoized ids of kind (all if None), or of one name."""
+        with self.__lock:
+            if kind is None:
+                self.memo.clear()
+            elif name is not None:
+                self.memo.pop((kind, name), None)
+            else:
+                for key in [k for k in self.memo if k[0] == kind]:
+                    del self.memo[key]
+        return True
+
+    def __remember(self, key, entity_id):
+        """ Memoize id. """
+        with self.__lock:
+            self.memo[key] = entity_id
+        return entity_id
+
+    def __lookupFresh(self, lookup):
+        """ lookup() past the lookup cache, a cached 404 may be stale. """
+        if not self.lookupCache:
+            return lookup()
+        with self.lookupCache.bypass():
+            return lookup()
+
+    def __resolve(self, key, lookup, create):
+        """ Lookup, then create under lock. """
+        entity_id = recordId(lookup())
+        if entity_id is not None:
+            self.stats['found'] += 1
+            return self.__remember(key, entity_id)
+        kind, name = key
+        lock = self.cache.lock(f'{self.lockPrefix}{kind}:{name}',
+            timeout=self.lockTimeout, blocking_timeout=self.lockTimeout)
+        try:
+            with lock:
+                entity_id = recordId(self.__lookupFresh(lookup))
+                if entity_id is not None:
+                    logging.debug(f'{kind} {name} created by another worker')
+                    self.stats['found'] += 1
+                    return self.__remember(key, entity_id)
+                logging.info(f'Creating {kind} {name}')
+                entity_id = recordId(create())
+        except (LockError, RedisError):
+            logging.exception(f'Unable to lock {kind} {name}')
+            self.stats['failed'] += 1
+            return False
+        if entity_id is None:
+            logging.error(f'Unable to create {kind} {name}')
+            self.stats['failed'] += 1
+            return False
+        self.stats['created'] += 1
+        return self.__remember(key, entity_id)
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Loader utility.
+DataLoader style batching: keys requested within a short window are
+deduplicated and resolved together, callers get futures.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class Loader(object):
+    """
+    Resolve keys with loadMany(keys) -> {key: value} when given,
+    otherwise with load(key) calls on a bounded pool.
+    """
+
+    def __init__(self, load=None, loadMany=None, window=0.005, maxBatch=100,
+        concurrency=8, cache=True, maxSize=10000, ttl=300, tag=None):
+        """
+        Init loader, cache keeps up to maxSize resolved values for ttl seconds,
+        least recently used dropped first (failures are never kept).
+        tag(value) names the resource of a value for invalidate().
+        """
+        self.loadOne = load
+        self.loadMany = loadMany
+        self.window = window
+        self.maxBatch = maxBatch
+        self.cache = cache
+        self.maxSize = maxSize
+        self.ttl = ttl
+        self.tag = tag
+        self.stats = {'requested': 0, 'deduplicated': 0, 'batches': 0, 'loaded': 0, 'failed': 0,
+            'evicted': 0, 'expired': 0, 'invalidated': 0}
+        self.__pool = ThreadPoolExecutor(max_workers=concurrency)
+        self.__futures = OrderedDict()
+        self.__resolved = {}
+        self.__pending = []
+        self.__timer = None
+        self.__lock = threading.Lock()
+
+    def load(self, key):
+        """
+        Future of the value of key.
+        """
+        with self.__lock:
+            self.stats['requested'] += 1
+            future = self.__futures.get(key)
+            if future is not None and self.__isExpired(key):
+                self.stats['expired'] += 1
+                self.__drop(key)
+                future = None
+            if future is not None:
+                self.stats['deduplicated'] += 1
+                self.__futures.move_to_end(key)
+                return future
+            future = self.__futures[key] = Future()
+            self.__pending.append(key)
+            if len(self.__pending) >= self.maxBatch:
+                batch = self.__takeBatch()
+            else:
+                batch = None
+                if self.__timer is None:
+                    self.__timer = threading.Timer(self.window, self.dispatch)
+                    self.__timer.daemon = True
+                    self.__timer.start()
+        if batch:
+            self.__submit(batch)
+        return future
+
+    def loadAll(self, keys):
+        """Futures of keys."""
+        return [self.load(key) for key in keys]
+
+    def dispatch(self):
+        """Resolve pending keys now."""
+        with self.__lock:
+            batch = self.__takeBatch()
+        if batch:
+            self.__submit(batch)
+        return True
+
+    def clear(self, key=None):
+        """Forget resolved key, or all of them."""
+        with self.__lock:
+            for k in list(self.__resolved) if key is None else [key]:
+                self.__drop(k)
+        return True
+
+    def invalidate(self, tags):
+        """
+        Forget the resolved keys whose value is tagged with one of tags
+        (all of them without a tag function).
+        """
+        if self.tag is None:
+            return self.clear()
+        tags = set(tags)
+        with self.__lock:
+            keys = [k for k, (_, tag) in self.__resolved.items() if tag in tags]
+            for k in keys:
+                self.__drop(k)
+            self.stats['invalidated'] += len(keys)
+        return True
+
+    def __len__(self):
+        return len(self.__futures)
+
+    def __isExpired(self, key):
+        """ Resolved longer than ttl ago, under lock. """
+        resolved = self.__resolved.get(key)
+        return bool(resolved and self.ttl and time.monotonic() - resolved[0] > self.ttl)
+
+    def __drop(self, key):
+        """ Forget a resolved key, under lock. """
+        if self.__resolved.pop(key, None) is not None:
+            self.__futures.pop(key, None)
+
+    def close(self):
+        """Resolve pending keys and stop the pool."""
+        self.dispatch()
+        self.__pool.shutdown(wait=True)
+        return True
+
+    def __takeBatch(self):
+        """ Pending keys, under lock. """
+        if self.__timer is not None:
+            self.__timer.cancel()
+            self.__timer = None
+        batch, self.__pending = self.__pending, []
+        if batch:
+            self.stats['batches'] += 1
+        return batch
+
+    def __submit(self, batch):
+        """ Send batch to the pool. """
+        logging.debug(f'Loading batch of {len(batch)} keys')
+        if self.loadMany:
+            for i in range(0, len(batch), self.maxBatch):
+                self.__pool.submit(self.__runMany, batch[i:i + self.maxBatch])
+        else:
+            for key in batch:
+                self.__pool.submit(self.__runOne, key)
+
+    def __runOne(self, key):
+        """ Resolve one key. """
+        try:
+            self.__resolve(key, self.loadOne(key))
+        except Exception as e:
+            self.__reject(key, e)
+
+    def __runMany(self, keys):
+        """ Resolve keys with one call. """
+        try:
+            values = self.loadMany(keys)
+        except Exception as e:
+            for key in keys:
+                self.__reject(key, e)
+            return
+        if values is False:
+            values = {}
+        for key in keys:
+            self.__resolve(key, values.get(key, False))
+
+    def __resolve(self, key, value):
+        """ Set future of key. """
+        with self.__lock:
+            future = self.__futures.get(key)
+            if value is False:
+                self.stats['failed'] += 1
+            else:
+                self.stats['loaded'] += 1
+            if value is False or not self.cache:
+                self.__futures.pop(key, None)
+            elif future is not None:
+                self.__remember(key, value)
+        if future is not None:
+            future.set_result(value)
+
+    def __remember(self, key, value):
+        """ Keep resolved value, drop the least recently used beyond maxSize, under lock. """
+        tag = None
+        if self.tag is not None:
+            try:
+                tag = self.tag(value)
+            except Exception:
+                logging.exception(f'Unable to tag {key}')
+        self.__resolved[key] = (time.monotonic(), tag)
+        self.__futures.move_to_end(key)
+        while self.maxSize and len(self.__resolved) > self.maxSize:
+            oldest = next(k for k in self.__futures if k in self.__resolved)
+            self.__drop(oldest)
+            self.stats['evicted'] += 1
+
+    def __reject(self, key, error):
+        """ Fail future of key. """
+        logging.error(f'Unable to load {key}: {error}')
+        with self.__lock:
+            future = self.__futures.pop(key, None)
+            self.stats['failed'] += 1
+        if future is not None:
+            future.set_exception(error)
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Multipart utility.
+Streaming multipart/form-data body: files are read in chunks while
+the request is sent, memory use does not depend on the file size.
+"""
+
+import logging
+import mimetypes
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+logger = logging.getLogger(__name__)
+
+
+class MultipartEncoder(object):
+    """
+    File-like request body of fields {name: value} and files {name: path}.
+    callback(path, sent, total, rate) reports the progress.
+    """
+
+    def __init__(self, fields=None, files=None, chunkSize=64 * 1024, callback=None):
+        """
+        Init encoder, files are opened only while they are sent.
+        """
+        self.boundary = uuid.uuid4().hex
+        self.contentType = f'multipart/form-data; boundary={self.boundary}'
+        self.chunkSize = chunkSize
+        self.callback = callback
+        self.parts = []
+        for name, value in (fields or {}).items():
+            head = (f'--{self.boundary}\r\nContent-Disposition: form-data; '
+                f'name="{name}"\r\n\r\n{value}\r\n').encode('utf-8')
+            self.parts.append((head, None, 0))
+        for name, path in (files or {}).items():
+            filename = os.path.basename(path)
+            mime = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+            head = (f'--{self.boundary}\r\nContent-Disposition: form-data; name="{name}"; '
+                f'filename="{filename}"\r\nContent-Type: {mime}\r\n\r\n').encode('utf-8')
+            self.parts.append((head, path, os.path.getsize(path)))
+            self.parts.append((b'\r\n', None, 0))
+        self.parts.append((f'--{self.boundary}--\r\n'.encode('utf-8'), None, 0))
+        self.total = sum(len(head) + size for head, _, size in self.parts)
+        self.__fin = None
+        self.__current = None
+        self.seek(0)
+
+    def __len__(self):
+        return self.total
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def tell(self):
+        """Bytes sent."""
+        return self.sent
+
+    def seek(self, offset, whence=0):
+        """Rewind to start, for retries."""
+        if offset or whence:
+            raise ValueError('Multipart body can only be rewound to start')
+        self.close()
+        self.sent = 0
+        self.__part = 0
+        self.__buffer = b''
+        self.__start = time.perf_counter()
+        return 0
+
+    def close(self):
+        """Close open file."""
+        if self.__fin:
+            self.__fin.close()
+        self.__fin = None
+
+    def read(self, size=-1):
+        """
+        Next chunk of body, at most chunkSize bytes.
+        """
+        if size is None or size < 0 or size > self.chunkSize:
+            size = self.chunkSize
+        chunk = self.__buffer
+        while len(chunk) < size:
+            if self.__fin:
+                data = self.__fin.read(size - len(chunk))
+                if data:
+                    chunk += data
+                    continue
+                self.close()
+            if self.__part >= len(self.parts):
+                break
+            head, path, _ = self.parts[self.__part]
+            self.__part += 1
+            chunk += head
+            if path:
+                self.__fin = open(path, 'rb')
+                self.__current = path
+        chunk, self.__buffer = chunk[:size], chunk[size:]
+        self.sent += len(chunk)
+        if self.callback and chunk:
+            elapsed = time.perf_counter() - self.__start
+            self.callback(self.__current, self.sent, self.total,
+                self.sent / elapsed if elapsed else 0.0)
+        return chunk
+
+
+def uploadMany(jobs, concurrency=4):
+    """
+    Run upload jobs (callables) on a bounded pool,
+    yields (index, result) as they complete.
+    """
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = {pool.submit(job): i for i, job in enumerate(jobs)}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception:
+                logging.exception('Upload failed')
+                result = False
+            yield futures[future], result
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Paging utility.
+"""
+
+import itertools
+import logging
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+logger = logging.getLogger(__name__)
+
+
+class PagingError(Exception):
+    """ A page could not be read, the records would be incomplete. """
+
+    def __init__(self, skip):
+        super().__init__(f'Unable to read page at {skip}')
+        self.skip = skip
+
+
+def parseQuery(query=None):
+    """
+    Query string ('take=5&include=erp') or dict as dict.
+    """
+    if not query:
+        return {}
+    if isinstance(query, str):
+        return dict(item.split("=", 1) for item in query.split('&') if item)
+    return dict(query)
+
+
+def pageRecords(page):
+    """Records of a list page."""
+    if isinstance(page, list):
+        return page
+    return page.get('data') or []
+
+
+def pageTotal(page):
+    """Total records declared by the page meta, None if unknown."""
+    if not isinstance(page, dict):
+        return None
+    meta = page.get('meta') or {}
+    pagination = meta.get('pagination') or meta
+    total = pagination.get('total')
+    return int(total) if total is not None else None
+
+
+def paginate(fetch, query=None, take=100, prefetch=True, strict=False):
+    """
+    Yield the records of a list endpoint one at a time.
+    fetch(params) reads one page; while the caller consumes a page
+    the next one is fetched in background. Paging goes on until the
+    total of the page meta (a short page when unknown); with strict a
+    failed page raises PagingError instead of ending the records.
+    """
+    params = parseQuery(query)
+    take = int(params.pop('take', take))
+    skip = int(params.pop('skip', 0))
+    pool = ThreadPoolExecutor(max_workers=1) if prefetch else None
+
+    def read(skip):
+        return fetch({**params, 'take': take, 'skip': skip})
+
+    def submit(skip):
+        if pool:
+            return pool.submit(read, skip)
+        return skip
+
+    def result(pending):
+        if pool:
+            return pending.result()
+        return read(pending)
+
+    pending = submit(skip)
+    try:
+        while pending is not None:
+            page = result(pending)
+            pending = None
+            if page is False:
+                if strict:
+                    raise PagingError(skip)
+                logging.error(f'Unable to read page at {skip}, stop paging.')
+                return
+            records = pageRecords(page)
+            total = pageTotal(page)
+            skip += len(records)
+            if total is not None:
+                more = records and skip < total
+            else:
+                more = len(records) >= take
+            if more:
+                pending = submit(skip)
+            logging.debug(f'Page of {len(records)} records, next at {skip}')
+            yield from records
+    finally:
+        if pool:
+            if pending is not None:
+                pending.cancel()
+            pool.shutdown(wait=False)
+
+
+class Export(object):
+    """
+    Bulk export of a list endpoint: the first page gives the total,
+    the other pages are read concurrently by a bounded thread pool.
+    Iterate it to get the records; stats reports the throughput and
+    the failed pages. With strict a failed page raises PagingError;
+    without a total a failed page ends the export.
+    """
+
+    def __init__(self, fetch, query=None, take=100, concurrency=8, ordered=True, strict=False):
+        """
+        Initialize export of fetch(params) pages.
+        """
+        self.fetch = fetch
+        self.params = parseQuery(query)
+        self.take = int(self.params.pop('take', take))
+        self.skip = int(self.params.pop('skip', 0))
+        self.concurrency = concurrency
+        self.ordered = ordered
+        self.strict = strict
+        self.stats = {'records': 0, 'pages': 0, 'failed': 0, 'elapsed': 0.0, 'rate': 0.0}
+        self.failedPages = []
+
+    def __read(self, skip):
+        """ Read page at skip. """
+        return self.fetch({**self.params, 'take': self.take, 'skip': skip})
+
+    @property
+    def complete(self):
+        """Every page was read."""
+        return not self.stats['failed']
+
+    def __count(self, page, start, skip):
+        """ Update stats with page, returns its records. """
+        if page is False:
+            self.stats['failed'] += 1
+            self.failedPages.append(skip)
+            logging.error(f'Unable to read page at {skip}')
+            if self.strict:
+                raise PagingError(skip)
+            return []
+        records = pageRecords(page)
+        self.stats['pages'] += 1
+        self.stats['records'] += len(records)
+        self.stats['elapsed'] = time.perf_counter() - start
+        if self.stats['elapsed']:
+            self.stats['rate'] = self.stats['records'] / self.stats['elapsed']
+        return records
+
+    def __iter__(self):
+        start = time.perf_counter()
+        first = self.__read(self.skip)
+        records = self.__count(first, start, self.skip)
+        if first is False:
+            logging.error('Unable to read first page, export aborted.')
+            return
+        yield from records
+        total = pageTotal(first)
+        if total is not None:
+            # a server capping take returns shorter pages, step by what it gives
+            step = min(len(records), self.take)
+            if not step:
+                return
+            skips = iter(range(self.skip + step, total, step))
+            logging.info(f'Exporting {total} records, {self.concurrency} pages at once')
+        elif len(records) < self.take:
+            return
+        else:
+            skips = itertools.count(self.skip + self.take, self.take)
+        pool = ThreadPoolExecutor(max_workers=self.concurrency)
+        pending = deque()
+        last = False
+
+        def fill():
+            while not last and len(pending) < self.concurrency * 2:
+                skip = next(skips, None)
+                if skip is None:
+                    break
+                pending.append(pool.submit(lambda skip: (skip, self.__read(skip)), skip))
+
+        try:
+            fill()
+            while pending:
+                if self.ordered:
+                    done = [pending.popleft()]
+                else:
+                    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    done = [f for f in pending if f in finished]
+                    for f in done:
+                        pending.remove(f)
+                for future in done:
+                    skip, page = future.result()
+                    records = self.__count(page, start, skip)
+                    if total is None and (page is False or len(records) < self.take):
+                        # unknown end: a failed page ends the export, incomplete
+                        last = True
+                    yield from records
+                fill()
+        finally:
+            for future in pending:
+                future.cancel()
+            pool.shutdown(wait=False)
+            logging.info(f"Exported {self.stats['records']} records in "
+                f"{self.stats['elapsed']:.1f}s ({self.stats['rate']:.0f} records/s)")
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Reference data utility.
+In-memory index of small, rarely changing lists (uoms, currencies, ...)
+keyed by id and code, reloaded when older than ttl seconds.
+"""
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Reference(object):
+    """
+    Index of the records returned by load(), False on failure.
+    """
+
+    def __init__(self, load, ttl=3600, keys=('id', 'code')):
+        """
+        Initialize empty index, nothing is read until refresh.
+        """
+        self.load = load
+        self.ttl = ttl
+        self.keys = keys
+        self.loadedAt = None
+        self.stats = {'hits': 0, 'misses': 0, 'loads': 0}
+        self.__index = {key: {} for key in keys}
+        self.__lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        """Index has been loaded at least once."""
+        return self.loadedAt is not None
+
+    def isStale(self):
+        """Index older than ttl."""
+        if not self.loaded:
+            return True
+        if self.loadedAt == float('-inf'):
+            return True
+        return bool(self.ttl) and time.monotonic() - self.loadedAt > self.ttl
+
+    def refresh(self):
+        """
+        Reload all the records, keep the old index on failure.
+        """
+        with self.__lock:
+            records = self.load()
+            if records is False:
+                logging.error('Unable to load reference data, keeping current index')
+                return False
+            index = {key: {} for key in self.keys}
+            for record in records:
+                for key in self.keys:
+                    if record.get(key) is not None:
+                        index[key][record[key]] = record
+            self.__index = index
+            self.loadedAt = time.monotonic()
+            self.stats['loads'] += 1
+            logging.debug(f'Loaded {len(records)} reference records')
+            return True
+
+    def expire(self):
+        """Reload on next access."""
+        if self.loaded:
+            self.loadedAt = float('-inf')
+        return True
+
+    def get(self, key, value):
+        """
+        Record with key equal to value, None if not indexed.
+        A stale index is reloaded first.
+        """
+        if self.loaded and self.isStale():
+            self.refresh()
+        record = self.__index[key].get(value)
+        if record is None:
+            self.stats['misses'] += 1
+            return None
+        self.stats['hits'] += 1
+        return record
+
+    def add(self, record):
+        """Index a record read elsewhere."""
+        for key in self.keys:
+            if record.get(key) is not None:
+                self.__index[key][record[key]] = record
+        return True
+
+    def __len__(self):
+        return len(self.__index[self.keys[0]])
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Single flight utility.
+Concurrent calls with the same key share one execution.
+"""
+
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class _Call(object):
+    """ In flight call. """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(object):
+    """
+    do(key, fn): the first caller runs fn, callers arriving while it runs
+    wait and get its result (through share, if given).
+    """
+
+    def __init__(self):
+        """Init empty group."""
+        self.stats = {'calls': 0, 'coalesced': 0}
+        self.__calls = {}
+        self.__lock = threading.Lock()
+
+    def do(self, key, fn, share=None):
+        """
+        Run fn once for all the concurrent callers of key.
+        """
+        with self.__lock:
+            self.stats['calls'] += 1
+            call = self.__calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.__calls[key] = _Call()
+            else:
+                self.stats['coalesced'] += 1
+        if leader:
+            try:
+                call.result = fn()
+            except BaseException as e:
+                call.error = e
+                raise
+            finally:
+                with self.__lock:
+                    del self.__calls[key]
+                call.done.set()
+            return call.result
+        logging.debug(f'Waiting in flight {key}')
+        call.done.wait()
+        if call.error is not None:
+            raise call.error
+        if share:
+            return share(call.result)
+        return call.result
+
+    def inFlight(self):
+        """Keys running now."""
+        with self.__lock:
+            return len(self.__calls)
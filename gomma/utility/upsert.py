@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Upsert utility.
+Streaming bulk create-or-update with bounded concurrency, rate limit
+and a content hash store that skips the records unchanged since the last run.
+"""
+
+import hashlib
+import itertools
+import json
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+
+def contentHash(record):
+    """Stable hash of a json record."""
+    data = json.dumps(record, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+
+class RateLimit(object):
+    """
+    At most rate acquisitions per second, shared by threads.
+    """
+
+    def __init__(self, rate=None):
+        self.rate = rate
+        self.__next = time.monotonic()
+        self.__lock = threading.Lock()
+
+    def acquire(self):
+        """Wait for a slot."""
+        if not self.rate:
+            return 0
+        with self.__lock:
+            now = time.monotonic()
+            slot = max(self.__next, now)
+            self.__next = slot + 1 / self.rate
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+
+class HashStore(object):
+    """
+    Content hashes by record key in a redis hash.
+    """
+
+    def __init__(self, cache, name):
+        self.cache = cache
+        self.name = name
+
+    def getMany(self, keys):
+        """Stored hash of keys, None if missing."""
+        if not keys:
+            return []
+        try:
+            return self.cache.hmget(self.name, [str(k) for k in keys])
+        except RedisError:
+            logging.exception('Unable to read content hashes')
+            return [None] * len(keys)
+
+    def set(self, key, digest):
+        """Store hash of key."""
+        try:
+            self.cache.hset(self.name, str(key), digest)
+        except RedisError:
+            logging.exception('Unable to store content hash')
+            return False
+        return True
+
+    def clear(self):
+        """Forget every hash."""
+        self.cache.delete(self.name)
+        return True
+
+
+class Upsert(object):
+    """
+    Iterate it to run the upsert: yields one result per record,
+    {'key', 'action': created|updated|unchanged|superseded|failed, 'id', 'error'}.
+    A record followed by one with the same key in its chunk is superseded:
+    only the last one is written.
+    """
+
+    def __init__(self, records, resolve, create, update, key='code', hashes=None,
+        concurrency=8, rate=None, chunk=500, force=False):
+        """
+        resolve(key) -> existing record, None if missing or False on failure,
+        create(record) and update(id, record) -> response or False.
+        """
+        self.records = records
+        self.resolve = resolve
+        self.create = create
+        self.update = update
+        self.key = key
+        self.hashes = hashes
+        self.concurrency = concurrency
+        self.rate = RateLimit(rate)
+        self.chunk = chunk
+        self.force = force
+        self.stats = {'records': 0, 'created': 0, 'updated': 0, 'unchanged': 0,
+            'superseded': 0, 'failed': 0, 'elapsed': 0.0, 'rate': 0.0}
+
+    def __write(self, key, record, digest):
+        """ Resolve and create or update one record. """
+        result = {'key': key, 'action': 'failed', 'id': None, 'error': None}
+        try:
+            self.rate.acquire()
+            found = self.resolve(key)
+            if found is False:
+                # not a 404: creating would duplicate the item
+                result['error'] = 'resolve failed'
+                return result
+            self.rate.acquire()
+            if found:
+                result['id'] = found['data']['id']
+                done = self.update(result['id'], record)
+                action = 'updated'
+            else:
+                done = self.create(record)
+                if done and isinstance(done, dict):
+                    result['id'] = done['data']['id']
+                action = 'created'
+        except Exception as e:
+            logging.exception(f'Upsert of {key} failed')
+            result['error'] = str(e)
+            return result
+        if done is False:
+            result['error'] = f'{action[:-1]} failed'
+            return result
+        result['action'] = action
+        if self.hashes:
+            self.hashes.set(key, digest)
+        return result
+
+    def __count(self, result, start):
+        """ Update stats. """
+        self.stats['records'] += 1
+        self.stats[result['action']] += 1
+        self.stats['elapsed'] = time.perf_counter() - start
+        if self.stats['elapsed']:
+            self.stats['rate'] = self.stats['records'] / self.stats['elapsed']
+        return result
+
+    def __iter__(self):
+        start = time.perf_counter()
+        records = iter(self.records)
+        pool = ThreadPoolExecutor(max_workers=self.concurrency)
+        pending = deque()
+        inflight = {}
+
+        def collect(future):
+            pending.remove(future)
+            result = future.result()
+            if inflight.get(result['key']) is future:
+                del inflight[result['key']]
+            return self.__count(result, start)
+
+        try:
+            while True:
+                chunk = list(itertools.islice(records, self.chunk))
+                if not chunk:
+                    break
+                keys = [record[self.key] for record in chunk]
+                digests = [contentHash(record) for record in chunk]
+                stored = self.hashes.getMany(keys) if self.hashes and not self.force else [None] * len(chunk)
+                # writes still running when the hashes were read
+                unsettled = set(inflight)
+                last = {key: i for i, key in enumerate(keys)}
+                for i, (key, record, digest, old) in enumerate(zip(keys, chunk, digests, stored)):
+                    if last[key] != i:
+                        yield self.__count({'key': key, 'action': 'superseded', 'id': None,
+                            'error': None}, start)
+                        continue
+                    if key in inflight:
+                        # same key: written after the previous one, never created twice
+                        yield collect(inflight[key])
+                    if key in unsettled and self.hashes and not self.force:
+                        old = self.hashes.getMany([key])[0]
+                    if old == digest:
+                        yield self.__count({'key': key, 'action': 'unchanged', 'id': None,
+                            'error': None}, start)
+                        continue
+                    while len(pending) >= self.concurrency * 2:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in [f for f in pending if f in done]:
+                            yield collect(future)
+                    future = pool.submit(self.__write, key, record, digest)
+                    pending.append(future)
+                    inflight[key] = future
+            while pending:
+                yield collect(pending[0])
+        finally:
+            for future in pending:
+                future.cancel()
+            pool.shutdown(wait=True)
+            logging.info(f"Upserted {self.stats['records']} records in {self.stats['elapsed']:.1f}s: "
+                f"{self.stats['created']} created, {self.stats['updated']} updated, "
+                f"{self.stats['unchanged']} unchanged, {self.stats['superseded']} superseded, "
+                f"{self.stats['failed']} failed")
+
+    def run(self):
+        """Consume the upsert, returns stats."""
+        for _ in self:
+            pass
+        return self.stats
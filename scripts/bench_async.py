@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark sync and asyncio clients against a local stub server.
+Needs a local redis for the token (redis_host in the temporary profile).
+"""
+
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """ Answer every request with a small item, after latency. """
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    latency = 0.02
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.startswith('/auth/token'):
+            body = {'access_token': 'bench', 'expires_in': 3600}
+        else:
+            time.sleep(self.latency)
+            body = {'data': {'id': 1, 'code': self.path}}
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header('content-type', 'application/json')
+        self.send_header('content-length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_POST = do_GET
+
+
+def setProfile(port, redis_host, limit):
+    """ Write temporary agcloud profile and point HOME at it. """
+    home = tempfile.mkdtemp(prefix='gomma-bench-')
+    os.makedirs(f'{home}/.agcloud')
+    with open(f'{home}/.agcloud/config', 'w') as f:
+        f.write(f'[default]\nagapi_host=http://127.0.0.1:{port}\n'
+            f'redis_host={redis_host}\npool_maxsize={limit}\naio_limit={limit}\n')
+    with open(f'{home}/.agcloud/credentials', 'w') as f:
+        f.write('[default]\nagcloud_id=bench\nagcloud_key=bench\n')
+    os.environ['HOME'] = home
+    return home
+
+
+def report(name, count, elapsed):
+    """ Print results. """
+    print(f'{name:<12} {count:>6} calls {elapsed:>8.2f}s {count / elapsed:>10.1f} req/s')
+
+
+def benchSync(codes, threads):
+    """ Sync client, sequential and thread pool. """
+    from gomma.element.core import Element
+    el = Element()
+    el.getItemFromCode('warmup')
+    start = time.perf_counter()
+    for code in codes[:max(len(codes) // 10, 1)]:
+        el.getItemFromCode(code)
+    report('sync', max(len(codes) // 10, 1), time.perf_counter() - start)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(el.getItemFromCode, codes))
+    report(f'threads/{threads}', len(codes), time.perf_counter() - start)
+
+
+async def benchAsync(codes, limit):
+    """ Asyncio client with bounded concurrency. """
+    from gomma.element.aio import AsyncElement
+    el = AsyncElement()
+    await el.getItemFromCode('warmup')
+    semaphore = asyncio.Semaphore(limit)
+
+    async def one(code):
+        async with semaphore:
+            return await el.getItemFromCode(code)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(code) for code in codes))
+    report(f'async/{limit}', len(codes), time.perf_counter() - start)
+    print(f"max in flight {el.s.stats['max_in_flight']}")
+    await el.s.close()
+
+
+def main(args):
+    """ start bench """
+    logging.basicConfig(level=logging.WARNING)
+    StubHandler.latency = args.latency
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    setProfile(server.server_address[1], args.redis, args.concurrency)
+    codes = [f'CODE{i}' for i in range(args.calls)]
+    benchSync(codes, args.concurrency)
+    asyncio.run(benchAsync(codes, args.concurrency))
+    server.shutdown()
+
+
+def parse_args():
+    """Parse the args from main."""
+    import argparse
+    parser = argparse.ArgumentParser(description='Benchmark sync vs asyncio clients')
+    parser.add_argument("--calls", type=int, default=2000, help='Number of lookups')
+    parser.add_argument("--concurrency", type=int, default=100, help='Threads / in flight requests')
+    parser.add_argument("--latency", type=float, default=0.02, help='Stub server latency in seconds')
+    parser.add_argument("--redis", type=str, default='127.0.0.1', help='Redis host')
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    args = parse_args()
+    main(args)
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Micro-benchmark json decoding of representative API payloads:
+json.loads(r.text) against the codecs decoding r.content bytes.
+"""
+
+import json
+import random
+import timeit
+
+import requests
+
+from gomma.utility import codec
+
+
+def itemsPage(take):
+    """ getItems like page. """
+    return {
+        'data': [{
+            'id': i,
+            'code': f'ITEM{i:08d}',
+            'ext_id': str(2000000 + i),
+            'description': 'Tubo flessibile alta pressione ' * 3,
+            'family': {'data': {'id': i % 300, 'code': f'FAM{i % 300}', 'name': 'Famiglia'}},
+            'attributes': {'data': [
+                {'id': a, 'name': f'attr{a}', 'value': round(random.random() * 100, 3)}
+                for a in range(12)]},
+            'warehouses': {'data': [
+                {'warehouse_id': w, 'available': random.randint(0, 900), 'available_60': 0}
+                for w in range(4)]}
+        } for i in range(take)],
+        'meta': {'pagination': {'total': 400000, 'count': take, 'per_page': take}}
+    }
+
+
+def lookup():
+    """ findBy like response. """
+    return itemsPage(1)['data'][0]
+
+
+def response(payload, content_type):
+    """ Build requests response with body. """
+    r = requests.models.Response()
+    r.status_code = 200
+    r._content = json.dumps(payload).encode()
+    r.headers['content-type'] = content_type
+    r.encoding = requests.utils.get_encoding_from_headers(r.headers)
+    return r
+
+
+def bench(name, payload, number):
+    """ Run codecs on payload. """
+    for content_type in ('application/json', 'application/octet-stream'):
+        r = response(payload, content_type)
+
+        def viaText():
+            r._content_consumed = True
+            return json.loads(r.text)
+
+        size = len(r.content) / 1024
+        elapsed = timeit.timeit(viaText, number=number) / number
+        print(f'{name:<10} {size:>9.1f}KB {content_type:<26} json.loads(r.text) {elapsed * 1000:>9.3f}ms')
+    for codec_name in codec.available():
+        codec.setCodec(codec_name)
+        elapsed = timeit.timeit(lambda: codec.loads(r.content), number=number) / number
+        print(f'{name:<10} {size:>9.1f}KB {codec_name:<26} codec.loads(bytes) {elapsed * 1000:>9.3f}ms')
+
+
+def main():
+    """ start bench """
+    random.seed(1)
+    bench('lookup', lookup(), 20000)
+    bench('page/100', itemsPage(100), 200)
+    bench('page/1000', itemsPage(1000), 20)
+
+if __name__ == '__main__':
+    main()
@@ -28,6 +28,11 @@ setup(
         'requests',
         'redis'
     ],
+    extras_require={
+        'async': ['aiohttp'],
+        'fast': ['orjson'],
+        'stock': ['numpy']
+    },
     license="Apache License 2.0",
     classifiers=[
         'Development Status :: 5 - Production/Stable',
@@ -25,6 +25,15 @@ class test():
         logging.info(uoms)
         return True
 
+    def reference(self):
+        """uoms and currencies from memory."""
+        logging.debug('Test reference')
+        self.b.preload()
+        uom = self.b.getUoms('take=1')['data'][0]
+        assert self.b.getUomFromCode(uom['code'])['data']['id'] == uom['id']
+        logging.info(self.b.uoms.stats)
+        return True
+
 
 def main(args):
     """ start testing """
@@ -0,0 +1,84 @@
+
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Cache test
+"""
+
+import logging
+import os
+import tempfile
+import time
+
+from gomma.utility.cache import Cache
+
+class test():
+    """ Test cache """
+
+    def __init__(self):
+        """init"""
+        self.path = tempfile.mkdtemp(prefix='gomma-cache-')
+        logging.debug(f'Init test cache in {self.path}')
+        self.c = Cache(self.path, maxBytes=64 * 1024, compress=True)
+
+    def rw(self):
+        """text, binary and compressed values."""
+        self.c.create('text', 'hello')
+        self.c.create({'q': 'binary'}, b'\x00\x01')
+        self.c.create('big', 'x' * 10000)
+        assert 'hello' == self.c.read('text')
+        assert b'\x00\x01' == self.c.read({'q': 'binary'})
+        assert 'x' * 10000 == self.c.read('big')
+        logging.info(self.c.getStats())
+        return True
+
+    def ttl(self):
+        """entry expires."""
+        self.c.create('short', 'value', ttl=1)
+        assert 'value' == self.c.read('short')
+        time.sleep(1.1)
+        assert False is self.c.read('short')
+        logging.info(self.c.getStats())
+        return True
+
+    def lru(self):
+        """least recently used entries are evicted."""
+        self.c.create('keep', b'k' * 1024)
+        for i in range(100):
+            self.c.read('keep')
+            self.c.create(f'fill{i}', os.urandom(1024))
+        assert self.c.read('keep')
+        assert False is self.c.read('fill0')
+        logging.info(self.c.getStats())
+        return True
+
+    def clear(self):
+        """clear cache."""
+        self.c.clearCache()
+        assert False is self.c.read('text')
+        return True
+
+
+def main(args):
+    """ start testing """
+    logging.basicConfig(level=logging.INFO)
+    if args.verbose:
+        logging.getLogger().setLevel(logging.DEBUG)
+    logging.debug(f'Init {__file__}')
+    t = test()
+    for atr in args.test:
+        if hasattr(t, atr):getattr(t, atr)()
+    return
+    
+def parse_args():
+    """Parse the args from main."""
+    import argparse
+    parser = argparse.ArgumentParser(description='Testing cache')
+    parser.add_argument("-t", "--test", nargs='+', help='What can I do for you?', required=True)
+    parser.add_argument("-v", "--verbose", help="increase output verbosity", action="store_true")
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    args = parse_args()
+    main(args)
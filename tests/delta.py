@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Delta sync test
+"""
+
+import logging
+
+from gomma.utility.delta import DeltaSync
+
+class fakeWatermarks(dict):
+    """ Watermarks in a dict. """
+
+    def set(self, name, value):
+        self[name] = value
+        return True
+
+
+class test():
+    """ Test delta sync on a local list endpoint sorted by updated_at """
+
+    def __init__(self):
+        """init"""
+        self.records = {i: {'id': i, 'updated_at': f'2026-01-{i:02d}'} for i in range(1, 11)}
+        for i in range(11, 18):
+            self.records[i] = {'id': i, 'updated_at': '2026-01-20'}
+        self.calls = 0
+        self.onPage = None
+
+    def fetch(self, params):
+        """ Page of the records updated since, by updated_at and id. """
+        self.calls += 1
+        if self.onPage:
+            self.onPage(self.calls)
+        since = params.get('updated_since')
+        rows = sorted((r for r in self.records.values() if since is None or r['updated_at'] >= since),
+            key=lambda r: (r['updated_at'], r['id']))
+        skip, take = int(params['skip']), int(params['take'])
+        return {'data': [dict(r) for r in rows[skip:skip + take]],
+            'meta': {'pagination': {'total': len(rows)}}}
+
+    def run(self, watermarks, take=3):
+        applied = []
+        sync = DeltaSync(self.fetch, 'item', lambda records: applied.extend(r['id'] for r in records),
+            watermarks, take=take, batch=4)
+        return applied, sync.run()
+
+    def updated(self):
+        """a record updated during the run does not hide the others."""
+        def touch(call):
+            if 2 == call:
+                self.records[1]['updated_at'] = '2026-02-01'
+        self.onPage = touch
+        watermarks = fakeWatermarks()
+        applied, report = self.run(watermarks)
+        self.onPage = None
+        assert set(range(1, 18)) == set(applied) and report['complete']
+        assert '2026-02-01' == watermarks['item']
+        applied, report = self.run(watermarks)
+        assert [1] == applied
+        self.records[1]['updated_at'] = '2026-01-01'
+        return True
+
+    def ties(self):
+        """more records with the same updated_at than a page."""
+        watermarks = fakeWatermarks(item='2026-01-10')
+        applied, report = self.run(watermarks, take=2)
+        assert list(range(10, 18)) == applied and '2026-01-20' == report['watermark']
+        return True
+
+
+def main(args):
+    """ start testing """
+    logging.basicConfig(level=logging.INFO)
+    if args.verbose:
+        logging.getLogger().setLevel(logging.DEBUG)
+    logging.debug(f'Init {__file__}')
+    t = test()
+    for atr in args.test:
+        if hasattr(t, atr):getattr(t, atr)()
+    return
+
+def parse_args():
+    """Parse the args from main."""
+    import argparse
+    parser = argparse.ArgumentParser(description='Testing delta sync')
+    parser.add_argument("-t", "--test", nargs='+', help='What can I do for you?', required=True)
+    parser.add_argument("-v", "--verbose", help="increase output verbosity", action="store_true")
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    args = parse_args()
+    main(args)
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Diff test
+"""
+
+import logging
+import time
+
+from gomma.utility.diff import StateCache, diffRecord
+
+class test():
+    """ Test patch diff """
+
+    def __init__(self):
+        """init"""
+        self.cache = StateCache(maxsize=2, ttl=1)
+
+    def diff(self):
+        """only changed and new fields, nested values whole."""
+        current = {'id': 1, 'name': 'a', 'tags': [1, 2], 'size': {'w': 1}}
+        assert {} == diffRecord(current, {'name': 'a', 'tags': [1, 2]})
+        assert {'name': 'b', 'new': 0} == diffRecord(current, {'name': 'b', 'new': 0, 'id': 1})
+        assert {'size': {'w': 1, 'h': 2}} == diffRecord(current, {'size': {'w': 1, 'h': 2}})
+        assert {'name': 'a'} == diffRecord(None, {'name': 'a'})
+        return True
+
+    def states(self):
+        """least recently used dropped, updates keep the read time, states expire."""
+        self.cache.set('/a', {'v': 1})
+        self.cache.set('/b', {'v': 1})
+        self.cache.get('/a')
+        self.cache.set('/c', {'v': 1})
+        assert self.cache.get('/b') is None
+        time.sleep(0.6)
+        self.cache.update('/a', {'v': 2})
+        assert {'v': 2} == self.cache.get('/a')
+        time.sleep(0.6)
+        assert self.cache.get('/a') is None
+        logging.info(self.cache.stats)
+        return True
+
+
+def main(args):
+    """ start testing """
+    logging.basicConfig(level=logging.INFO)
+    if args.verbose:
+        logging.getLogger().setLevel(logging.DEBUG)
+    logging.debug(f'Init {__file__}')
+    t = test()
+    for atr in args.test:
+        if hasattr(t, atr):getattr(t, atr)()
+    return
+
+def parse_args():
+    """Parse the args from main."""
+    import argparse
+    parser = argparse.ArgumentParser(description='Testing diff')
+    parser.add_argument("-t", "--test", nargs='+', help='What can I do for you?', required=True)
+    parser.add_argument("-v", "--verbose", help="increase output verbosity", action="store_true")
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    args = parse_args()
+    main(args)
@@ -24,6 +24,19 @@ def test():
     items = el.getItems('take=10')
     logger.info(items)
 
+def testiter():
+    """ test item iterator."""
+    logger.debug('Init test')
+    el = Element()
+    ids = []
+    for i, item in enumerate(el.iterItems('take=5')):
+        logger.info(item['id'])
+        ids.append(item['id'])
+        if i >= 12:
+            break
+    expected = [item['id'] for item in el.getItems('take=13')['data']]
+    assert ids == expected, 'records lost or repeated at page boundaries'
+
 def testcompetitor():
     """ test Element class."""
     # import argparse
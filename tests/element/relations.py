@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Family relations test
+"""
+
+import logging
+
+from gomma.element.relations import currentRelations, relationPlan
+
+class test():
+    """ Test family relations plan """
+
+    def __init__(self):
+        """init"""
+        self.family = {
+            'id': 3,
+            'norms': {'data': [{'norm_id': 1}, {'norm_id': 2}]},
+            'features': {'data': [{'feature_id': 5, 'description': 'x'}]},
+            'sorting': {'data': [{'attribute_id': 7}, {'attribute_id': 8}]}
+        }
+
+    def current(self):
+        """relations by id, in family order."""
+        current = currentRelations(self.family)
+        assert [1, 2] == list(current['norms'])
+        assert [7, 8] == list(current['sorting'])
+        assert {} == current['qualities']
+        return True
+
+    def plan(self):
+        """only missing relations attached, extras reported."""
+        current = currentRelations(self.family)
+        attaches, extras, misordered = relationPlan(current, {
+            'norms': [2, 3, 3], 'features': {5: 'x', 6: 'y'}, 'attributes': [9]})
+        assert [('norms', 3, None), ('features', 6, 'y'), ('attributes', 9, None)] \
+            == attaches
+        assert [('norms', 1)] == extras and not misordered
+        attaches, _, _ = relationPlan(current, {'features': {5: 'changed'}})
+        assert [('features', 5, 'changed')] == attaches
+        try:
+            relationPlan(current, {'colors': [1]})
+        except ValueError:
+            pass
+        else:
+            raise AssertionError('ValueError expected')
+        return True
+
+    def sorting(self):
+        """sorting appended in order, a conflicting order is reported."""
+        current = currentRelations(self.family)
+        attaches, _, misordered = relationPlan(current, {'sorting': [7, 8, 10, 11]})
+        assert [('sorting', 10, None), ('sorting', 11, None)] == attaches and not misordered
+        _, _, misordered = relationPlan(current, {'sorting': [8, 7]})
+        assert misordered
+        _, extras, misordered = relationPlan(current, {'sorting': [10, 7]})
+        assert misordered and [('sorting', 8)] == extras
+        return True
+
+
+def main(args):
+    """ start testing """
+    logging.basicConfig(level=logging.INFO)
+    if args.verbose:
+        logging.getLogger().setLevel(logging.DEBUG)
+    logging.debug(f'Init {__file__}')
+    t = test()
+    for atr in args.test:
+        if hasattr(t, atr):getattr(t, atr)()
+    return
+
+def parse_args():
+    """Parse the args from main."""
+    import argparse
+    parser = argparse.ArgumentParser(description='Testing family relations')
+    parser.add_argument("-t", "--test", nargs='+', help='What can I do for you?', required=True)
+    parser.add_argument("-v", "--verbose", help="increase output verbosity", action="store_true")
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    args = parse_args()
+    main(args)
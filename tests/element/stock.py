@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Stock reconciliation test
+"""
+
+import logging
+import random
+
+from gomma.element import stock
+from gomma.element.stock import StockWriter, reconcile
+
+class fakeElement():
+    """ Element stock calls, failing on item 13. """
+
+    def __init__(self):
+        self.calls = []
+
+    def call(self, *args):
+        if 13 == args[1]:
+            raise ConnectionError('boom')
+        self.calls.append(args)
+        return True
+
+    def itemAddWarehouse(self, item_id, payload):
+        return self.call('add', item_id, payload['warehouse_id'])
+
+    def itemPatchWarehouse(self, item_id, warehouse_id, payload):
+        return self.call('patch', item_id, warehouse_id)
+
+    def itemRemoveWarehouse(self, item_id, warehouse_id):
+        return self.call('remove', item_id, warehouse_id)
+
+
+class test():
+    """ Test stock reconciliation """
+
+    def __init__(self):
+        """init"""
+        self.current = [(1, 10, 5.0), (1, 11, 2.0), (2, 10, 1.0), (3, 10, 0.0)]
+        self.feed = [(1, 10, 5.0), (1, 11, 3.0), (2, 12, 4.0), (2, 12, 7.0), (3, 10, 1e-12)]
+
+    def reconcile(self):
+        """minimal adds, patches and removes, last duplicate wins."""
+        adds, patches, removes = reconcile(self.current, self.feed, remove=True)
+        assert [(2, 12, 7.0)] == adds
+        assert [(1, 11, 3.0)] == patches
+        assert [(2, 10, 1.0)] == removes
+        assert [] == reconcile(self.current, self.feed)[2]
+        return True
+
+    def fallback(self):
+        """numpy and pure python agree."""
+        if stock.np is None:
+            logging.info('numpy not installed')
+            return True
+        rows = lambda: [(random.randint(1, 500), random.randint(1, 5), float(random.randint(0, 3)))
+            for _ in range(2000)]
+        current, feed = rows(), rows()
+        vectorized = [sorted(x) for x in reconcile(current, feed, remove=True)]
+        np, stock.np = stock.np, None
+        try:
+            python = [sorted(x) for x in reconcile(current, feed, remove=True)]
+        finally:
+            stock.np = np
+        assert vectorized == python
+        return True
+
+    def writer(self):
+        """raised errors are counted as failed writes."""
+        el = fakeElement()
+        writer = StockWriter(el, concurrency=2)
+        stats = writer.write([(13, 1, 1.0), (14, 1, 1.0)], [(15, 2, 2.0)], [(16, 3, 0.0)])
+        assert 1 == stats['added'] and 1 == stats['patched'] and 1 == stats['removed']
+        assert 1 == stats['failed'] and [('added', 13, 1)] == writer.errors
+        assert 3 == len(el.calls)
+        return True
+
+
+def main(args):
+    """ start testing """
+    logging.basicConfig(level=logging.INFO)
+    if args.verbose:
+        logging.getLogger().setLevel(logging.DEBUG)
+    logging.debug(f'Init {__file__}')
+    t = test()
+    for atr in args.test:
+        if hasattr(t, atr):getattr(t, atr)()
+    return
+
+def parse_args():
+    """Parse the args from main."""
+    import argparse
+    parser = argparse.ArgumentParser(description='Testing stock reconciliation')
+    parser.add_argument("-t", "--test", nargs='+', help='What can I do for you?', required=True)
+    parser.add_argument("-v", "--verbose", help="increase output verbosity", action="store_true")
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    args = parse_args()
+    main(args)
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Loader test
+"""
+
+import logging
+import threading
+import time
+
+from gomma.utility.loader import Loader
+
+class test():
+    """ Test batching loader """
+
+    def __init__(self):
+        """init"""
+        self.batches = []
+        self.lock = threading.Lock()
+
+    def loadMany(self, keys):
+        """ One call for many keys. """
+        with self.lock:
+            self.batches.append(list(keys))
+        return {key: {'data': {'id': key}} for key in keys if key >= 0}
+
+    def batch(self):
+        """keys of a window go in one deduplicated batch."""
+        self.batches = []
+        loader = Loader(loadMany=self.loadMany, window=0.05, maxBatch=100)
+        futures = loader.loadAll([1, 2, 1, 3, 2, -1])
+        values = [f.result(timeout=5) for f in futures]
+        assert [[1, 2, 3, -1]] == self.batches
+        assert {'data': {'id': 1}} == values[0] and values[0] is values[2]
+        assert False is values[5]
+        assert 2 == loader.stats['deduplicated'] and 1 == loader.stats['failed']
+        assert loader.load(1).result() == values[0] and 1 == len(self.batches)
+        loader.load(-1).result(timeout=5)
+        assert 2 == len(self.batches)
+        loader.close()
+        return True
+
+    def maxBatch(self):
+        """batches are split at maxBatch."""
+        self.batches = []
+        loader = Loader(loadMany=self.loadMany, window=0.05, maxBatch=10)
+        [f.result(timeout=5) for f in loader.loadAll(range(25))]
+        assert [10, 10, 5] == sorted((len(b) for b in self.batches), reverse=True)
+        loader.close()
+        return True
+
+    def bounded(self):
+        """least recently used dropped past maxSize, values expire after ttl."""
+        loader = Loader(loadMany=self.loadMany, window=0.01, maxSize=3, ttl=0.2)
+        for key in (1, 2, 3, 1, 4):
+            loader.load(key).result(timeout=5)
+        assert 3 == len(loader) and 1 == loader.stats['evicted']
+        self.batches = []
+        loader.load(1).result(timeout=5)
+        assert [] == self.batches
+        loader.load(2).result(timeout=5)
+        assert [[2]] == self.batches
+        time.sleep(0.3)
+        loader.load(1).result(timeout=5)
+        assert 1 == loader.stats['expired']
+        loader.close()
+        return True
+
+    def invalidate(self):
+        """a change forgets only the keys of the changed record."""
+        loader = Loader(loadMany=self.loadMany, window=0.01,
+            tag=lambda value: f"/element/item/{value['data']['id']}")
+        [f.result(timeout=5) for f in loader.loadAll([1, 2, 3])]
+        loader.invalidate(['/element/item/2/warehouse', '/element/item/2', '/element/item'])
+        assert 2 == len(loader) and 1 == loader.stats['invalidated']
+        loader.close()
+        return True
+
+
+def main(args):
+    """ start testing """
+    logging.basicConfig(level=logging.INFO)
+    if args.verbose:
+        logging.getLogger().setLevel(logging.DEBUG)
+    logging.debug(f'Init {__file__}')
+    t = test()
+    for atr in args.test:
+        if hasattr(t, atr):getattr(t, atr)()
+    return
+
+def parse_args():
+    """Parse the args from main."""
+    import argparse
+    parser = argparse.ArgumentParser(description='Testing loader')
+    parser.add_argument("-t", "--test", nargs='+', help='What can I do for you?', required=True)
+    parser.add_argument("-v", "--verbose", help="increase output verbosity", action="store_true")
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    args = parse_args()
+    main(args)
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Paging test
+"""
+
+import logging
+
+from gomma.utility.paging import Export, PagingError, paginate
+
+class test():
+    """ Test paging on a local list endpoint """
+
+    def __init__(self):
+        """init"""
+        self.records = [{'id': i} for i in range(253)]
+        self.fail = set()
+
+    def fetch(self, params, cap=40, total=True):
+        """ Page of records, at most cap of them. """
+        skip, take = int(params['skip']), int(params['take'])
+        if skip in self.fail:
+            return False
+        page = {'data': self.records[skip:skip + min(take, cap)]}
+        if total:
+            page['meta'] = {'pagination': {'total': len(self.records)}}
+        return page
+
+    def paginate(self):
+        """server capping take, pages follow the total."""
+        ids = [r['id'] for r in paginate(self.fetch, 'take=100')]
+        assert ids == list(range(253))
+        ids = [r['id'] for r in paginate(lambda p: self.fetch(p, 100, False), take=100)]
+        assert ids == list(range(253))
+        return True
+
+    def export(self):
+        """every record once, in order and not."""
+        for ordered in (True, False):
+            export = Export(self.fetch, take=100, concurrency=4, ordered=ordered)
+            ids = [r['id'] for r in export]
+            assert sorted(ids) == list(range(253)) and export.complete
+            if ordered:
+                assert ids == list(range(253))
+        ids = [r['id'] for r in Export(lambda p: self.fetch(p, 100, False), take=100)]
+        assert ids == list(range(253))
+        return True
+
+    def failed(self):
+        """failed pages are reported, or raise with strict."""
+        self.fail = {80}
+        export = Export(self.fetch, take=40)
+        assert 213 == len(list(export))
+        assert not export.complete and [80] == export.failedPages
+        for strict in (Export(self.fetch, take=40, strict=True),
+            paginate(self.fetch, take=40, strict=True)):
+            try:
+                list(strict)
+            except PagingError as e:
+                assert 80 == e.skip
+            else:
+                raise AssertionError('PagingError expected')
+        # no total: a failing page ends the export instead of paging forever
+        self.fail = set(range(120, 100000, 40))
+        export = Export(lambda p: self.fetch(p, 40, False), take=40, concurrency=2)
+        assert 120 == len(list(export)) and not export.complete
+        assert len(export.failedPages) <= 4
+        self.fail = set()
+        return True
+
+
+def main(args):
+    """ start testing """
+    logging.basicConfig(level=logging.INFO)
+    if args.verbose:
+        logging.getLogger().setLevel(logging.DEBUG)
+    logging.debug(f'Init {__file__}')
+    t = test()
+    for atr in args.test:
+        if hasattr(t, atr):getattr(t, atr)()
+    return
+
+def parse_args():
+    """Parse the args from main."""
+    import argparse
+    parser = argparse.ArgumentParser(description='Testing paging')
+    parser.add_argument("-t", "--test", nargs='+', help='What can I do for you?', required=True)
+    parser.add_argument("-v", "--verbose", help="increase output verbosity", action="store_true")
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    args = parse_args()
+    main(args)
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Upsert test
+"""
+
+import logging
+import threading
+
+from gomma.utility.upsert import HashStore, Upsert
+
+class fakeCache():
+    """ redis hash in a dict. """
+
+    def __init__(self):
+        self.data = {}
+
+    def hmget(self, name, keys):
+        return [self.data.get((name, k)) for k in keys]
+
+    def hset(self, name, key, value):
+        self.data[(name, key)] = value
+
+
+class test():
+    """ Test upsert on a local item store """
+
+    def __init__(self):
+        """init"""
+        self.items = {}
+        self.broken = set()
+        self.calls = []
+        self.lock = threading.Lock()
+        self.hashes = HashStore(fakeCache(), 'upsert')
+
+    def resolve(self, code):
+        """ Item of code, None if missing, False when the lookup fails. """
+        if code in self.broken:
+            return False
+        with self.lock:
+            return {'data': self.items[code]} if code in self.items else None
+
+    def create(self, record):
+        with self.lock:
+            self.calls.append(('create', record['code']))
+            self.items[record['code']] = {'id': record['code'], **record}
+            return {'data': self.items[record['code']]}
+
+    def update(self, item_id, record):
+        with self.lock:
+            self.calls.append(('update', item_id))
+            self.items[item_id].update(record)
+            return True
+
+    def run(self, records, chunk=500):
+        upsert = Upsert(records, self.resolve, self.create, self.update,
+            hashes=self.hashes, concurrency=4, chunk=chunk)
+        return [r['action'] for r in upsert]
+
+    def duplicates(self):
+        """last duplicate wins and re-running is a no-op."""
+        feed = [{'code': 'NEW1', 'name': 'x'}, {'code': 'NEW1', 'name': 'y'}]
+        assert ['superseded', 'created'] == self.run(feed)
+        for _ in range(2):
+            assert ['superseded', 'unchanged'] == self.run(feed)
+        assert 'y' == self.items['NEW1']['name'] and 1 == len(self.calls)
+        self.run([{'code': 'NEW2', 'name': 'x'}, {'code': 'NEW2', 'name': 'y'}], chunk=1)
+        assert 'y' == self.items['NEW2']['name']
+        assert ['create', 'update'] == [c[0] for c in self.calls if 'NEW2' == c[1]]
+        return True
+
+    def resolveFailed(self):
+        """a failed lookup is a failed record, never a create."""
+        self.broken = {'DOWN'}
+        assert ['failed'] == self.run([{'code': 'DOWN', 'name': 'x'}])
+        assert 'DOWN' not in self.items
+        self.broken = set()
+        assert ['created'] == self.run([{'code': 'DOWN', 'name': 'x'}])
+        return True
+
+
+def main(args):
+    """ start testing """
+    logging.basicConfig(level=logging.INFO)
+    if args.verbose:
+        logging.getLogger().setLevel(logging.DEBUG)
+    logging.debug(f'Init {__file__}')
+    t = test()
+    for atr in args.test:
+        if hasattr(t, atr):getattr(t, atr)()
+    return
+
+def parse_args():
+    """Parse the args from main."""
+    import argparse
+    parser = argparse.ArgumentParser(description='Testing upsert')
+    parser.add_argument("-t", "--test", nargs='+', help='What can I do for you?', required=True)
+    parser.add_argument("-v", "--verbose", help="increase output verbosity", action="store_true")
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    args = parse_args()
+    main(args)